@@ -0,0 +1,97 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+# Alias reads go to in the current request/stream; None means the primary.
+current_read_alias = ContextVar("ttscanner_read_alias", default=None)
+
+
+class ReplicaRouter:
+    """
+    Sends reads to the replica inside use_replica(), and for GETs of views
+    marked @reads_from_replica (see ReplicaRoutingMiddleware). All other
+    reads, and every write, go to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return current_read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        return True
+
+
+def replica_alias():
+    """The configured replica alias, or None when there is no replica."""
+    alias = getattr(settings, "REPLICA_DATABASE", None)
+    return alias if alias and alias in connections.settings else None
+
+
+@contextmanager
+def use_replica(alias=None):
+    """Route reads in the block to the replica (a no-op without one)."""
+    alias = alias or replica_alias()
+    token = current_read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        current_read_alias.reset(token)
+
+
+def reads_from_replica(view):
+    """
+    Mark a view (function or class) as read-only so its GET requests may be
+    served from the replica. Views that rebuild shared caches from MainData
+    (snapshots, the Sym/Int index, the row cache) stay on the primary, so a
+    lagging replica can't republish older data over newer.
+    """
+    view.reads_from_replica = True
+    return view
+
+
+def is_replica_view(view_func):
+    view_class = getattr(view_func, "view_class", None)
+    return getattr(view_func, "reads_from_replica", False) or getattr(view_class, "reads_from_replica", False)
+
+
+def request_actors(request, view_kwargs):
+    """
+    Who a request acts for: the client address, plus the user when the URL
+    names one. Users aren't authenticated, so the address is what ties an
+    update of a single alert or setting to that user's next page load.
+    """
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    address = forwarded.split(",")[0].strip() or request.META.get("REMOTE_ADDR", "")
+    actors = [f"addr:{address}"]
+    if view_kwargs.get("external_user_id") is not None:
+        actors.append(f"user:{view_kwargs['external_user_id']}")
+    return actors
+
+
+def pin_key(actor):
+    return f"db_pin:{actor}"
+
+
+def pin_to_primary(actors):
+    """After a write, keep these actors' reads on the primary for REPLICA_STICKY_SECONDS."""
+    try:
+        cache.set_many({pin_key(actor): 1 for actor in actors}, timeout=settings.REPLICA_STICKY_SECONDS)
+    except Exception as e:
+        logger.warning("Could not pin %s to the primary: %s", actors, e)
+
+
+def is_pinned(actors):
+    try:
+        return bool(cache.get_many([pin_key(actor) for actor in actors]))
+    except Exception as e:
+        # Without the pin state, read-your-writes can only be kept on the primary.
+        logger.warning("Could not read replica pins for %s: %s", actors, e)
+        return True
@@ -0,0 +1,62 @@
+import math
+
+# Conditions compared as numbers when the alert's column is numeric and its
+# compare_value is a number. "change" and text columns compare strings.
+NUMERIC_CONDITIONS = ("threshold_cross", "increase", "decrease", "equals")
+
+# numeric_triggers works on small integer codes rather than condition strings.
+UP, DOWN, EQUALS = 0, 1, 2
+CONDITION_CODES = {"threshold_cross": UP, "increase": UP, "decrease": DOWN, "equals": EQUALS}
+
+
+def is_numeric_alert(alert, numeric_column: bool) -> bool:
+    return (
+        numeric_column
+        and (alert.condition_type or "").lower() in NUMERIC_CONDITIONS
+        and getattr(alert, "compare_number", None) is not None
+    )
+
+
+def _missing(number):
+    return number is None or math.isnan(number)
+
+
+def numeric_trigger(condition, current, previous, threshold) -> bool:
+    """
+    One numeric condition. Same rules as the string comparison it replaces,
+    on floats: an alert with no previous value triggers on the first number
+    it sees; after that it triggers when the value crosses the threshold in
+    the condition's direction (or, for equals, lands on it).
+    """
+    if _missing(current) or _missing(threshold):
+        return False
+    if condition == "equals":
+        return current == threshold and (_missing(previous) or previous != current)
+    if _missing(previous):
+        return True
+    if condition == "decrease":
+        return previous >= threshold and current < threshold
+    return previous <= threshold and current > threshold
+
+
+def numeric_triggers(conditions, current, previous, threshold):
+    """
+    numeric_trigger for many alerts at once: parallel sequences of conditions
+    and current/previous/threshold values (None or NaN for missing), evaluated
+    in one numpy pass. Returns a boolean array.
+    """
+    import numpy as np
+
+    codes = np.array([CONDITION_CODES[c] for c in conditions], dtype=np.int8)
+    current = np.asarray(current, dtype=float)
+    previous = np.asarray(previous, dtype=float)
+    threshold = np.asarray(threshold, dtype=float)
+
+    no_previous = np.isnan(previous)
+    with np.errstate(invalid="ignore"):
+        crossed_up = no_previous | ((previous <= threshold) & (current > threshold))
+        crossed_down = no_previous | ((previous >= threshold) & (current < threshold))
+        landed = (current == threshold) & (no_previous | (previous != current))
+
+    result = np.where(codes == EQUALS, landed, np.where(codes == DOWN, crossed_down, crossed_up))
+    return result & ~np.isnan(current) & ~np.isnan(threshold)
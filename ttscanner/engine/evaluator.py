@@ -1,29 +1,14 @@
-import json, re, logging
+import re, logging
 from datetime import datetime
 from typing import List
 from collections import defaultdict
-from django.conf import settings
 from ttscanner.models import SymbolState, TriggeredAlert, FileAssociation
+from ttscanner.utils.log_utils import tally, log_sampled
+from ttscanner.utils.rules_utils import get_alert_rules
+from ttscanner.engine.rows import TypedRow, row_number, safe_float
 
 logger = logging.getLogger(__name__)
 
-_SYSTEM_ALERT_RULES = None
-
-def get_alert_rules():
-    """Load JSON only when needed"""
-    global _SYSTEM_ALERT_RULES
-    if _SYSTEM_ALERT_RULES is None:
-        # Load with proper encoding
-        with open(settings.BASE_DIR / "ttscanner/alert_rules.json", 'r', encoding='utf-8') as f:
-            _SYSTEM_ALERT_RULES = json.load(f)
-    return _SYSTEM_ALERT_RULES
-
-def safe_float(val):
-    try:
-        return float(str(val).replace(",", "")) if val not in (None, "") else None
-    except Exception:
-        return None
-
 def normalize_key(key: str) -> str:
     return key.strip().lower().replace(" ", "").replace("/", "").replace("_", "")
 
@@ -35,9 +20,47 @@ def lookup_any(row: dict, candidates: List[str]):
             return val
     return None
 
-def extract_symbol_from_row(row: dict) -> str | None:
-    candidates = ["symbol", "sym", "symint", "ticker", "symbolinterval"]
-    symbol = lookup_any(row, candidates)
+# Columns each detector field may come from, in order of preference.
+FIELD_CANDIDATES = {
+    "symbol": ["symbol", "sym", "symint", "ticker", "symbolinterval"],
+    "bars_since_entry": ["Bars Since Entry", "BarSinceEntry", "BarsSinceEntry"],
+    "direction": ["Direction"],
+    "trade_direction": ["Direction", "Trade Direction"],
+    "entry_price": ["Entry Price", "EntryPrice"],
+    "profit_factor": ["Profit Factor", "ProfitFactor", "PF"],
+    "profit_pct": ["Profit %", "Profit%", "Profit", "Profit_Pct"],
+}
+
+def resolve_fields(columns) -> dict:
+    """
+    Match FIELD_CANDIDATES against a header row once, the way lookup_any
+    would on every row: field -> the file's matching columns, best first.
+    Stored per file in FileAssociation.schema (csv_utils.compile_schema).
+    """
+    normalized = {normalize_key(c): c for c in columns if c is not None}
+    return {
+        field: [normalized[normalize_key(c)] for c in candidates if normalize_key(c) in normalized]
+        for field, candidates in FIELD_CANDIDATES.items()
+    }
+
+def field_value(row: dict, fields: dict, field: str):
+    """lookup_any for a resolved field: the first of its columns with a value."""
+    for column in fields[field]:
+        val = row.get(column)
+        if val is not None:
+            return val
+    return None
+
+def field_number(row, fields: dict, field: str):
+    """safe_float(field_value(...)), from the file's parsed column for typed rows."""
+    for column in fields[field]:
+        val = row.get(column)
+        if val is not None:
+            return row_number(row, column)
+    return None
+
+def extract_symbol_from_row(row: dict, fields: dict = None) -> str | None:
+    symbol = field_value(row, fields or resolve_fields(row), "symbol")
     return str(symbol).upper() if symbol else None
 
 def group_alerts_by_symbol(alerts_data):
@@ -68,29 +91,32 @@ def combine_symbol_alerts(symbol, alerts):
     messages = [alert["message"] for alert in alerts]
     return f"{symbol}: " + " | ".join(messages)
 
-def detect_new_trade(row: dict, fired_map: dict) -> List[dict]:
+def detect_new_trade(row: dict, fired_map: dict, stats=None, fields=None) -> List[dict]:
     alerts_data = []
+    fields = fields or resolve_fields(row)
 
-    symbol = extract_symbol_from_row(row)
+    symbol = extract_symbol_from_row(row, fields)
     if not symbol:
-        print("Skipping row: no symbol found")
+        tally(stats, "no_symbol")
         return []
 
-    bars_raw = lookup_any(row, ["Bars Since Entry", "BarSinceEntry", "BarsSinceEntry"])
-    direction = (lookup_any(row, ["Direction", "Trade Direction"]) or "").strip().upper()
-    entry_price = lookup_any(row, ["Entry Price", "EntryPrice"]) or ""
+    bars_raw = field_value(row, fields, "bars_since_entry")
+    direction = (field_value(row, fields, "trade_direction") or "").strip().upper()
+    entry_price = field_value(row, fields, "entry_price") or ""
 
+    # Almost every row is an open trade; these are counted, not logged.
     if not (isinstance(bars_raw, str) and bars_raw.strip().upper() == "NEW"):
-        print(f"{symbol}: Bars Since Entry is not 'NEW' ({bars_raw}), skipping new trade")
+        tally(stats, "new_trade_not_new")
         return []
 
     if direction not in ["LONG", "SHORT"]:
-        print(f"{symbol}: Invalid direction ({direction}), skipping new trade")
+        tally(stats, "new_trade_bad_direction")
+        logger.debug("%s: Invalid direction (%s), skipping new trade", symbol, direction)
         return []
 
     alert_key = f"{symbol}_newtrade_{direction}"
     if alert_key in fired_map:
-        print(f"{symbol}: Alert already fired ({alert_key}), skipping")
+        tally(stats, "new_trade_already_fired")
         return []
 
     # FIXED LINE: Use get_alert_rules() instead of SYSTEM_ALERT_RULES
@@ -117,18 +143,20 @@ def detect_new_trade(row: dict, fired_map: dict) -> List[dict]:
         "timestamp": datetime.now(),
     })
 
-    print(f"New trade detected: {message}")
+    tally(stats, "new_trade")
+    logger.info("New trade detected: %s", message)
     return alerts_data
 
-def detect_flat_trade(row: dict, prev_row: dict, fired_map: dict) -> List[dict]:
+def detect_flat_trade(row: dict, prev_row: dict, fired_map: dict, stats=None, fields=None, prev_fields=None) -> List[dict]:
     alerts_data = []
+    fields = fields or resolve_fields(row)
 
-    symbol = extract_symbol_from_row(row)
+    symbol = extract_symbol_from_row(row, fields)
     if not symbol or not prev_row:
         return []
 
-    prev_direction = (lookup_any(prev_row, ["Direction"]) or "").strip().upper()
-    curr_direction = (lookup_any(row, ["Direction"]) or "").strip().upper()
+    prev_direction = (field_value(prev_row, prev_fields or resolve_fields(prev_row), "direction") or "").strip().upper()
+    curr_direction = (field_value(row, fields, "direction") or "").strip().upper()
 
     if "FLAT" not in curr_direction or prev_direction not in ["LONG", "SHORT"]:
         return []
@@ -137,7 +165,7 @@ def detect_flat_trade(row: dict, prev_row: dict, fired_map: dict) -> List[dict]:
     if alert_key in fired_map:
         return []
 
-    profit_factor = safe_float(lookup_any(row, ["Profit Factor", "ProfitFactor", "PF"]))
+    profit_factor = field_number(row, fields, "profit_factor")
     profit_str = str(profit_factor) if profit_factor is not None else "N/A"
 
     # FIXED LINE: Use get_alert_rules() instead of SYSTEM_ALERT_RULES
@@ -162,18 +190,20 @@ def detect_flat_trade(row: dict, prev_row: dict, fired_map: dict) -> List[dict]:
         "timestamp": datetime.now(),
     })
 
-    print(message)
+    tally(stats, "flat_close")
+    logger.info("Flat trade detected: %s", message)
     return alerts_data
 
-def detect_reversal_trade(row: dict, prev_row: dict, fired_map: dict) -> List[dict]:
+def detect_reversal_trade(row: dict, prev_row: dict, fired_map: dict, stats=None, fields=None, prev_fields=None) -> List[dict]:
     alerts_data = []
+    fields = fields or resolve_fields(row)
 
-    symbol = extract_symbol_from_row(row)
+    symbol = extract_symbol_from_row(row, fields)
     if not symbol or not prev_row:
         return []
 
-    prev_dir = (lookup_any(prev_row, ["Direction"]) or "").strip().upper()
-    curr_dir = (lookup_any(row, ["Direction"]) or "").strip().upper()
+    prev_dir = (field_value(prev_row, prev_fields or resolve_fields(prev_row), "direction") or "").strip().upper()
+    curr_dir = (field_value(row, fields, "direction") or "").strip().upper()
 
     if prev_dir == curr_dir:
         return []
@@ -207,97 +237,73 @@ def detect_reversal_trade(row: dict, prev_row: dict, fired_map: dict) -> List[di
         "timestamp": datetime.now(),
     })
 
-    print(message)
+    tally(stats, "reversal")
+    logger.info("Reversal detected: %s", message)
     return alerts_data
 
-def detect_target_hit(row: dict, state: SymbolState, fired_map: dict) -> List[dict]:
+def detect_target_hit(row: dict, state: SymbolState, fired_map: dict, stats=None, fields=None) -> List[dict]:
     alerts_data = []
+    fields = fields or resolve_fields(row)
 
-    logger.debug(f"🔍 detect_target_hit called for row keys: {list(row.keys())}")
-    logger.debug(f"🔍 Row sample values: { {k: v for i, (k, v) in enumerate(row.items()) if i < 5} }")
-    
-    symbol = extract_symbol_from_row(row)
+    symbol = extract_symbol_from_row(row, fields)
     if not symbol:
-        logger.warning(f"❌ Could not extract symbol from row: {row.get('symbol', 'N/A')}")
+        tally(stats, "no_symbol")
+        log_sampled(logger, logging.WARNING, "target_no_symbol",
+                    "Could not extract symbol from row with keys %s", list(row.keys()))
         return []
-    
-    logger.info(f"🎯 Checking targets for symbol: {symbol}")
-    logger.debug(f"🎯 Current state: target1_hit={getattr(state, 'target1_hit', False)}, target2_hit={getattr(state, 'target2_hit', False)}")
-    
+
     # Define targets to check
     targets = [
         {"field": "Target #1", "hit_flag": "target1_hit"},
         {"field": "Target #2", "hit_flag": "target2_hit"}
     ]
-    
-    # Log available target fields in the row
-    available_target_fields = [field for field in ["Target #1", "Target #2"] if field in row]
-    logger.debug(f"🎯 Available target fields in row: {available_target_fields}")
-    logger.debug(f"🎯 Target #1 value: {row.get('Target #1', 'NOT FOUND')}")
-    logger.debug(f"🎯 Target #2 value: {row.get('Target #2', 'NOT FOUND')}")
-    
+
     for target in targets:
         target_field = target["field"]
         hit_flag = target["hit_flag"]
-        
+
         # Check if target field exists in row
         if target_field not in row:
-            logger.debug(f"📭 Target field '{target_field}' not found in row for {symbol}")
             continue
-        
-        # Get target value
-        target_value = lookup_any(row, [target_field])
-        logger.debug(f"🎯 Target '{target_field}' value for {symbol}: {target_value} (type: {type(target_value)})")
-        
-        # Check if already hit
-        already_hit = getattr(state, hit_flag, False)
-        logger.debug(f"🎯 Already hit '{target_field}'? {already_hit}")
-        
+
         # Skip if already hit
-        if already_hit:
-            logger.info(f"⏭️ Target '{target_field}' already hit for {symbol}, skipping")
+        if getattr(state, hit_flag, False):
+            tally(stats, "target_already_hit")
             continue
-        
+
         # Check if target has valid value
+        target_value = row[target_field]
         if not target_value:
-            logger.debug(f"📭 Target '{target_field}' has no value for {symbol}")
             continue
-        
+
         # Try to convert target value to float for numeric check
         try:
-            target_float = float(target_value)
-            logger.debug(f"🔢 Target '{target_field}' numeric value: {target_float}")
+            float(target_value)
         except (ValueError, TypeError):
-            logger.warning(f"⚠️ Target '{target_field}' value '{target_value}' is not numeric for {symbol}")
+            tally(stats, "target_not_numeric")
+            log_sampled(logger, logging.WARNING, f"target_not_numeric:{target_field}",
+                        "Target '%s' value '%s' is not numeric for %s", target_field, target_value, symbol)
             continue
-        
-        # FIXED LINE: Use get_alert_rules() instead of SYSTEM_ALERT_RULES
+
         message_template = None
         system_alerts = get_alert_rules().get("TTScanner", {}).get("alerts", [])
-        logger.debug(f"📋 Available system alerts: {len(system_alerts)}")
-        
+        target_field_norm = normalize_key(target_field)
         for alert_cfg in system_alerts:
-            alert_field = normalize_key(alert_cfg.get("field", ""))
-            target_field_norm = normalize_key(target_field)
-            logger.debug(f"  Comparing: alert_field='{alert_field}' vs target_field='{target_field_norm}'")
-            
-            if alert_field == target_field_norm:
+            if normalize_key(alert_cfg.get("field", "")) == target_field_norm:
                 message_template = alert_cfg.get("message")
-                logger.debug(f"✅ Found message template for {target_field}: {message_template}")
                 break
-        
+
         # Default message template if not found
         if not message_template:
             message_template = f"📊 {target_field}: {{Sym/Int}} hit at ${{{target_field}}} | Profit: {{Profit %}}%"
-            logger.debug(f"📝 Using default message template for {target_field}")
-        
+
         # Get profit percentage
-        profit_pct = safe_float(lookup_any(row, ["Profit %", "Profit%", "Profit", "Profit_Pct"]))
-        
+        profit_pct = field_number(row, fields, "profit_pct")
+
         # Build message
         message = message_template.replace("{Sym/Int}", symbol)
         message = message.replace(f"{{{target_field}}}", str(target_value))
-        
+
         # Handle profit placeholder
         if "{Profit %}" in message:
             profit_display = f"{profit_pct:.2f}" if profit_pct is not None else "N/A"
@@ -305,15 +311,11 @@ def detect_target_hit(row: dict, state: SymbolState, fired_map: dict) -> List[di
         elif "{Profit}" in message:
             profit_display = f"{profit_pct:.2f}" if profit_pct is not None else "N/A"
             message = message.replace("{Profit}", profit_display)
-        
-        logger.info(f"✅ Target hit detected! {symbol} - {target_field} = {target_value} (Profit: {profit_pct})")
-        
+
         # Create alert key and store in fired map
         alert_key = f"{symbol}_{target_field.replace(' ', '').lower()}"
-        current_time = datetime.now().isoformat()
-        fired_map[alert_key] = current_time
-        logger.debug(f"🗝️ Alert key: {alert_key}, timestamp: {current_time}")
-        
+        fired_map[alert_key] = datetime.now().isoformat()
+
         # Create alert data
         alert_data = {
             "symbol": symbol,
@@ -326,33 +328,38 @@ def detect_target_hit(row: dict, state: SymbolState, fired_map: dict) -> List[di
             "timestamp": datetime.now(),
         }
         alerts_data.append(alert_data)
-        
+
         # Update state
         setattr(state, hit_flag, True)
-        logger.info(f"📝 Updated state: {hit_flag}=True for {symbol}")
-        
-        # Print message (console output)
-        print(f"🎯 [TARGET HIT] {message}")
-    
-    logger.info(f"📊 detect_target_hit completed for {symbol}. Alerts generated: {len(alerts_data)}")
+        tally(stats, "target_hit")
+        logger.info("[TARGET HIT] %s", message)
+
     return alerts_data
 
-def process_row_for_alerts(fa: FileAssociation, algo, raw_row: dict) -> List[TriggeredAlert]:
+def process_row_for_alerts(fa: FileAssociation, algo, raw_row: dict, stats=None, fields=None) -> List[TriggeredAlert]:
+    """
+    System alerts for one row. Per-row outcomes are counted into `stats`
+    (a Counter) for the caller's per-run summary rather than logged.
+    `fields` is resolve_fields() of the file's header row, from its schema.
+    """
     alerts = []
     if "ttscanner" not in fa.file_name.lower() or not raw_row or getattr(fa, "data_version", 1) == 0:
         return alerts
 
-    row = {k.strip(): v for k, v in raw_row.items() if k is not None}
-    symbol = extract_symbol_from_row(row)
+    row = raw_row if isinstance(raw_row, TypedRow) else {k.strip(): v for k, v in raw_row.items() if k is not None}
+    fields = fields or resolve_fields(row)
+    symbol = extract_symbol_from_row(row, fields)
     if not symbol:
         return alerts
 
     state, _ = SymbolState.objects.get_or_create(file_association=fa, symbol=symbol)
     fired_map = getattr(state, "last_alerts", {}) or {}
     prev_row = state.last_row_data
+    # The previous row only shares the columns if the header row hasn't changed since.
+    prev_fields = fields if prev_row and prev_row.keys() == row.keys() else None
 
     for detector in [detect_flat_trade, detect_new_trade]:
-        for alert in detector(row, prev_row, fired_map) if detector != detect_new_trade else detector(row, fired_map):
+        for alert in detector(row, prev_row, fired_map, stats, fields, prev_fields) if detector != detect_new_trade else detector(row, fired_map, stats, fields):
             alerts.append(
                 TriggeredAlert(
                     file_association=fa,
@@ -362,7 +369,7 @@ def process_row_for_alerts(fa: FileAssociation, algo, raw_row: dict) -> List[Tri
                 )
             )
 
-    for alert in detect_target_hit(row, state, fired_map):
+    for alert in detect_target_hit(row, state, fired_map, stats, fields):
         alerts.append(
             TriggeredAlert(
                 file_association=fa,
@@ -372,7 +379,7 @@ def process_row_for_alerts(fa: FileAssociation, algo, raw_row: dict) -> List[Tri
             )
         )
 
-    state.last_row_data = row
+    state.last_row_data = row.as_dict() if isinstance(row, TypedRow) else row
     state.last_alerts = fired_map
     state.save()
 
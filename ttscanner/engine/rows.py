@@ -0,0 +1,124 @@
+import math
+from collections.abc import Mapping, Sequence
+
+
+def safe_float(val):
+    """The value as a finite float, or None ("nan" and "inf" count as missing)."""
+    try:
+        number = float(str(val).replace(",", "")) if val not in (None, "") else None
+    except Exception:
+        return None
+    return number if number is not None and math.isfinite(number) else None
+
+
+def row_number(row, key):
+    """safe_float(row.get(key)), from the file's parsed column for typed rows."""
+    if isinstance(row, TypedRow):
+        return row.number(key) if key in row else None
+    return safe_float(row.get(key))
+
+
+def gather_numbers(rows, cells):
+    """
+    row_number for many (position in rows, column) cells, as a float array
+    with NaN for missing values. Typed rows are read with one numpy take
+    from the file's parsed columns.
+    """
+    import numpy as np
+
+    if not (cells and isinstance(rows[0], TypedRow)):
+        return np.array([row_number(rows[position], column) for position, column in cells], dtype=float)
+
+    column_slots = {}
+    row_indexes, column_indexes = [], []
+    for position, column in cells:
+        row_indexes.append(rows[position].index)
+        column_indexes.append(column_slots.setdefault(column, len(column_slots)))
+
+    file_rows = rows[0].file_rows
+    matrix = np.stack([file_rows.number_array(column) for column in column_slots])
+    return matrix[column_indexes, row_indexes]
+
+
+class TypedRow(Mapping):
+    """
+    One stored row as a tuple of values bound to its file's columns. Reads
+    like the dict it replaces (row.get(), row[col], `col in row`), and
+    number(col) returns the column's value parsed once for the whole file.
+    """
+    __slots__ = ("file_rows", "index", "values")
+
+    def __init__(self, file_rows, index, values):
+        self.file_rows = file_rows
+        self.index = index
+        self.values = values
+
+    def __getitem__(self, key):
+        return self.values[self.file_rows.positions[key]]
+
+    def get(self, key, default=None):
+        position = self.file_rows.positions.get(key)
+        return default if position is None else self.values[position]
+
+    def __contains__(self, key):
+        return key in self.file_rows.positions
+
+    def __iter__(self):
+        return iter(self.file_rows.keys)
+
+    def __len__(self):
+        return len(self.values)
+
+    def number(self, key):
+        """safe_float(row[key]), from the file's parsed column."""
+        return self.file_rows.numbers(key)[self.index]
+
+    def as_dict(self):
+        return dict(zip(self.file_rows.keys, self.values))
+
+
+class FileRows(Sequence):
+    """
+    The rows of one file version for evaluation. Column names and the
+    file's schema (csv_utils.compile_schema) are held once here rather than
+    repeated in every row, and numeric columns are parsed on first use,
+    once per file.
+    """
+    __slots__ = ("keys", "positions", "rows", "schema", "_numbers", "_arrays")
+
+    def __init__(self, dict_rows, schema=None):
+        self.keys = list(dict_rows[0]) if dict_rows else []
+        self.positions = {key: i for i, key in enumerate(self.keys)}
+        self.rows = [
+            TypedRow(self, i, tuple(map(row.get, self.keys)))
+            for i, row in enumerate(dict_rows)
+        ]
+        self.schema = schema
+        self._numbers = {}
+        self._arrays = {}
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def numbers(self, key):
+        """The column as floats (None where the value isn't a number)."""
+        if key not in self._numbers:
+            position = self.positions.get(key)
+            self._numbers[key] = (
+                [safe_float(row.values[position]) for row in self.rows]
+                if position is not None else [None] * len(self.rows)
+            )
+        return self._numbers[key]
+
+    def number_array(self, key):
+        """numbers(key) as a numpy float array, NaN where the value isn't a number."""
+        if key not in self._arrays:
+            import numpy as np
+            self._arrays[key] = np.array(self.numbers(key), dtype=float)
+        return self._arrays[key]
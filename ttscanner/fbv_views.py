@@ -1,14 +1,22 @@
 from rest_framework.response import Response
-from django.http import StreamingHttpResponse
+from django.http import StreamingHttpResponse, HttpResponse
+from django.conf import settings
 from rest_framework import status
 from rest_framework.decorators import api_view
 from .tasks import send_announcement_sms_task
 from django.contrib.auth import logout
 from django.views.decorators.csrf import csrf_exempt
 from .models import Announcement, MENTUser, TriggeredAlert, FileAssociation, GlobalAlertRule
-import uuid, json, time
+import asyncio, uuid, json, time
 from django.core.cache import cache
+from .utils.cache_utils import bulk_cache
+from .utils.snapshot_utils import snapshot_key
+from .utils.metrics_utils import render_prometheus
+from .db_router import reads_from_replica, use_replica
+from django.db import DatabaseError, close_old_connections
 from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
 
 
 @api_view(["POST"])
@@ -29,6 +37,7 @@ def send_announcement(request):
     }, status=status.HTTP_200_OK)
 
 
+@reads_from_replica
 @api_view(["GET"])
 def announcement_log(request):
     logs = Announcement.objects.all().order_by("-created_at")
@@ -81,6 +90,7 @@ def login(request):
     }, status=status.HTTP_200_OK)
 
 
+@reads_from_replica
 @api_view(["GET"])
 def triggered_alerts_count(request):
     count = TriggeredAlert.objects.filter(
@@ -89,6 +99,7 @@ def triggered_alerts_count(request):
     return Response({"totalTriggeredAlerts": count})
 
 
+@reads_from_replica
 @api_view(["GET"])
 def file_associations_count(request):
     count = FileAssociation.objects.count()
@@ -96,6 +107,7 @@ def file_associations_count(request):
 
 
 
+@reads_from_replica
 @api_view(["GET"])
 def global_alerts_count(request):
     count = GlobalAlertRule.objects.count()
@@ -109,91 +121,135 @@ def logout_view(request):
     return Response({"detail": "Logged out successfully"}, status=status.HTTP_200_OK)
 
 
-from django.db.models import Q
+MAX_ALERTS_PER_LOOP = 50
+SSE_POLL_SECONDS = 2
 
-MAX_ALERTS_PER_LOOP = 10  
-from django.db import connections
 
-MAX_ALERTS_PER_LOOP = 50
+def sse_stream_response(request, poll, name):
+    """
+    Stream the chunks poll() returns every SSE_POLL_SECONDS, until it returns None.
+
+    Under ASGI, Django buffers a sync iterator until it is exhausted, which a
+    stream never is, so there the loop is async and poll() runs through
+    sync_to_async. It always runs on the request's own thread, so a stream
+    keeps a single database connection for its lifetime, and Django closes
+    that connection when the response closes.
+    """
+    if isinstance(request, ASGIRequest):
+        async def event_stream():
+            print(f"--- SSE Connection Opened: {name} ---")
+            try:
+                while (chunks := await sync_to_async(poll)()) is not None:
+                    for chunk in chunks:
+                        yield chunk
+                    await asyncio.sleep(SSE_POLL_SECONDS)
+            finally:
+                print(f"--- SSE Disconnected: {name} ---")
+    else:
+        def event_stream():
+            print(f"--- SSE Connection Opened: {name} ---")
+            try:
+                while (chunks := poll()) is not None:
+                    yield from chunks
+                    time.sleep(SSE_POLL_SECONDS)
+            finally:
+                print(f"--- SSE Disconnected: {name} ---")
+
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
 
 def sse_user_alerts(request, external_user_id):
     """
     Handles live alerts for a specific user.
-    Uses standard synchronous Django to avoid local server crashes.
     """
-    def event_stream():
-        print(f"--- SSE Connection Opened for External ID: {external_user_id} ---")
+    def poll():
         try:
-            while True:
-                alerts_queryset = TriggeredAlert.objects.filter(
+            # Polling runs on the replica. Only alerts still unsent on the
+            # primary are claimed, so replication lag can't make a later poll
+            # resend what an earlier one delivered.
+            with use_replica():
+                alerts = list(TriggeredAlert.objects.filter(
                     Q(alert_source__in=["system", "global"]) |
                     Q(alert_source="custom", custom_alert__user__external_user_id=external_user_id),
                     sent_to_ui=False
-                ).order_by("triggered_at")[:MAX_ALERTS_PER_LOOP]
-
-                alerts = list(alerts_queryset)
-
-                for alert in alerts:
-                    payload = {
-                        "id": alert.id,
-                        "message": alert.message,
-                        "symbol": alert.symbol or "N/A",
-                        "triggered_at": alert.triggered_at.isoformat(),
-                        "source": alert.alert_source
-                    }
-                    yield f"data: {json.dumps(payload)}\n\n"
-
-                    # Mark as sent using standard save
-                    alert.sent_to_ui = True
-                    alert.save(update_fields=["sent_to_ui"])
-
-                yield ": heartbeat\n\n"
-                time.sleep(2)
-
-        except GeneratorExit:
-            print(f"--- SSE Disconnected for {external_user_id} ---")
-        except Exception as e:
+                ).only("id", "message", "symbol", "triggered_at", "alert_source")
+                 .order_by("triggered_at")[:MAX_ALERTS_PER_LOOP])
+            if alerts:
+                unsent = TriggeredAlert.objects.filter(id__in=[alert.id for alert in alerts], sent_to_ui=False)
+                claimed = set(unsent.values_list("id", flat=True))
+                unsent.filter(id__in=claimed).update(sent_to_ui=True)
+                alerts = [alert for alert in alerts if alert.id in claimed]
+        except DatabaseError as e:
+            # Drop broken connections so the next poll reconnects, rather than
+            # the stream failing on them until the client leaves.
             print(f"SSE Error: {e}")
-        finally:
-            for conn in connections.all():
-                conn.close()
+            close_old_connections()
+            return [": heartbeat\n\n"]
 
-    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
-    response["Cache-Control"] = "no-cache"
-    response["X-Accel-Buffering"] = "no"
-    return response
+        events = [
+            "data: " + json.dumps({
+                "id": alert.id,
+                "message": alert.message,
+                "symbol": alert.symbol or "N/A",
+                "triggered_at": alert.triggered_at.isoformat(),
+                "source": alert.alert_source
+            }) + "\n\n"
+            for alert in alerts
+        ]
+        return events + [": heartbeat\n\n"]
 
+    return sse_stream_response(request, poll, f"alerts for {external_user_id}")
 
 
 def sse_file_updates(request, pk):
     """
     Handles live updates for file associations using Redis cache.
     """
-    def event_stream():
-        last_version = None
-        error_count = 0
+    last_version = None
+    error_count = 0
+
+    def poll():
+        nonlocal last_version, error_count
+        if error_count >= 3:
+            return None
         try:
-            while True:
-                time.sleep(2)
-                try:
-                    version = cache.get(f"fa_version_{pk}", default=None)
-                    
-                    if version is not None and version != last_version:
-                        payload = cache.get(f"fa_data_{pk}")
-                        if payload:
-                            last_version = version
-                            yield f"data: {json.dumps(payload)}\n\n"
-                            error_count = 0
-                except Exception as e:
-                    print(f"Redis error in file SSE: {e}")
-                    error_count += 1
-                    if error_count >= 3:
-                        yield "data: {\"error\": \"Live updates unavailable\"}\n\n"
-                        break
-        except GeneratorExit:
-            print(f"File SSE disconnected for PK {pk}")
+            version = cache.get(f"fa_version_{pk}", default=None)
+            if version is None or version == last_version:
+                return []
+
+            snapshot = bulk_cache.get(snapshot_key(pk))
+            if snapshot and snapshot["data_version"] == version:
+                last_version, error_count = version, 0
+                return [b"data: " + snapshot["body"] + b"\n\n"]
+
+            payload = bulk_cache.get(f"fa_data_{pk}")
+            if payload:
+                last_version, error_count = version, 0
+                return [f"data: {json.dumps(payload)}\n\n"]
+            return []
+        except Exception as e:
+            print(f"Redis error in file SSE: {e}")
+            error_count += 1
+            if error_count >= 3:
+                return ["data: {\"error\": \"Live updates unavailable\"}\n\n"]
+            return []
 
-    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
-    response["Cache-Control"] = "no-cache"
-    response["X-Accel-Buffering"] = "no"
-    return response
\ No newline at end of file
+    return sse_stream_response(request, poll, f"file {pk}")
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint. Requires `Authorization: Bearer <METRICS_TOKEN>`;
+    with no token configured it only answers when DEBUG is on.
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if not token and not settings.DEBUG:
+        return HttpResponse(status=403)
+    if token and request.META.get("HTTP_AUTHORIZATION") != f"Bearer {token}":
+        return HttpResponse(status=401)
+
+    freshness_rows = FileAssociation.objects.values_list("id", "file_name", "last_fetched_at")
+    return HttpResponse(render_prometheus(freshness_rows), content_type="text/plain; version=0.0.4")
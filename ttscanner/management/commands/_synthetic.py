@@ -0,0 +1,110 @@
+import csv
+import io
+import random
+
+# Synthetic files shaped like the real FTP exports, for the bench_* commands.
+# Everything is driven by a seeded Random so runs on different commits see
+# identical data.
+
+HEADERS = {
+    "TTScanner": [
+        "Sym/Int", "Direction", "Bars Since Entry", "Entry Price", "Stop Price", "Last",
+        "Profit", "Profit %", "Target #1", "Target #2", "Profit Factor",
+    ],
+    "FSOptions": [
+        "Sym/Int", "Last Price", "Trend Dir", "Call Level", "Put Level", "Call Strike", "Put Strike",
+    ],
+    "MENTFib": [
+        "Symbol/Interval", "Last Price", "Fib Pivot Trend", "Fib Price Range Trend",
+        "Bull Fib Trigger Level", "Bull Zone 1", "Bull Zone 2", "Bull Zone 3",
+        "Bear Fib Trigger Level", "Bear Zone 1", "Bear Zone 2", "Bear Zone 3",
+    ],
+}
+
+# Numeric columns global/custom alerts are created on.
+ALERT_FIELDS = {
+    "TTScanner": ["Last", "Profit %", "Stop Price"],
+    "FSOptions": ["Last Price", "Call Level", "Put Level"],
+    "MENTFib": ["Last Price", "Bull Zone 1", "Bear Zone 1"],
+}
+
+
+def symbol(i):
+    return f"SYM{i:04d} 5"
+
+
+def ttscanner_row(rnd, i):
+    roll = rnd.random()
+    direction = "FLAT" if roll < 0.05 else rnd.choice(["LONG", "SHORT"])
+    price = round(rnd.uniform(5, 500), 2)
+    return {
+        "Sym/Int": symbol(i),
+        "Direction": direction,
+        "Bars Since Entry": "NEW" if 0.05 <= roll < 0.15 else str(rnd.randint(1, 80)),
+        "Entry Price": str(price),
+        "Stop Price": str(round(price * 0.97, 2)),
+        "Last": str(round(price * rnd.uniform(0.95, 1.05), 2)),
+        "Profit": str(round(rnd.uniform(-50, 50), 2)),
+        "Profit %": str(round(rnd.uniform(-5, 5), 2)),
+        "Target #1": str(round(price * 1.02, 2)) if rnd.random() < 0.3 else "",
+        "Target #2": str(round(price * 1.04, 2)) if rnd.random() < 0.15 else "",
+        "Profit Factor": str(round(rnd.uniform(0.5, 3), 2)),
+    }
+
+
+def fsoptions_row(rnd, i):
+    price = round(rnd.uniform(5, 500), 2)
+    return {
+        "Sym/Int": symbol(i),
+        "Last Price": str(price),
+        "Trend Dir": rnd.choice(["UP", "DOWN", "SIDEWAYS"]),
+        "Call Level": str(round(price * 1.03, 2)),
+        "Put Level": str(round(price * 0.97, 2)),
+        "Call Strike": str(round(price * 1.05)),
+        "Put Strike": str(round(price * 0.95)),
+    }
+
+
+def mentfib_row(rnd, i):
+    price = round(rnd.uniform(5, 500), 2)
+    row = {
+        "Symbol/Interval": symbol(i),
+        "Last Price": str(price),
+        "Fib Pivot Trend": rnd.choice(["BULLISH", "BEARISH"]),
+        "Fib Price Range Trend": rnd.choice(["Normal Range", "Contraction", "Expansion"]),
+        "Bull Fib Trigger Level": str(round(price * 0.998, 2)),
+        "Bear Fib Trigger Level": str(round(price * 1.002, 2)),
+    }
+    for zone, factor in ((1, 1.0), (2, 1.01), (3, 0.99)):
+        row[f"Bull Zone {zone}"] = str(round(price * factor * rnd.uniform(0.995, 1.005), 2))
+        row[f"Bear Zone {zone}"] = str(round(price * (2 - factor) * rnd.uniform(0.995, 1.005), 2))
+    return row
+
+
+ROW_BUILDERS = {"TTScanner": ttscanner_row, "FSOptions": fsoptions_row, "MENTFib": mentfib_row}
+
+
+def synthetic_rows(algo, count, seed=7):
+    rnd = random.Random(seed)
+    build = ROW_BUILDERS[algo]
+    return [build(rnd, i) for i in range(count)]
+
+
+def churn_rows(algo, rows, rate, rnd):
+    """
+    Regenerate `rate` of the rows in place (same symbol, new values), the way
+    a live export changes between fetches.
+    """
+    build = ROW_BUILDERS[algo]
+    changed = rnd.sample(range(len(rows)), k=min(len(rows), round(len(rows) * rate)))
+    for i in changed:
+        rows[i] = build(rnd, i)
+    return len(changed)
+
+
+def to_csv_bytes(algo, rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=HEADERS[algo])
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
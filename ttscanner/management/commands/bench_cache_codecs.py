@@ -0,0 +1,72 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+from ttscanner.models import MainData
+
+
+class Command(BaseCommand):
+    help = "Benchmark bulk-cache serializer/compressor combinations on stored file payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file-id", type=int, action="append", dest="file_ids",
+                            help="FileAssociation id(s) to benchmark. Defaults to every TTScanner file.")
+        parser.add_argument("--repeat", type=int, default=20,
+                            help="Encode/decode rounds per combination.")
+
+    def handle(self, *args, **options):
+        qs = MainData.objects.select_related("file_association")
+        if options["file_ids"]:
+            qs = qs.filter(file_association_id__in=options["file_ids"])
+        else:
+            qs = qs.filter(file_association__algo_name_copy__iexact="TTScanner")
+
+        payloads = [
+            {
+                "file_association_id": md.file_association_id,
+                "data_version": md.file_association.data_version,
+                "headers": md.data_json.get("headers", []),
+                "rows": md.data_json.get("rows", []),
+            }
+            for md in qs
+        ]
+        if not payloads:
+            raise CommandError("No MainData payloads found to benchmark.")
+
+        repeat = max(options["repeat"], 1)
+        total_rows = sum(len(p["rows"]) for p in payloads)
+        self.stdout.write(f"{len(payloads)} payload(s), {total_rows} rows, {repeat} rounds\n")
+        self.stdout.write(f"{'serializer':<10} {'compressor':<10} {'bytes':>12} {'ratio':>7} {'encode ms':>10} {'decode ms':>10}")
+
+        baseline = None
+        for ser_name, ser_path in settings.BULK_CACHE_SERIALIZERS.items():
+            for comp_name, comp_path in settings.BULK_CACHE_COMPRESSORS.items():
+                try:
+                    serializer = import_string(ser_path)(options={})
+                    compressor = import_string(comp_path)(options={})
+                except ImportError as e:
+                    self.stdout.write(f"{ser_name:<10} {comp_name:<10} skipped ({e.name} not installed)")
+                    continue
+
+                size, encode_s, decode_s = self.measure(serializer, compressor, payloads, repeat)
+                if baseline is None:
+                    baseline = size
+                self.stdout.write(
+                    f"{ser_name:<10} {comp_name:<10} {size:>12} {baseline / size:>6.2f}x "
+                    f"{encode_s * 1000:>10.2f} {decode_s * 1000:>10.2f}"
+                )
+
+    def measure(self, serializer, compressor, payloads, repeat):
+        size = 0
+        encode_s = decode_s = 0.0
+        for payload in payloads:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                blob = compressor.compress(serializer.dumps(payload))
+                encode_s += time.perf_counter() - start
+
+                start = time.perf_counter()
+                serializer.loads(compressor.decompress(blob))
+                decode_s += time.perf_counter() - start
+            size += len(blob)
+        return size, encode_s / repeat, decode_s / repeat
@@ -0,0 +1,69 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.db.backends.signals import connection_created
+from ttscanner.models import GlobalAlertRule
+from .bench_pipeline import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure per-request database connection overhead: a new connection per request "
+        "(CONN_MAX_AGE=0) against persistent, health-checked connections."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Simulated requests per mode.")
+        parser.add_argument("--max-age", type=int, default=300,
+                            help="CONN_MAX_AGE for the persistent mode when settings have it at 0.")
+
+    def handle(self, *args, **options):
+        settings_dict = connection.settings_dict
+        configured = settings_dict["CONN_MAX_AGE"]
+        persistent_age = configured or options["max_age"]
+
+        self.stdout.write(
+            f"{connection.vendor} ({settings_dict['ENGINE']}), CONN_HEALTH_CHECKS="
+            f"{settings_dict['CONN_HEALTH_CHECKS']}, {options['requests']} requests per mode"
+        )
+        self.stdout.write(f"\n{'mode':<22} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8} {'connects':>9}")
+        try:
+            for label, max_age in (("per-request (age 0)", 0), (f"persistent (age {persistent_age})", persistent_age)):
+                samples, connects = self.measure(max_age, options["requests"])
+                self.stdout.write(
+                    f"{label:<22} {percentile(samples, 50):>8.3f} {percentile(samples, 99):>8.3f} "
+                    f"{statistics.fmean(samples):>8.3f} {connects:>9}"
+                )
+        finally:
+            settings_dict["CONN_MAX_AGE"] = configured
+            connection.close()
+
+    def measure(self, max_age, requests):
+        """
+        Run one query per simulated request, with the request_started and
+        request_finished signals that open and close connections around a real
+        request.
+        """
+        connection.settings_dict["CONN_MAX_AGE"] = max_age
+        connection.close()
+
+        connects = 0
+
+        def count(**kwargs):
+            nonlocal connects
+            connects += 1
+
+        connection_created.connect(count)
+        samples = []
+        try:
+            for _ in range(requests):
+                start = time.perf_counter()
+                request_started.send(sender=self.__class__)
+                GlobalAlertRule.objects.count()
+                request_finished.send(sender=self.__class__)
+                samples.append((time.perf_counter() - start) * 1000)
+        finally:
+            connection_created.disconnect(count)
+        return samples, connects
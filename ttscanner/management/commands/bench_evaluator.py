@@ -0,0 +1,103 @@
+import contextlib
+import json
+import logging
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from ttscanner.engine.evaluator import detect_flat_trade, detect_new_trade, detect_target_hit, resolve_fields
+from ttscanner.models import SymbolState
+from ._synthetic import HEADERS, synthetic_rows
+from .bench_pipeline import git_commit, percentile
+
+
+class Command(BaseCommand):
+    help = "Benchmark system-alert detector throughput (rows/s) on synthetic TTScanner rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500, help="Rows per file.")
+        parser.add_argument("--repeat", type=int, default=20, help="Evaluation rounds.")
+        parser.add_argument("--log-level", default="INFO",
+                            help="Level for the ttscanner loggers while measuring (output is discarded).")
+        parser.add_argument("--json", dest="json_path", help="Write results to this file.")
+        parser.add_argument("--compare", dest="baseline_path",
+                            help="Results file from an earlier run (another commit or --log-level); "
+                                 "exit non-zero if this run is slower.")
+        parser.add_argument("--tolerance", type=float, default=0.25,
+                            help="Allowed p50 slowdown against --compare (0.25 = 25%%).")
+
+    def handle(self, *args, **options):
+        rows = synthetic_rows("TTScanner", options["rows"])
+        prev_rows = [dict(row, Direction="LONG") for row in rows]
+        repeat = max(options["repeat"], 1)
+
+        # Log records and prints are formatted and written as in production,
+        # just to /dev/null so the terminal doesn't dominate the timing.
+        engine_logger = logging.getLogger("ttscanner")
+        level, propagate, handlers = engine_logger.level, engine_logger.propagate, engine_logger.handlers
+        devnull = open(os.devnull, "w")
+        engine_logger.handlers = [logging.StreamHandler(devnull)]
+        engine_logger.setLevel(options["log_level"].upper())
+        engine_logger.propagate = False
+
+        try:
+            with contextlib.redirect_stdout(devnull):
+                samples = self.measure(rows, prev_rows, repeat)
+        finally:
+            engine_logger.handlers, engine_logger.propagate = handlers, propagate
+            engine_logger.setLevel(level)
+            devnull.close()
+
+        p50_ms = percentile(samples, 50) * 1000
+        report = {
+            "commit": git_commit(),
+            "log_level": options["log_level"].upper(),
+            "params": {"rows": len(rows), "repeat": repeat},
+            "results": {
+                "p50_ms": round(p50_ms, 3),
+                "min_ms": round(min(samples) * 1000, 3),
+                "rows_per_s": round(len(rows) / (p50_ms / 1000)) if p50_ms else None,
+            },
+        }
+        self.stdout.write(
+            f"{len(rows)} rows x {repeat} rounds at {report['log_level']}: "
+            f"{report['results']['rows_per_s'] or 0:,} rows/s ({p50_ms:.2f} ms per file, p50)"
+        )
+
+        if options["json_path"]:
+            with open(options["json_path"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {options['json_path']}")
+
+        if options["baseline_path"]:
+            self.compare(report, options["baseline_path"], options["tolerance"])
+
+    def compare(self, report, baseline_path, tolerance):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if baseline.get("params") != report["params"]:
+            raise CommandError("Baseline was recorded with different parameters; results are not comparable.")
+
+        old_ms, new_ms = baseline["results"]["p50_ms"], report["results"]["p50_ms"]
+        ratio = new_ms / old_ms if old_ms else 1.0
+        self.stdout.write(
+            f"Against {baseline.get('commit') or baseline_path} at {baseline.get('log_level', '?')}: "
+            f"p50 {old_ms} -> {new_ms} ms ({ratio:.2f}x)"
+        )
+        if ratio > 1 + tolerance:
+            raise CommandError(f"Performance regression: p50 {old_ms} -> {new_ms} ms per file")
+
+    def measure(self, rows, prev_rows, repeat):
+        """Seconds per round (one pass of every detector over the file)."""
+        # Resolved once per header row, as the file's schema does in production.
+        fields = resolve_fields(HEADERS["TTScanner"])
+        samples = []
+        for _ in range(repeat):
+            states = [SymbolState(symbol=str(i)) for i in range(len(rows))]
+            fired_map = {}
+            start = time.perf_counter()
+            for row, prev_row, state in zip(rows, prev_rows, states):
+                detect_flat_trade(row, prev_row, fired_map, None, fields, fields)
+                detect_new_trade(row, fired_map, None, fields)
+                detect_target_hit(row, state, fired_map, None, fields)
+            samples.append(time.perf_counter() - start)
+        return samples
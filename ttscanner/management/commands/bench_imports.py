@@ -0,0 +1,100 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What each process type imports before it can serve its first request/task.
+TARGETS = {
+    "web": (
+        "import ttscanner_backend.asgi\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns\n"
+    ),
+    "worker": (
+        "import django\n"
+        "django.setup()\n"
+        "from ttscanner_backend.celery import app\n"
+        "app.loader.import_default_modules()\n"
+    ),
+}
+
+# Heavy optional modules that should only load when a code path needs them.
+WATCHED = ("twilio", "bs4", "pandas", "numpy", "lxml")
+
+
+def parse_importtime(stderr):
+    """Parse `-X importtime` output into (name, self_us, cumulative_us, depth) tuples."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+class Command(BaseCommand):
+    help = (
+        "Import-time audit: cold-start time of the web and worker processes, using a "
+        "fresh interpreter with -X importtime for each run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", action="append", dest="targets", choices=list(TARGETS),
+                            help="Process type(s) to measure. Defaults to all.")
+        parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per target.")
+        parser.add_argument("--top", type=int, default=15, help="Slowest modules to list.")
+        parser.add_argument("--json", dest="json_path", help="Write results to this file.")
+
+    def handle(self, *args, **options):
+        results = {}
+        for target in options["targets"] or list(TARGETS):
+            results[target] = self.measure(target, max(options["runs"], 1), options["top"])
+            self.print_result(target, results[target])
+
+        if options["json_path"]:
+            with open(options["json_path"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"\nResults written to {options['json_path']}")
+
+    def measure(self, target, runs, top):
+        wall_ms, import_ms, entries = [], [], []
+        for _ in range(runs):
+            start = time.perf_counter()
+            proc = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", TARGETS[target]],
+                cwd=settings.BASE_DIR, capture_output=True, text=True
+            )
+            wall_ms.append((time.perf_counter() - start) * 1000)
+            if proc.returncode:
+                raise CommandError(f"{target} startup failed:\n{proc.stderr[-2000:]}")
+            entries = parse_importtime(proc.stderr)
+            import_ms.append(sum(cumulative for _, _, cumulative, depth in entries if depth == 0) / 1000)
+
+        # Module breakdown from the last run; timings are from all of them.
+        slowest = sorted(entries, key=lambda e: e[2], reverse=True)[:top]
+        loaded = {name.split(".")[0] for name, _, _, _ in entries}
+        return {
+            "wall_ms": round(statistics.median(wall_ms), 1),
+            "import_ms": round(statistics.median(import_ms), 1),
+            "modules": len(entries),
+            "watched_loaded": sorted(loaded.intersection(WATCHED)),
+            "slowest": [
+                {"module": name, "cumulative_ms": round(cumulative / 1000, 1), "self_ms": round(self_us / 1000, 1)}
+                for name, self_us, cumulative, _ in slowest
+            ],
+        }
+
+    def print_result(self, target, result):
+        self.stdout.write(
+            f"\n{target}: {result['wall_ms']} ms to start (median), {result['import_ms']} ms importing "
+            f"{result['modules']} modules"
+        )
+        self.stdout.write(f"  heavy modules loaded at startup: {', '.join(result['watched_loaded']) or 'none'}")
+        self.stdout.write(f"  {'module':<50} {'cumul ms':>9} {'self ms':>8}")
+        for entry in result["slowest"]:
+            self.stdout.write(f"  {entry['module']:<50} {entry['cumulative_ms']:>9} {entry['self_ms']:>8}")
@@ -0,0 +1,276 @@
+import contextlib
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import time
+import uuid
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+from django.test.utils import override_settings
+from ttscanner.models import (
+    Algo, Group, Interval, FileAssociation, MENTUser, UserSettings,
+    GlobalAlertRule, CustomAlert
+)
+from ttscanner.tasks import load_file_rows, evaluate_alert_shard_rows, deliver_alerts
+from ttscanner.utils.csv_utils import compute_hash_bytes, store_csv_data
+from ._synthetic import HEADERS, ALERT_FIELDS, synthetic_rows, churn_rows, to_csv_bytes
+
+STAGES = ("ingest", "load", "evaluate", "deliver", "total")
+ROW_STAGES = ("ingest", "evaluate", "total")
+# Stages faster than this are too noisy to compare by ratio.
+MIN_COMPARABLE_MS = 1.0
+
+# Caches and mail are swapped for in-process ones unless --real-services is
+# given, so a benchmark run never writes to Redis or sends anything.
+LOCAL_SERVICES = {
+    "CACHES": {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "bench-default"},
+        "bulk": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "bench-bulk"},
+    },
+    "EMAIL_BACKEND": "django.core.mail.backends.locmem.EmailBackend",
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+@contextlib.contextmanager
+def count_queries(counts, key):
+    """Count queries run in the block into counts[key] (no query log, so no 9000-query cap)."""
+    def wrapper(execute, sql, params, many, context):
+        counts[key] += 1
+        return execute(sql, params, many, context)
+    counts[key] = 0
+    with connection.execute_wrapper(wrapper):
+        yield
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "End-to-end benchmark of ingest -> evaluate -> deliver on synthetic files. "
+        "Runs against the configured database inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--algo", action="append", dest="algos", choices=list(HEADERS),
+                            help="File type(s) to benchmark. Defaults to all.")
+        parser.add_argument("--rows", type=int, default=500, help="Rows per file.")
+        parser.add_argument("--rounds", type=int, default=10, help="Fetches per file.")
+        parser.add_argument("--churn", type=float, default=0.1,
+                            help="Fraction of rows that change between fetches.")
+        parser.add_argument("--alerts", type=int, default=200, help="Global alerts per file.")
+        parser.add_argument("--custom-alerts", type=int, default=200, help="Custom alerts per file.")
+        parser.add_argument("--users", type=int, default=5, help="Users receiving email/SMS.")
+        parser.add_argument("--seed", type=int, default=7)
+        parser.add_argument("--json", dest="json_path", help="Write results to this file.")
+        parser.add_argument("--compare", dest="baseline_path",
+                            help="Results file from an earlier run; exit non-zero on regressions.")
+        parser.add_argument("--tolerance", type=float, default=0.25,
+                            help="Allowed p50 slowdown against --compare (0.25 = 25%%).")
+        parser.add_argument("--real-services", action="store_true",
+                            help="Use the configured caches and email backend instead of in-process ones.")
+
+    def handle(self, *args, **options):
+        algos = options["algos"] or list(HEADERS)
+        params = {
+            k: options[k] for k in ("rows", "rounds", "churn", "alerts", "custom_alerts", "users", "seed")
+        }
+
+        services = contextlib.nullcontext() if options["real_services"] else override_settings(**LOCAL_SERVICES)
+        with services, self.quiet():
+            results = {algo: self.run_algo(algo, params) for algo in algos}
+
+        report = {
+            "commit": git_commit(),
+            "database": connection.vendor,
+            "params": params,
+            "results": results,
+        }
+        self.print_report(report)
+
+        if options["json_path"]:
+            with open(options["json_path"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"\nResults written to {options['json_path']}")
+
+        if options["baseline_path"]:
+            self.compare(report, options["baseline_path"], options["tolerance"])
+
+    @contextlib.contextmanager
+    def quiet(self):
+        """Send prints and ttscanner log output to /dev/null while measuring."""
+        app_logger = logging.getLogger("ttscanner")
+        handlers, propagate = app_logger.handlers, app_logger.propagate
+        with open(os.devnull, "w") as devnull:
+            app_logger.handlers, app_logger.propagate = [logging.StreamHandler(devnull)], False
+            try:
+                with contextlib.redirect_stdout(devnull):
+                    yield
+            finally:
+                app_logger.handlers, app_logger.propagate = handlers, propagate
+
+    def run_algo(self, algo, params):
+        samples = {stage: [] for stage in STAGES}
+        queries = {stage: [] for stage in STAGES}
+        triggered = 0
+
+        try:
+            with transaction.atomic():
+                fa = self.create_fixtures(algo, params)
+                rnd = random.Random(params["seed"])
+                rows = synthetic_rows(algo, params["rows"], seed=params["seed"])
+
+                for round_no in range(params["rounds"]):
+                    if round_no:
+                        churn_rows(algo, rows, params["churn"], rnd)
+                    csv_bytes = to_csv_bytes(algo, rows)
+
+                    counts = {}
+                    round_start = time.perf_counter()
+                    with count_queries(counts, "total"):
+                        with self.stage("ingest", samples, counts):
+                            store_csv_data(fa, csv_bytes, compute_hash_bytes(csv_bytes))
+                            FileAssociation.objects.filter(id=fa.id).update(data_version=F("data_version") + 1)
+                            fa.refresh_from_db(fields=["data_version"])
+
+                        with self.stage("load", samples, counts):
+                            stored_rows = load_file_rows(fa)
+
+                        with self.stage("evaluate", samples, counts):
+                            alerts = evaluate_alert_shard_rows(fa, stored_rows, 0, 1)
+
+                        with self.stage("deliver", samples, counts):
+                            deliver_alerts(fa, alerts)
+
+                    samples["total"].append((time.perf_counter() - round_start) * 1000)
+                    for stage in STAGES:
+                        queries[stage].append(counts[stage])
+                    triggered += len(alerts)
+                raise Rollback
+        except Rollback:
+            pass
+
+        result = {"alerts_triggered": triggered}
+        for stage in STAGES:
+            ms = samples[stage]
+            mean_ms = statistics.fmean(ms)
+            result[stage] = {
+                "p50_ms": round(percentile(ms, 50), 2),
+                "p99_ms": round(percentile(ms, 99), 2),
+                "mean_ms": round(mean_ms, 2),
+                "rows_per_s": round(params["rows"] / (mean_ms / 1000)) if stage in ROW_STAGES and mean_ms else None,
+                "queries": round(statistics.fmean(queries[stage]), 1),
+            }
+        return result
+
+    @contextlib.contextmanager
+    def stage(self, name, samples, counts):
+        with count_queries(counts, name):
+            start = time.perf_counter()
+            yield
+            samples[name].append((time.perf_counter() - start) * 1000)
+
+    def create_fixtures(self, algo, params):
+        rnd = random.Random(params["seed"])
+        suffix = uuid.uuid4().hex[:8]
+
+        algo_obj, _ = Algo.objects.get_or_create(algo_name=algo)
+        group = Group.objects.create(group_name=f"bench-{suffix}")
+        interval, _ = Interval.objects.get_or_create(interval_name="5min")
+        fa = FileAssociation.objects.create(algo=algo_obj, group=group, interval=interval, file_path=f"bench/{suffix}.csv")
+
+        base_id = 2_000_000_000 + rnd.randrange(100_000_000)
+        users = []
+        for i in range(params["users"]):
+            user = MENTUser.objects.create(
+                external_user_id=base_id + i, username=f"bench-{suffix}-{i}", role="regular",
+                email=f"bench{i}@example.com", phone=f"+1555000{i:04d}"
+            )
+            UserSettings.objects.create(user=user, delivery_methods=["all"])
+            users.append(user)
+
+        conditions = ["change", "increase", "decrease", "threshold_cross"]
+        combos = [(f"SYM{i:04d} 5", field) for i in range(params["rows"]) for field in ALERT_FIELDS[algo]]
+
+        def build(model, count, **extra):
+            alerts = []
+            for index, (symbol_interval, field_name) in enumerate(rnd.sample(combos, min(count, len(combos)))):
+                alert = model(
+                    file_association=fa, symbol_interval=symbol_interval, field_name=field_name,
+                    condition_type=rnd.choice(conditions), compare_value=str(round(rnd.uniform(5, 500), 2)),
+                    **{k: v(index) for k, v in extra.items()}
+                )
+                alert.normalize_keys()
+                alerts.append(alert)
+            model.objects.bulk_create(alerts)
+
+        build(GlobalAlertRule, params["alerts"])
+        if users:
+            build(CustomAlert, params["custom_alerts"], user=lambda index: users[index % len(users)])
+        return fa
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"commit {report['commit'] or '?'} on {report['database']} | "
+            + ", ".join(f"{k}={v}" for k, v in report["params"].items())
+        )
+        header = f"{'file':<10} {'stage':<9} {'p50 ms':>9} {'p99 ms':>9} {'rows/s':>10} {'queries':>8}"
+        for algo, result in report["results"].items():
+            self.stdout.write(f"\n{header}")
+            for stage in STAGES:
+                r = result[stage]
+                rows_per_s = f"{r['rows_per_s']:,}" if r["rows_per_s"] else "-"
+                self.stdout.write(
+                    f"{algo:<10} {stage:<9} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+                    f"{rows_per_s:>10} {r['queries']:>8}"
+                )
+            self.stdout.write(f"{algo:<10} {result['alerts_triggered']} alerts triggered")
+
+    def compare(self, report, baseline_path, tolerance):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if baseline.get("params") != report["params"]:
+            raise CommandError("Baseline was recorded with different parameters; results are not comparable.")
+
+        regressions = []
+        self.stdout.write(f"\nAgainst {baseline.get('commit') or baseline_path}:")
+        for algo, result in report["results"].items():
+            old = baseline["results"].get(algo)
+            if not old:
+                continue
+            for stage in STAGES:
+                new_r, old_r = result[stage], old[stage]
+                ratio = new_r["p50_ms"] / old_r["p50_ms"] if old_r["p50_ms"] else 1.0
+                self.stdout.write(
+                    f"{algo:<10} {stage:<9} p50 {ratio:>6.2f}x  queries {old_r['queries']} -> {new_r['queries']}"
+                )
+                if ratio > 1 + tolerance and old_r["p50_ms"] >= MIN_COMPARABLE_MS:
+                    regressions.append(f"{algo} {stage}: p50 {old_r['p50_ms']} -> {new_r['p50_ms']} ms")
+                if new_r["queries"] > old_r["queries"]:
+                    regressions.append(f"{algo} {stage}: queries {old_r['queries']} -> {new_r['queries']}")
+
+        if regressions:
+            raise CommandError("Performance regressions:\n  " + "\n  ".join(regressions))
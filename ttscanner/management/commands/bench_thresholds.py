@@ -0,0 +1,102 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from ttscanner.engine.conditions import NUMERIC_CONDITIONS, numeric_trigger, numeric_triggers
+from ttscanner.engine.rows import FileRows, gather_numbers, row_number
+from ttscanner.models import GlobalAlertRule
+from ttscanner.tasks import should_trigger
+from ._synthetic import HEADERS, ALERT_FIELDS, synthetic_rows
+
+
+def build_alerts(rows, algo, count, rnd):
+    """Unsaved alerts on random rows/fields, thresholds near the current value, some without a last value."""
+    alerts = []
+    for _ in range(count):
+        position = rnd.randrange(len(rows))
+        field = rnd.choice(ALERT_FIELDS[algo])
+        current = row_number(rows[position], field) or 1.0
+        alert = GlobalAlertRule(
+            symbol_interval=rows[position][HEADERS[algo][0]], field_name=field,
+            condition_type=rnd.choice(NUMERIC_CONDITIONS),
+            # Mixed precision, so thresholds like "9.5" and "10" both occur.
+            compare_value=f"{current * rnd.uniform(0.8, 1.2):.{rnd.choice([0, 1, 2])}f}",
+            last_value=None if rnd.random() < 0.1 else f"{current * rnd.uniform(0.8, 1.2):.2f}",
+        )
+        alert.normalize_keys()
+        alerts.append((alert, position, field))
+    return alerts
+
+
+class Command(BaseCommand):
+    help = (
+        "Correctness and speed of global/custom threshold evaluation on synthetic rows: "
+        "the vectorized numeric pass against the scalar numeric rule, and how often the "
+        "old string comparison disagreed with the numbers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--algo", choices=list(HEADERS), default="FSOptions")
+        parser.add_argument("--rows", type=int, default=2000, help="Rows in the file.")
+        parser.add_argument("--alerts", type=int, default=20000, help="Numeric alerts to evaluate.")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per method (median reported).")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options["seed"])
+        rows = FileRows(synthetic_rows(options["algo"], options["rows"], seed=options["seed"]))
+        alerts = build_alerts(rows, options["algo"], options["alerts"], rnd)
+
+        def string_rule():
+            return [should_trigger(alert, rows[position][field]) for alert, position, field in alerts]
+
+        def scalar_numeric():
+            return [
+                numeric_trigger(alert.condition_type, row_number(rows[position], field),
+                                alert.last_number, alert.compare_number)
+                for alert, position, field in alerts
+            ]
+
+        def vectorized():
+            conditions, cells, previous, thresholds = [], [], [], []
+            for alert, position, field in alerts:
+                conditions.append(alert.condition_type)
+                cells.append((position, field))
+                previous.append(alert.last_number)
+                thresholds.append(alert.compare_number)
+            return numeric_triggers(conditions, gather_numbers(rows, cells), previous, thresholds).tolist()
+
+        results, timings = {}, {}
+        for name, method in (("string (old)", string_rule), ("numeric scalar", scalar_numeric),
+                             ("numeric vectorized", vectorized)):
+            runs = []
+            for _ in range(max(options["repeat"], 1)):
+                start = time.perf_counter()
+                results[name] = method()
+                runs.append((time.perf_counter() - start) * 1000)
+            timings[name] = statistics.median(runs)
+
+        mismatches = sum(a != b for a, b in zip(results["numeric scalar"], results["numeric vectorized"]))
+        if mismatches:
+            raise CommandError(f"Vectorized evaluation disagrees with the scalar rule on {mismatches} alert(s)")
+
+        wrong = [
+            (alert, rows[position][field])
+            for (alert, position, field), old, new in zip(alerts, results["string (old)"], results["numeric scalar"])
+            if old != new
+        ]
+
+        count = len(alerts)
+        self.stdout.write(f"{count:,} numeric alerts on {len(rows):,} {options['algo']} rows")
+        self.stdout.write(f"  {'method':<20} {'ms':>9} {'alerts/s':>13} {'triggered':>10}")
+        for name, ms in timings.items():
+            self.stdout.write(
+                f"  {name:<20} {ms:>9.2f} {count / (ms / 1000):>13,.0f} {sum(results[name]):>10,}"
+            )
+        self.stdout.write(f"\nVectorized matches the scalar numeric rule on all {count:,} alerts.")
+        self.stdout.write(f"The string comparison decided {len(wrong):,} alert(s) differently, e.g.:")
+        for alert, value in wrong[:5]:
+            self.stdout.write(
+                f"  {alert.condition_type:<15} value {value!r:>10} vs compare {alert.compare_value!r:>8} "
+                f"(last {alert.last_value!r})"
+            )
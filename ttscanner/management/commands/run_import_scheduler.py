@@ -0,0 +1,84 @@
+import heapq
+import logging
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from ttscanner.tasks import scheduled_files, next_due_at, enqueue_import
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(failures):
+    """Seconds to wait after `failures` consecutive failures (exponential, capped)."""
+    return min(settings.SCHEDULER_RETRY_SECONDS * 2 ** (failures - 1), settings.SCHEDULER_MAX_RETRY_SECONDS)
+
+
+class Command(BaseCommand):
+    help = "Queue file imports as they fall due, sleeping until the next deadline."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--refresh", type=float, default=60.0,
+                            help="Seconds between reloads of the file list (new files, interval changes).")
+        parser.add_argument("--once", action="store_true",
+                            help="Queue whatever is due now and exit.")
+
+    def handle(self, *args, **options):
+        refresh = max(options["refresh"], 1.0)
+        heap, files = [], {}
+        next_refresh = 0.0
+        # This loop is the only thing that queues imports, so a database or
+        # broker outage is logged and retried rather than ending the process.
+        refresh_failures = enqueue_failures = 0
+
+        while True:
+            now = time.time()
+            if now >= next_refresh:
+                try:
+                    heap, files = self.load(now)
+                except Exception:
+                    refresh_failures += 1
+                    delay = retry_delay(refresh_failures)
+                    logger.exception("[SCHEDULER] Reloading the file list failed; keeping %s files, retrying in %ss",
+                                     len(files), delay)
+                    next_refresh = now + delay
+                else:
+                    refresh_failures = 0
+                    next_refresh = now + refresh
+
+            while heap and heap[0][0] <= now:
+                _, file_id = heapq.heappop(heap)
+                fa = files[file_id]
+                try:
+                    queued = enqueue_import(fa)
+                except Exception:
+                    # Never drop the file: put it back with a short delay.
+                    enqueue_failures += 1
+                    delay = retry_delay(enqueue_failures)
+                    logger.exception("[SCHEDULER] Queueing %s failed; retrying in %ss", fa.file_name, delay)
+                    heapq.heappush(heap, (now + delay, file_id))
+                    continue
+                enqueue_failures = 0
+                if queued:
+                    logger.info("[SCHEDULER] Queued import for %s", fa.file_name)
+                else:
+                    logger.info("[SCHEDULER] %s → import already in flight", fa.file_name)
+                heapq.heappush(heap, (next_due_at(fa, now, fetched_at=now), file_id))
+
+            if options["once"]:
+                return
+
+            wake_at = min(heap[0][0], next_refresh) if heap else next_refresh
+            time.sleep(max(wake_at - time.time(), 0.0))
+
+    def load(self, now):
+        """Rebuild the deadline heap from the database in one query."""
+        close_old_connections()
+        try:
+            files = {fa.id: fa for fa in scheduled_files()}
+        finally:
+            close_old_connections()
+
+        heap = [(next_due_at(fa, now), fa.id) for fa in files.values()]
+        heapq.heapify(heap)
+        return heap, files
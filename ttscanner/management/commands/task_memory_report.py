@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from ttscanner.utils.metrics_utils import (
+    TASK_TYPES, TASK_MEMORY, get_metrics, metric_key, task_memory_key
+)
+from ttscanner_backend.celery import app
+
+
+class Command(BaseCommand):
+    help = (
+        "Memory profile per Celery task type, from the counters workers record around "
+        "every task: how much resident memory each type leaves behind and how far it "
+        "pushes the worker's peak RSS towards worker_max_memory_per_child."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Zero the counters after printing.")
+
+    def handle(self, *args, **options):
+        names = [task_memory_key(task, field) for task in TASK_TYPES for field in TASK_MEMORY]
+        values = get_metrics(names + ["worker_processes_started"])
+        limit_kb = app.conf.worker_max_memory_per_child
+
+        self.stdout.write(
+            f"worker_max_memory_per_child: {f'{limit_kb:,} KiB' if limit_kb else 'off'} | "
+            f"worker processes started: {values['worker_processes_started']}"
+        )
+        self.stdout.write(
+            f"\n{'task':<28} {'runs':>7} {'rss growth/run':>15} {'peak raise/run':>15} {'peak raise total':>17}"
+        )
+        for task in TASK_TYPES:
+            runs = values[task_memory_key(task, "runs")]
+            growth = values[task_memory_key(task, "rss_growth_kb")]
+            peak = values[task_memory_key(task, "peak_raise_kb")]
+            per_run = (lambda kb: f"{kb / runs:,.0f} KiB") if runs else (lambda kb: "-")
+            self.stdout.write(
+                f"{task:<28} {runs:>7} {per_run(growth):>15} {per_run(peak):>15} {peak:>13,} KiB"
+            )
+
+        if options["reset"]:
+            cache.delete_many([metric_key(name) for name in names + ["worker_processes_started"]])
+            self.stdout.write("\nCounters reset.")
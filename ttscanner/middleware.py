@@ -0,0 +1,54 @@
+from django.middleware.gzip import GZipMiddleware
+from .db_router import (
+    current_read_alias, replica_alias, request_actors, is_replica_view, is_pinned, pin_to_primary
+)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZip large responses, except server-sent event streams: gzip buffers
+    output, which would hold SSE events back until the buffer fills.
+    """
+
+    def process_response(self, request, response):
+        if response.get("Content-Type", "").startswith("text/event-stream"):
+            return response
+        return super().process_response(request, response)
+
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Serve GETs of @reads_from_replica views from the read replica, unless the
+    client or user wrote something in the last REPLICA_STICKY_SECONDS, so a
+    user always reads their own changes back. Successful writes set that pin.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            token = getattr(request, "_replica_token", None)
+            if token is not None:
+                current_read_alias.reset(token)
+
+        actors = getattr(request, "_replica_actors", None)
+        if actors and request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(actors)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        alias = replica_alias()
+        if alias is None:
+            return None
+
+        request._replica_actors = request_actors(request, view_kwargs)
+        if request.method in ("GET", "HEAD") and is_replica_view(view_func) \
+                and not is_pinned(request._replica_actors):
+            request._replica_token = current_read_alias.set(alias)
+        return None
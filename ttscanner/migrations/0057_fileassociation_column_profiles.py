@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ttscanner', '0056_triggeredalert_sent_to_ui'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileassociation',
+            name='column_profiles',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
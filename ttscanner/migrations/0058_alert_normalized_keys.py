@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:25
+
+from django.db import migrations, models
+
+
+def backfill_alert_keys(apps, schema_editor):
+    """
+    Fill the normalized keys for existing alerts. Rows that already collide
+    keep their data but get an id suffix so the unique constraint can be added.
+    Custom alerts only collide with the same user's alerts.
+    """
+    for model_name, owner in (("GlobalAlertRule", None), ("CustomAlert", "user_id")):
+        model = apps.get_model("ttscanner", model_name)
+        seen = set()
+        fields = ["id", "file_association_id", "symbol_interval", "field_name"] + ([owner] if owner else [])
+        for alert in model.objects.order_by("id").only(*fields):
+            symbol_key = (alert.symbol_interval or "").strip().lower()
+            field_key = (alert.field_name or "").strip().lower()
+            key = (alert.file_association_id, getattr(alert, owner) if owner else None, symbol_key, field_key)
+            if key in seen:
+                # Same form as models.legacy_duplicate_key, which keeps it on later saves.
+                suffix = f"#{alert.id}"
+                field_key = field_key[:255 - len(suffix)] + suffix
+            seen.add(key)
+            model.objects.filter(id=alert.id).update(symbol_interval_key=symbol_key, field_name_key=field_key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ttscanner', '0057_fileassociation_column_profiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customalert',
+            name='field_name_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='customalert',
+            name='symbol_interval_key',
+            field=models.CharField(default='', editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='globalalertrule',
+            name='field_name_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='globalalertrule',
+            name='symbol_interval_key',
+            field=models.CharField(default='', editable=False, max_length=50),
+        ),
+        migrations.RunPython(backfill_alert_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='customalert',
+            constraint=models.UniqueConstraint(fields=('file_association', 'user', 'symbol_interval_key', 'field_name_key'), name='uniq_custom_alert_symbol_field'),
+        ),
+        migrations.AddConstraint(
+            model_name='globalalertrule',
+            constraint=models.UniqueConstraint(fields=('file_association', 'symbol_interval_key', 'field_name_key'), name='uniq_global_alert_symbol_field'),
+        ),
+    ]
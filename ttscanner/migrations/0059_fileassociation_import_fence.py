@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ttscanner', '0058_alert_normalized_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileassociation',
+            name='import_fence',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ttscanner', '0059_fileassociation_import_fence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='algo',
+            name='trading_session',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fileassociation',
+            name='unchanged_streak',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='trading_session',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:04
+
+from django.db import migrations, models
+
+# The signatures algo_detector.py used to hardcode. MENTFib's algo is named
+# "MENT Fibonacci" by 0039, so both names are covered.
+DEFAULT_SIGNATURES = {
+    "FSOptions": ["call level", "put level", "call strike", "put strike", "trend dir"],
+    "TTScanner": ["direction", "entry price", "stop price", "profit", "target #1"],
+    "MENTFib": ["bull zone 1", "bull zone 2", "bear zone 1", "bear zone 2", "fib pivot trend"],
+    "MENT Fibonacci": ["bull zone 1", "bull zone 2", "bear zone 1", "bear zone 2", "fib pivot trend"],
+}
+
+
+def seed_signatures(apps, schema_editor):
+    Algo = apps.get_model('ttscanner', 'Algo')
+    for algo in Algo.objects.filter(algo_name__in=DEFAULT_SIGNATURES):
+        if not algo.header_signature:
+            algo.header_signature = DEFAULT_SIGNATURES[algo.algo_name]
+            algo.save(update_fields=["header_signature"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ttscanner', '0060_adaptive_polling'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='algo',
+            name='header_signature',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(seed_signatures, migrations.RunPython.noop),
+    ]
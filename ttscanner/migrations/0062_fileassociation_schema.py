@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ttscanner', '0061_algo_header_signature'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileassociation',
+            name='header_fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='fileassociation',
+            name='schema',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:18
+
+import math
+
+from django.db import migrations, models
+
+
+def parse_number(value):
+    try:
+        number = float(str(value).replace(",", "")) if value not in (None, "") else None
+    except ValueError:
+        return None
+    return number if number is not None and math.isfinite(number) else None
+
+
+def backfill_alert_numbers(apps, schema_editor):
+    for model_name in ("GlobalAlertRule", "CustomAlert"):
+        model = apps.get_model("ttscanner", model_name)
+        alerts = list(model.objects.only("id", "compare_value", "last_value"))
+        for alert in alerts:
+            alert.compare_number = parse_number(alert.compare_value)
+            alert.last_number = parse_number(alert.last_value)
+        model.objects.bulk_update(alerts, ["compare_number", "last_number"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ttscanner', '0062_fileassociation_schema'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customalert',
+            name='compare_number',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customalert',
+            name='last_number',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='globalalertrule',
+            name='compare_number',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='globalalertrule',
+            name='last_number',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_alert_numbers, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,51 @@
 from django.db import models
-import re, json, uuid, hashlib
-from django.db import transaction
+import re, json, math, uuid, hashlib
 from django.core.exceptions import ValidationError
 from django.contrib.auth.hashers import make_password, check_password
 
+def normalize_alert_key(value) -> str:
+    """Case/whitespace-insensitive form used for alert duplicate detection."""
+    return (value or "").strip().lower()
+
+
+ALERT_KEY_MAX_LENGTH = 255
+
+
+def legacy_duplicate_key(field_key, alert_id) -> str:
+    """field_name_key that migration 0058 gave alerts duplicating an older one."""
+    suffix = f"#{alert_id}"
+    return field_key[:ALERT_KEY_MAX_LENGTH - len(suffix)] + suffix
+
+
+def alert_field_key(alert, symbol_key, field_key) -> str:
+    """
+    The alert's field_name_key. Legacy duplicates keep their #<id> suffix
+    while their symbol and column are unchanged, so editing one doesn't
+    collide with the alert it duplicates.
+    """
+    if (alert.pk and alert.field_name_key == legacy_duplicate_key(field_key, alert.pk)
+            and alert.symbol_interval_key == symbol_key):
+        return alert.field_name_key
+    return field_key
+
+
+def alert_key_changed(alert, symbol_interval, field_name) -> bool:
+    """Whether an update to (symbol_interval, field_name) moves the alert to another key."""
+    return (
+        (normalize_alert_key(symbol_interval), normalize_alert_key(field_name))
+        != (normalize_alert_key(alert.symbol_interval), normalize_alert_key(alert.field_name))
+    )
+
+
+def parse_alert_number(value):
+    """An alert's compare/last value as a float (same rule as row values), or None if it isn't a finite number."""
+    try:
+        number = float(str(value).replace(",", "")) if value not in (None, "") else None
+    except ValueError:
+        return None
+    return number if number is not None and math.isfinite(number) else None
+
+
 class MENTUser(models.Model):
     external_user_id = models.IntegerField(unique=True, db_index=True)  
     username = models.CharField(max_length=50, unique=True, null=True, blank=True, db_index=True)  
@@ -32,11 +74,26 @@ class Algo(models.Model):
     supports_direction = models.BooleanField(default=True)
     supports_volume_alerts = models.BooleanField(default=False)
     price_field_key = models.CharField(max_length=100, default="last price")
+    # Lower-case column names that identify this algo's files when detecting
+    # the algo from a CSV's header row (utils/algo_detector.py).
+    header_signature = models.JSONField(default=list, blank=True)
+    trading_session = models.JSONField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)  
 
     def __str__(self):
         return self.algo_name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .utils.algo_detector import clear_signature_cache
+        clear_signature_cache()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        from .utils.algo_detector import clear_signature_cache
+        clear_signature_cache()
+        return result
+
     class Meta:
         db_table = 'algos'
         indexes = [
@@ -46,6 +103,7 @@ class Algo(models.Model):
 
 class Group(models.Model):
     group_name = models.CharField(max_length=255, unique=True, null=True, blank=True, db_index=True)  
+    trading_session = models.JSONField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)  
     
     def __str__(self):
@@ -111,11 +169,19 @@ class FileAssociation(models.Model):
         db_index=True  
     )
     headers = models.JSONField(null=True, blank=True)
+    column_profiles = models.JSONField(null=True, blank=True)
+    # Fingerprint of the header row and what is compiled from it (column
+    # positions, Sym/Int and symbol columns, evaluator field lookups); both are
+    # rebuilt only when an upload's header row changes. See csv_utils.compile_schema.
+    header_fingerprint = models.CharField(max_length=40, blank=True, null=True, editable=False)
+    schema = models.JSONField(null=True, blank=True, editable=False)
     file_name = models.CharField(max_length=255, unique=True, editable=False, db_index=True)  
     file_path = models.CharField(max_length=1024, blank=True, null=True)
     last_hash = models.CharField(max_length=128, blank=True, null=True)
     last_fetched_at = models.DateTimeField(null=True, blank=True, db_index=True)  
     data_version = models.PositiveIntegerField(default=0)
+    import_fence = models.BigIntegerField(default=0, editable=False)
+    unchanged_streak = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)  
 
     class Meta:
@@ -166,13 +232,23 @@ class MainData(models.Model):
 
         super().save(*args, **kwargs)
 
-        with transaction.atomic():
-            for row in self.data_json.get("rows", []):
-                if "_row_id" in row and "_row_hash" in row:
-                    FavoriteRow.objects.filter(
-                        file_association=self.file_association,
-                        row_id=row["_row_id"]
-                    ).update(row_hash=row["_row_hash"])
+        # Refresh the stored hash of favorited rows that changed: one read of
+        # the file's favorites and one bulk update, instead of a query per row.
+        row_hashes = {
+            row["_row_id"]: row["_row_hash"]
+            for row in self.data_json.get("rows", [])
+            if "_row_id" in row and "_row_hash" in row
+        }
+        stale = [
+            favorite for favorite in FavoriteRow.objects.filter(
+                file_association_id=self.file_association_id
+            ).only('id', 'row_id', 'row_hash')
+            if favorite.row_id in row_hashes and favorite.row_hash != row_hashes[favorite.row_id]
+        ]
+        for favorite in stale:
+            favorite.row_hash = row_hashes[favorite.row_id]
+        if stale:
+            FavoriteRow.objects.bulk_update(stale, ['row_hash'])
 
     @staticmethod
     def compute_row_hash(row: dict) -> str:
@@ -208,6 +284,8 @@ class GlobalAlertRule(models.Model):
     file_association = models.ForeignKey(FileAssociation, on_delete=models.CASCADE, related_name='global_alerts', db_index=True)  # ⚡ INDEX
     symbol_interval = models.CharField(max_length=50, db_index=True)  # ⚡ INDEX
     field_name = models.CharField(max_length=255, db_index=True)  # ⚡ INDEX
+    symbol_interval_key = models.CharField(max_length=50, default="", editable=False)
+    field_name_key = models.CharField(max_length=255, default="", editable=False)
     target_1_hit_at = models.DateTimeField(null=True, blank=True)
     target_2_hit_at = models.DateTimeField(null=True, blank=True)
     condition_type = models.CharField(max_length=50, choices=[
@@ -219,6 +297,9 @@ class GlobalAlertRule(models.Model):
     ], db_index=True)  # ⚡ INDEX
     compare_value = models.CharField(max_length=255, null=True, blank=True)
     last_value = models.CharField(max_length=255, null=True, blank=True)
+    # compare_value/last_value parsed once, for numeric conditions on numeric columns.
+    compare_number = models.FloatField(null=True, blank=True, editable=False)
+    last_number = models.FloatField(null=True, blank=True, editable=False)
     is_active = models.BooleanField(default=True, db_index=True)  # ⚡ INDEX
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)  # ⚡ INDEX
 
@@ -232,10 +313,25 @@ class GlobalAlertRule(models.Model):
             models.Index(fields=['symbol_interval', 'field_name']),  # Common filter
             models.Index(fields=['is_active', '-created_at']),  # All active alerts
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['file_association', 'symbol_interval_key', 'field_name_key'],
+                name='uniq_global_alert_symbol_field',
+            ),
+        ]
 
-    def save(self, *args, **kwargs):
+    def normalize_keys(self):
+        """Also called directly by the batch endpoints, since bulk_create/bulk_update skip save()."""
         if self.field_name:
             self.field_name = self.field_name.strip().lower()
+        symbol_key = normalize_alert_key(self.symbol_interval)
+        self.field_name_key = alert_field_key(self, symbol_key, normalize_alert_key(self.field_name))
+        self.symbol_interval_key = symbol_key
+        self.compare_number = parse_alert_number(self.compare_value)
+        self.last_number = parse_alert_number(self.last_value)
+
+    def save(self, *args, **kwargs):
+        self.normalize_keys()
         super().save(*args, **kwargs)
 
 
@@ -244,6 +340,8 @@ class CustomAlert(models.Model):
     file_association = models.ForeignKey(FileAssociation, on_delete=models.CASCADE, related_name='custom_alerts', db_index=True)  # ⚡ INDEX
     symbol_interval = models.CharField(max_length=50, null=True, blank=True, db_index=True)  # ⚡ INDEX
     field_name = models.CharField(max_length=255, db_index=True)  # ⚡ INDEX
+    symbol_interval_key = models.CharField(max_length=50, default="", editable=False)
+    field_name_key = models.CharField(max_length=255, default="", editable=False)
     target_1_hit_at = models.DateTimeField(null=True, blank=True)
     target_2_hit_at = models.DateTimeField(null=True, blank=True)
     condition_type = models.CharField(max_length=50, choices=[
@@ -255,6 +353,9 @@ class CustomAlert(models.Model):
     ], db_index=True)  # ⚡ INDEX
     compare_value = models.CharField(max_length=255, null=True, blank=True)
     last_value = models.CharField(max_length=255, null=True, blank=True)
+    # compare_value/last_value parsed once, for numeric conditions on numeric columns.
+    compare_number = models.FloatField(null=True, blank=True, editable=False)
+    last_number = models.FloatField(null=True, blank=True, editable=False)
     is_active = models.BooleanField(default=True, db_index=True)  # ⚡ INDEX
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)  # ⚡ INDEX
 
@@ -268,10 +369,25 @@ class CustomAlert(models.Model):
             models.Index(fields=['file_association', 'user', 'is_active']),  # User alerts per file
             models.Index(fields=['symbol_interval', 'field_name', 'user']),  # Common filter
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['file_association', 'user', 'symbol_interval_key', 'field_name_key'],
+                name='uniq_custom_alert_symbol_field',
+            ),
+        ]
 
-    def save(self, *args, **kwargs):
+    def normalize_keys(self):
+        """Also called directly by the batch endpoints, since bulk_create/bulk_update skip save()."""
         if self.field_name:
             self.field_name = self.field_name.strip().lower()
+        symbol_key = normalize_alert_key(self.symbol_interval)
+        self.field_name_key = alert_field_key(self, symbol_key, normalize_alert_key(self.field_name))
+        self.symbol_interval_key = symbol_key
+        self.compare_number = parse_alert_number(self.compare_value)
+        self.last_number = parse_alert_number(self.last_value)
+
+    def save(self, *args, **kwargs):
+        self.normalize_keys()
         super().save(*args, **kwargs)
 
 
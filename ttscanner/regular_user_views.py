@@ -9,6 +9,7 @@ from .models import (
     Algo, Group, Interval
 )
 from django.shortcuts import get_object_or_404
+from django.http import Http404
 from .serializers import (
     CustomAlertCreateSerializer, CustomAlertUpdateSerializer, 
     UserSettingsSerializer,GroupSerializer, IntervalSerializer,
@@ -16,18 +17,36 @@ from .serializers import (
 )
 from  rest_framework import status
 from rest_framework import generics
-from .utils.csv_utils import fetch_ftp_bytes, parse_csv_bytes_to_dicts
-import re, logging
+from .utils.csv_utils import (
+    fetch_ftp_bytes, parse_csv_bytes_to_dicts,
+    compute_hash_bytes, get_sym_int_index,
+    row_cache_key, publish_row_cache, get_file_schema
+)
+import logging
 from django.core.cache import cache
+from .utils.cache_utils import bulk_cache
+from .utils.snapshot_utils import get_file_snapshot, snapshot_response
+from .utils.http_utils import build_etag, not_modified, alert_log_signature
+from .db_router import reads_from_replica
+from .utils.alert_batch import (
+    batch_items, batch_status,
+    bulk_create_alerts, bulk_update_alerts, bulk_delete_alerts
+)
 
 logger = logging.getLogger(__name__)
 
 class CSVListView(generics.GenericAPIView):
     def get(self, request, pk):
         cache_key = f"csv_data_{pk}"
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data, status=200)
+        etag = cache.get(f"csv_etag_{pk}")
+        if etag and (response := not_modified(request, etag)):
+            return response
+
+        cached_data = bulk_cache.get(cache_key)
+        if cached_data and etag:
+            response = Response(cached_data, status=200)
+            response["ETag"] = etag
+            return response
         
         try:
             fa = FileAssociation.objects.only(
@@ -47,10 +66,17 @@ class CSVListView(generics.GenericAPIView):
             "headers": headers,
             "rows": rows[1:]
         }
+        etag = build_etag("csv", pk, fa.data_version, compute_hash_bytes(content_bytes))
         
-        cache.set(cache_key, response_data, timeout=30)
-        
-        return Response(response_data, status=200)
+        bulk_cache.set(cache_key, response_data, timeout=30)
+        cache.set(f"csv_etag_{pk}", etag, timeout=30)
+
+        if response := not_modified(request, etag):
+            return response
+
+        response = Response(response_data, status=200)
+        response["ETag"] = etag
+        return response
 
 
 class CSVHeaderView(generics.GenericAPIView):
@@ -62,19 +88,12 @@ class CSVHeaderView(generics.GenericAPIView):
             return Response(cached_headers, status=200)
         
         try:
-            fa = FileAssociation.objects.only('file_name', 'headers').get(id=pk)
+            fa = FileAssociation.objects.only('file_name', 'headers', 'schema').get(id=pk)
         except FileAssociation.DoesNotExist:
             return Response({"detail": "File Association Does Not Exist"}, status=404)
         
-        if 'ttscanner' in fa.file_name.lower():
-            headers = [
-                header
-                for header in fa.headers[1:]
-                if 'datetime' not in header.lower()
-                if 'color' not in header.lower()
-            ]
-        else:
-            headers = fa.headers[1:]
+        # Compiled at ingest; the cached copy is dropped when the header row changes.
+        headers = get_file_schema(fa)["display_headers"]
         cache.set(cache_key, headers, timeout=300)
         
         return Response(headers, status=200)
@@ -84,54 +103,20 @@ class CSVHeaderView(generics.GenericAPIView):
 class SymIntListView(generics.ListAPIView):
     queryset = MainData.objects.all()
 
-    def find_sym_int_column(self, headers):
-        for h in headers:
-            normalized = (
-                str(h).lower()
-                .replace(" ", "")
-                .replace("_", "")
-                .replace("-", "")
-                .replace("/", "")
-            )
-            if "sym" in normalized and "int" in normalized:
-                return h
-        return None
-    
     def get(self, request, pk):
-        cache_key = f"sym_int_values_{pk}"
-        cached_values = cache.get(cache_key)
-        
-        if cached_values is not None:
-            return Response(cached_values, status=200)
-        
         try:
-            fa = FileAssociation.objects.only('headers').get(id=pk)
+            fa = FileAssociation.objects.only('id', 'last_hash', 'schema').get(id=pk)
         except FileAssociation.DoesNotExist:
             return Response({"detail": "File Association Does Not Exist"}, status=404)
         
-        main_data = MainData.objects.filter(
-            file_association=fa
-        ).only('data_json').first()
-
-        if not main_data:
+        index = get_sym_int_index(fa)
+        if not index:
             return Response({"detail": "MainData not found"}, status=404)
         
-        sym_int_key = self.find_sym_int_column(fa.headers)
-        if not sym_int_key:
+        if not index["sym_int_key"]:
             return Response({"details": 'Could not detect Symbol/Interval column'}, status=400)
-        all_rows = main_data.data_json.get("rows", [])
-        valid_sym_int_values = set()
         
-        for row in all_rows:
-            if sym_int_key in row:
-                value = str(row[sym_int_key])
-                if value: 
-                    valid_sym_int_values.add(value)
-        
-        values_list = list(valid_sym_int_values)
-        cache.set(cache_key, values_list, timeout=300)
-        
-        return Response(values_list, status=200)
+        return Response(index["values"], status=200)
 
 
 class FavoriteRowView(APIView):
@@ -145,52 +130,38 @@ class FavoriteRowView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        fa = get_object_or_404(FileAssociation, id=pk)
-        main_data = get_object_or_404(MainData, file_association=fa)
+        fa = get_object_or_404(FileAssociation.objects.only('id', 'last_hash', 'schema'), id=pk)
+        index = get_sym_int_index(fa)
+        if not index:
+            raise Http404("No MainData matches the given query.")
         user = get_object_or_404(MENTUser, external_user_id=external_user_id)
-
-        sym_int_value = str(sym_int_value).lower().strip()
-        pattern = re.compile(r"sym.*int|symbol.*interval", re.IGNORECASE)
-        headers = main_data.data_json.get("headers", [])
         
-        sym_int_key = None
-        for header in headers:
-            normalized = re.sub(r"[ _/]", "", header.lower())
-            if pattern.search(normalized):
-                sym_int_key = header
-                break
-        
-        if not sym_int_key:
+        if not index["sym_int_key"]:
             return Response(
                 {"detail": "Sym/Int column not found in data"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        matching_row = None
-        for row in main_data.data_json.get("rows", []):
-            value = row.get(sym_int_key)
-            if value and str(value).lower().strip() == sym_int_value:
-                matching_row = row
-                break
-
+        matching_row = index["rows"].get(str(sym_int_value).lower().strip())
         if not matching_row:
             return Response(
                 {"detail": "Row not found in MainData"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        row_id, row_hash = matching_row
         favorite, created = FavoriteRow.objects.get_or_create(
             user=user,
             file_association=fa,
-            row_id=matching_row["_row_id"],
-            defaults={"row_hash": matching_row["_row_hash"]}
+            row_id=row_id,
+            defaults={"row_hash": row_hash}
         )
 
         return Response(
             {
                 "favorite_id": favorite.id,
-                "row_id": matching_row["_row_id"],
-                "row_hash": matching_row["_row_hash"],
+                "row_id": row_id,
+                "row_hash": row_hash,
                 "created": created
             },
             status=status.HTTP_201_CREATED
@@ -222,76 +193,83 @@ class FavoriteRowListView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        favorites = FavoriteRow.objects.filter(user=user).select_related(
-            'file_association'
-        ).only(
-            'id', 'row_id', 'row_hash', 
-            'file_association__id',
-            'file_association__algo_name_copy',
-            'file_association__group_name_copy',
-            'file_association__interval_name_copy',
-            'file_association__headers'
+        favorites = list(
+            FavoriteRow.objects.filter(user=user).select_related(
+                'file_association'
+            ).only(
+                'id', 'row_id', 'row_hash', 
+                'file_association__id',
+                'file_association__algo_name_copy',
+                'file_association__group_name_copy',
+                'file_association__interval_name_copy',
+                'file_association__headers',
+                'file_association__data_version',
+                'file_association__last_hash'
+            ).order_by('id')
         )
-        
-        if not favorites.exists():
-            return Response([], status=200)
 
-        file_association_ids = [fav.file_association_id for fav in favorites]
-
-        main_data_list = MainData.objects.filter(
-            file_association_id__in=file_association_ids
-        ).only('file_association_id', 'data_json')
+        etag = build_etag("fav", external_user_id, [
+            (fav.id, fav.row_id, fav.file_association.data_version, fav.file_association.last_hash)
+            for fav in favorites
+        ])
+        if response := not_modified(request, etag):
+            return response
+
+        # Only the favorited rows are read: one get_many over the row cache,
+        # falling back to MainData just for files whose rows are not cached.
+        row_keys = {fav.id: row_cache_key(fav.file_association_id, fav.row_id) for fav in favorites}
+        cached_rows = bulk_cache.get_many(list(row_keys.values()))
+
+        missing_fa_ids = {
+            fav.file_association_id for fav in favorites
+            if row_keys[fav.id] not in cached_rows
+        }
+        if missing_fa_ids:
+            fas = {fav.file_association_id: fav.file_association for fav in favorites}
+            for md in MainData.objects.filter(
+                file_association_id__in=missing_fa_ids
+            ).only('file_association_id', 'data_json'):
+                cached_rows.update(publish_row_cache(
+                    fas[md.file_association_id],
+                    md.data_json.get("headers", []),
+                    md.data_json.get("rows", [])
+                ))
 
-        main_data_dict = {}
-        for md in main_data_list:
-            main_data_dict[md.file_association_id] = md.data_json
         grouped = {}
-        
         for fav in favorites:
-            fa = fav.file_association
-            fa_id = fa.id
-            data_json = main_data_dict.get(fa_id)
-            if not data_json:
+            matching_row = cached_rows.get(row_keys[fav.id])
+            if not matching_row:
                 continue
-            if fa_id not in grouped:
-                grouped[fa_id] = {
-                    "file_association_id": fa_id,
+
+            fa = fav.file_association
+            if fa.id not in grouped:
+                grouped[fa.id] = {
+                    "file_association_id": fa.id,
                     "file_association_name": f"{fa.algo_name_copy} {fa.group_name_copy} {fa.interval_name_copy}",
                     "headers": fa.headers,
-                    "rows": []
+                    "rows": [],
+                    "_headers_to_include": [h for h in fa.headers if not h.startswith("_")]
                 }
-                rows_dict = {}
-                for row in data_json.get("rows", []):
-                    row_id = row.get("_row_id")
-                    if row_id:
-                        rows_dict[row_id] = row
-                
-                grouped[fa_id]['_rows_dict'] = rows_dict
-            rows_dict = grouped[fa_id]['_rows_dict']
-            matching_row = rows_dict.get(fav.row_id)
-            
-            if not matching_row:
-                continue
-
-            headers_to_include = [h for h in fa.headers if not h.startswith("_")]
-            row_data = {h: matching_row.get(h) for h in headers_to_include}
 
+            row_data = {h: matching_row.get(h) for h in grouped[fa.id]["_headers_to_include"]}
             row_data.update({
                 "favorite_id": fav.id,
                 "row_id": fav.row_id,
                 "row_hash": matching_row.get("_row_hash")
             })
             
-            grouped[fa_id]["rows"].append(row_data)
+            grouped[fa.id]["rows"].append(row_data)
 
-        for fa_id in grouped:
-            if '_rows_dict' in grouped[fa_id]:
-                del grouped[fa_id]['_rows_dict']
+        for group in grouped.values():
+            del group["_headers_to_include"]
         
-        return Response(list(grouped.values()), status=200)
+        response = Response(list(grouped.values()), status=200)
+        response["ETag"] = etag
+        return response
 
 
 
+@reads_from_replica
 class CustomAlertView(generics.ListAPIView):
     serializer_class = CustomAlertCreateSerializer
 
@@ -310,7 +288,7 @@ class CustomAlertCreateView(generics.CreateAPIView):
         user = get_object_or_404(MENTUser, external_user_id=external_user_id)
         fa_id = request.data.get("file_association")
         fa = get_object_or_404(FileAssociation, pk=fa_id)
-        serializer = self.get_serializer(data=request.data)
+        serializer = self.get_serializer(data=request.data, context={**self.get_serializer_context(), "user": user})
         serializer.is_valid(raise_exception=True)
         save_alert = serializer.save(user=user, file_association=fa)
 
@@ -409,6 +387,49 @@ class CustomAlertDeleteView(generics.DestroyAPIView):
 
  
 
+class CustomAlertBulkView(APIView):
+    """
+    Batch create (POST {"file_association": id, "alerts": [...]}), update
+    (PATCH {"alerts": [{"id": ..}, ...]}) and delete (DELETE {"ids": [...]})
+    of a user's custom alerts, with a result per item.
+    """
+
+    def post(self, request, external_user_id):
+        user = get_object_or_404(MENTUser, external_user_id=external_user_id)
+        fa = get_object_or_404(FileAssociation, pk=request.data.get("file_association"))
+        items, error = batch_items(request.data, "alerts")
+        if error:
+            return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = bulk_create_alerts(
+            CustomAlert, fa, items,
+            required=["field_name", "condition_type"], user=user
+        )
+        return Response({"results": results}, status=batch_status(results, "created", status.HTTP_201_CREATED))
+
+    def patch(self, request, external_user_id):
+        user = get_object_or_404(MENTUser, external_user_id=external_user_id)
+        items, error = batch_items(request.data, "alerts")
+        if error:
+            return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = bulk_update_alerts(CustomAlert.objects.filter(user=user), items)
+        return Response({"results": results}, status=batch_status(results, "updated"))
+
+    def delete(self, request, external_user_id):
+        user = get_object_or_404(MENTUser, external_user_id=external_user_id)
+        ids, error = batch_items(request.data, "ids")
+        if error:
+            return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+        if not all(isinstance(i, int) for i in ids):
+            return Response({"detail": "'ids' must be a list of integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = bulk_delete_alerts(CustomAlert.objects.filter(user=user), ids)
+        return Response({"results": results}, status=batch_status(results, "deleted"))
+
+
+
+@reads_from_replica
 class UserTriggeredAlertsView(APIView):
     def get(self, request, *args, **kwargs):
         external_user_id = self.kwargs.get("external_user_id")
@@ -421,22 +442,26 @@ class UserTriggeredAlertsView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        alerts = TriggeredAlert.objects.filter(
+        user_alerts = TriggeredAlert.objects.filter(
             Q(alert_source="global") |
             Q(alert_source="system") |
             Q(alert_source="custom", custom_alert__user=user)
-        ).select_related(
-            'custom_alert',  
-            'global_alert',  
-            'file_association'  
-        ).only(
+        )
+        etag = build_etag("alert-logs", external_user_id, *alert_log_signature(user_alerts))
+        if response := not_modified(request, etag):
+            return response
+
+        # Relations serialize as ids; load every serialized field up front.
+        alerts = user_alerts.only(
             'id', 'alert_source', 'symbol', 'triggered_at', 
-            'acknowledged', 'message', 'custom_alert_id', 'global_alert_id',
+            'acknowledged', 'message', 'sent_to_ui', 'custom_alert_id', 'global_alert_id',
             'file_association_id'
         ).order_by('-triggered_at')  
         
         serializer = TriggeredAlertSerializer(alerts, many=True)
-        return Response(serializer.data)
+        response = Response(serializer.data)
+        response["ETag"] = etag
+        return response
 
 
 class UserSettingsCreateView(generics.CreateAPIView):
@@ -491,6 +516,7 @@ class UpdateUserSettingsView(generics.UpdateAPIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@reads_from_replica
 class UserSettingsView(generics.ListAPIView):
     serializer_class = UserSettingsSerializer
 
@@ -505,6 +531,7 @@ class UserSettingsView(generics.ListAPIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@reads_from_replica
 class AlgoGroupsView(APIView):
     def get(self, request, algo_pk):
         try:
@@ -522,6 +549,7 @@ class AlgoGroupsView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@reads_from_replica
 class AlgoGroupIntervalsView(APIView):
     def get(self, request, algo_pk, group_pk):
         try:
@@ -570,7 +598,7 @@ class FileAssociationLookupView(APIView):
             ).select_related(
                 'algo', 'interval'
             ).only(
-                'id', 'data_version', 'algo__algo_name', 'interval__interval_name'
+                'id', 'data_version', 'last_hash', 'algo__algo_name', 'interval__interval_name'
             ).first()
         else:
             fa = FileAssociation.objects.filter(
@@ -580,7 +608,7 @@ class FileAssociationLookupView(APIView):
             ).select_related(
                 'algo', 'interval', 'group'
             ).only(
-                'id', 'data_version', 'algo__algo_name', 
+                'id', 'data_version', 'last_hash', 'algo__algo_name', 
                 'interval__interval_name', 'group__group_name'
             ).first()
 
@@ -590,35 +618,19 @@ class FileAssociationLookupView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        main_data = MainData.objects.filter(
-            file_association=fa
-        ).only('data_json').first()
-        
-        if not main_data:
+        etag = build_etag("fa", fa.id, fa.data_version, fa.last_hash)
+        if response := not_modified(request, etag):
+            return response
+
+        snapshot = get_file_snapshot(fa)
+        if not snapshot:
             return Response(
                 {"detail": "No data found for this FileAssociation."},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        headers = main_data.data_json.get("headers", [])
-        rows = main_data.data_json.get("rows", [])
-        headers_to_include = [h for h in headers if not h.startswith("_")]
-        cleaned_rows = [
-            {
-                **{h: row.get(h) for h in headers_to_include},
-                "_row_hash": row.get("_row_hash")
-            }
-            for row in rows
-        ]
-
-        return Response(
-            {
-                "file_association_id": fa.id,
-                "data_version": fa.data_version,
-                "headers": headers,
-                "rows": cleaned_rows
-            },
-            status=200
-        )
+        response = snapshot_response(request, snapshot)
+        response["ETag"] = etag
+        return response
     
 
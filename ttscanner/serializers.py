@@ -1,18 +1,92 @@
-import re
-from django.db import IntegrityError
+import math, re
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from .models import (
     Algo, Group, Interval, 
     FileAssociation, GlobalAlertRule, 
     FavoriteRow, CustomAlert,
     UserSettings, MENTUser,
-    TriggeredAlert
+    TriggeredAlert, normalize_alert_key, alert_key_changed
 )
+from .utils.csv_utils import get_column_profiles
+from .utils.session_utils import validate_session
+
+
+def is_numeric(v):
+    """A finite number: "nan" and "inf" parse as floats but can't be thresholds."""
+    try:
+        return math.isfinite(float(v))
+    except (TypeError, ValueError):
+        return False
+
+
+def column_is_numeric(fa, field_name):
+    """Read the column type from the profile computed at ingest instead of scanning rows."""
+    profiles = get_column_profiles(fa)
+    profile = profiles.get(field_name)
+    if profile is None and field_name:
+        # Stored alerts keep a lowercased field_name; headers keep the CSV casing.
+        profile = next((p for h, p in profiles.items() if h.lower() == field_name.lower()), None)
+    return bool(profile) and profile["type"] == "numeric"
+
+
+def alert_exists(model, fa, symbol_interval, field_name, exclude_pk=None, **scope):
+    """
+    Duplicate check against the normalized, uniquely constrained key columns.
+    `scope` narrows it further (user=... for custom alerts, which are unique per user).
+    """
+    qs = model.objects.filter(
+        file_association=fa,
+        symbol_interval_key=normalize_alert_key(symbol_interval),
+        field_name_key=normalize_alert_key(field_name),
+        **scope
+    )
+    if exclude_pk is not None:
+        qs = qs.exclude(pk=exclude_pk)
+    return qs.exists()
+
+
+def duplicate_alert_error(symbol_interval, field_name):
+    return serializers.ValidationError(
+        f"Alert for '{symbol_interval}' → '{field_name}' already exists."
+    )
+
+
+def save_alert(save, symbol_interval, field_name):
+    """Run the insert/update, turning a lost race on the unique key into the usual validation error."""
+    try:
+        with transaction.atomic():
+            return save()
+    except IntegrityError:
+        raise duplicate_alert_error(symbol_interval, field_name)
+
+
+def validate_trading_session(value):
+    if value is None:
+        return value
+    try:
+        return validate_session(value)
+    except ValueError as e:
+        raise serializers.ValidationError(str(e))
+
+
+def validate_header_signature(value):
+    if not isinstance(value, list) or not all(isinstance(c, str) and c.strip() for c in value):
+        raise serializers.ValidationError("header_signature must be a list of column names.")
+    return value
+
 
 class AlgoSerializer(serializers.ModelSerializer):
+    trading_session = serializers.JSONField(required=False, allow_null=True, validators=[validate_trading_session])
+    header_signature = serializers.JSONField(required=False, validators=[validate_header_signature])
+
     class Meta:
         model = Algo
-        fields = ['id', 'algo_name']
+        fields = ['id', 'algo_name', 'trading_session', 'header_signature']
+
+    def validate_header_signature(self, value):
+        # Detection compares lower-cased, stripped column names.
+        return list(dict.fromkeys(c.lower().strip() for c in value))
         
 
 class GroupSerializer(serializers.ModelSerializer):
@@ -21,6 +95,13 @@ class GroupSerializer(serializers.ModelSerializer):
         fields = ['id', 'group_name']
 
 
+class GroupAdminSerializer(GroupSerializer):
+    trading_session = serializers.JSONField(required=False, allow_null=True, validators=[validate_trading_session])
+
+    class Meta(GroupSerializer.Meta):
+        fields = GroupSerializer.Meta.fields + ['trading_session']
+
+
 class IntervalSerializer(serializers.ModelSerializer):
     interval_minutes = serializers.IntegerField(read_only=True)
 
@@ -257,22 +338,7 @@ class GlobalAlertCreateSerializer(serializers.ModelSerializer):
             data['compare_value'] = None
             compare_value = None
 
-        all_rows = fa.maindata.first().data_json.get("rows", [])
-
-        field_entries = [
-            row.get(field_name)
-            for row in all_rows
-            if row.get(field_name) not in (None, "")
-        ]
-
-        def is_numeric(v):
-            try:
-                float(v)
-                return True
-            except:
-                return False
-
-        is_numeric_field = len(field_entries) > 0 and any(is_numeric(v) for v in field_entries)
+        is_numeric_field = column_is_numeric(fa, field_name)
 
         if compare_value not in (None, ""):
             if is_numeric_field and not is_numeric(compare_value):
@@ -284,22 +350,18 @@ class GlobalAlertCreateSerializer(serializers.ModelSerializer):
                     { "compare_value": f"'{field_name}' is text — compare value cannot be numeric." }
                 )
 
-        existing_alerts = fa.global_alerts.all()
-
-        if any(
-            a.field_name.lower() == field_name.lower() and
-            (a.symbol_interval or "").lower() == (symbol_interval or "").lower()
-            for a in existing_alerts
-        ):
-            raise serializers.ValidationError(
-                f"Alert for '{symbol_interval}' → '{field_name}' already exists."
-            )
+        if alert_exists(GlobalAlertRule, fa, symbol_interval, field_name):
+            raise duplicate_alert_error(symbol_interval, field_name)
 
         return data
 
     def create(self, validated_data):
         fa = self.context.get("file_association")
-        return GlobalAlertRule.objects.create(file_association=fa, **validated_data)
+        return save_alert(
+            lambda: GlobalAlertRule.objects.create(file_association=fa, **validated_data),
+            validated_data.get("symbol_interval"),
+            validated_data.get("field_name")
+        )
 
 
 
@@ -336,20 +398,7 @@ class GlobalAlertUpdateSerializer(serializers.ModelSerializer):
             data['compare_value'] = None
             compare_value = None
 
-        all_rows = fa.maindata.first().data_json.get("rows", [])
-
-        field_entries = [
-            row.get(field_name, "") for row in all_rows if field_name in row
-        ]
-
-        def is_numeric(v):
-            try:
-                float(v)
-                return True
-            except:
-                return False
-
-        is_numeric_field = len(field_entries) > 0 and any(is_numeric(v) for v in field_entries)
+        is_numeric_field = column_is_numeric(fa, field_name)
         if compare_value not in (None, ""):
 
             if is_numeric_field and not is_numeric(compare_value):
@@ -362,19 +411,21 @@ class GlobalAlertUpdateSerializer(serializers.ModelSerializer):
                     "compare_value": f"'{field_name}' is text — compare value cannot be numeric."
                 })
 
-        existing_alerts = fa.global_alerts.all()
-
-        if any(
-            a.field_name.lower() == field_name.lower()
-            and (a.symbol_interval or "").lower() == (symbol_interval or "").lower()
-            for a in existing_alerts
-        ):
-            raise serializers.ValidationError(
-                f"Alert for '{symbol_interval}' → '{field_name}' already exists."
-            )
+        # An update that keeps the alert's symbol and column can't create a duplicate.
+        if self.instance is None or alert_key_changed(self.instance, symbol_interval, field_name):
+            exclude_pk = self.instance.pk if self.instance else None
+            if alert_exists(GlobalAlertRule, fa, symbol_interval, field_name, exclude_pk=exclude_pk):
+                raise duplicate_alert_error(symbol_interval, field_name)
 
         return data
 
+    def update(self, instance, validated_data):
+        return save_alert(
+            lambda: super(GlobalAlertUpdateSerializer, self).update(instance, validated_data),
+            validated_data.get("symbol_interval", instance.symbol_interval),
+            validated_data.get("field_name", instance.field_name)
+        )
+
 
 
 
@@ -439,30 +490,14 @@ class CustomAlertCreateSerializer(serializers.ModelSerializer):
         condition_type = data.get("condition_type")
 
         # Check duplicates
-        if CustomAlert.objects.filter(
-            file_association=fa,
-            field_name__iexact=field_name,
-            symbol_interval__iexact=symbol_interval
-        ).exists():
-            raise serializers.ValidationError(
-                f"Alert for '{symbol_interval}' → '{field_name}' already exists."
-            )
+        if alert_exists(CustomAlert, fa, symbol_interval, field_name, user=self.context.get("user")):
+            raise duplicate_alert_error(symbol_interval, field_name)
 
         if condition_type == "change":
             data['compare_value'] = None
             compare_value = None
 
-        all_rows = fa.maindata.first().data_json.get("rows", [])
-        field_entries = [row.get(field_name) for row in all_rows if row.get(field_name) not in (None, "")]
-
-        def is_numeric(v):
-            try:
-                float(v)
-                return True
-            except:
-                return False
-
-        is_numeric_field = len(field_entries) > 0 and any(is_numeric(v) for v in field_entries)
+        is_numeric_field = column_is_numeric(fa, field_name)
 
         if compare_value not in (None, ""):
             if is_numeric_field and not is_numeric(compare_value):
@@ -477,7 +512,11 @@ class CustomAlertCreateSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        return CustomAlert.objects.create(**validated_data)
+        return save_alert(
+            lambda: CustomAlert.objects.create(**validated_data),
+            validated_data.get("symbol_interval"),
+            validated_data.get("field_name")
+        )
 
 
 
@@ -504,17 +543,7 @@ class CustomAlertUpdateSerializer(serializers.ModelSerializer):
             data['compare_value'] = None
             compare_value = None
 
-        all_rows = fa.maindata.first().data_json.get("rows", [])
-        field_entries = [row.get(field_name) for row in all_rows if row.get(field_name) not in (None, "")]
-
-        def is_numeric(v):
-            try:
-                float(v)
-                return True
-            except:
-                return False
-
-        is_numeric_field = len(field_entries) > 0 and any(is_numeric(v) for v in field_entries)
+        is_numeric_field = column_is_numeric(fa, field_name)
 
         if compare_value not in (None, ""):
             if is_numeric_field and not is_numeric(compare_value):
@@ -526,17 +555,37 @@ class CustomAlertUpdateSerializer(serializers.ModelSerializer):
             #         "compare_value": f"'{field_name}' is text — compare value cannot be numeric."
             #     })
 
-        if CustomAlert.objects.filter(
-            file_association=fa,
-            field_name__iexact=field_name,
-            symbol_interval__iexact=symbol_interval
-        ).exclude(id=self.instance.id).exists():
-            raise serializers.ValidationError(
-                f"Alert for '{symbol_interval}' → '{field_name}' already exists."
-            )
+        # Partial updates keep the fields they leave out; keeping both can't create a duplicate.
+        symbol_interval = data.get("symbol_interval", self.instance.symbol_interval)
+        field_name = data.get("field_name", self.instance.field_name)
+        if alert_key_changed(self.instance, symbol_interval, field_name) and alert_exists(
+            CustomAlert, fa, symbol_interval, field_name, exclude_pk=self.instance.id, user=self.instance.user_id
+        ):
+            raise duplicate_alert_error(symbol_interval, field_name)
 
         return data
 
+    def update(self, instance, validated_data):
+        return save_alert(
+            lambda: super(CustomAlertUpdateSerializer, self).update(instance, validated_data),
+            validated_data.get("symbol_interval", instance.symbol_interval),
+            validated_data.get("field_name", instance.field_name)
+        )
+
+
+class AlertBatchItemSerializer(serializers.Serializer):
+    """Field-level validation for one entry of a bulk alert create/update request."""
+    id = serializers.IntegerField(required=False)
+    symbol_interval = serializers.CharField(max_length=50, required=False, allow_blank=True, allow_null=True)
+    field_name = serializers.CharField(max_length=255, required=False)
+    condition_type = serializers.ChoiceField(
+        choices=GlobalAlertRule._meta.get_field("condition_type").choices,
+        required=False
+    )
+    compare_value = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    last_value = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    is_active = serializers.BooleanField(required=False)
+
 
 class UserSettingsSerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,18 +1,31 @@
 from django.core.cache import cache
-from celery import shared_task
+from celery import shared_task, chord
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
+from django.db.models import F
 from django.utils import timezone
-import logging, re
+import logging, zlib
+from collections import Counter, defaultdict
 from django.conf import settings
 from ttscanner.models import (
     FileAssociation, MENTUser, UserSettings, 
-    TriggeredAlert, MainData, CustomAlert
+    TriggeredAlert, MainData, CustomAlert, GlobalAlertRule
 )
-from ttscanner.utils.csv_utils import fetch_ftp_bytes, is_file_changed, store_csv_data
-from ttscanner.engine.evaluator import lookup_any, process_row_for_alerts
+from ttscanner.utils.csv_utils import (
+    fetch_ftp_bytes, is_file_changed, store_csv_data, rows_schema, get_column_profiles
+)
+from ttscanner.engine.evaluator import process_row_for_alerts, extract_symbol_from_row
+from ttscanner.engine.rows import FileRows, gather_numbers, safe_float
+from ttscanner.engine.conditions import is_numeric_alert, numeric_trigger, numeric_triggers
 from ttscanner.utils.email_utils import send_alert_email
 from ttscanner.utils.sms_utils import send_alert_sms
 from ttscanner.utils.text_utils import html_to_plain_text
+from ttscanner.utils.cache_utils import bulk_cache
+from ttscanner.utils.snapshot_utils import publish_file_snapshot
+from ttscanner.utils.lock_utils import acquire_import_lease, release_import_lease, StaleLeaseError
+from ttscanner.utils.metrics_utils import incr_metric, timed
+from ttscanner.utils.session_utils import next_poll_at
+from ttscanner.utils.log_utils import log_run_summary, log_sampled
 
 logger = logging.getLogger(__name__)
 
@@ -38,82 +51,184 @@ def update_user_alert_cache(user_external_id):
 
 
 
+# Redis transport: 0 is served first. Faster intervals go ahead of slower ones.
+PRIORITY_BY_INTERVAL = [
+    (1, 0),
+    (5, 2),
+    (15, 4),
+    (60, 6),
+    (240, 7),
+]
+DEFAULT_PRIORITY = 9
+
+
+def interval_priority(fa):
+    minutes = fa.interval.interval_minutes if fa.interval else None
+    if not minutes:
+        return DEFAULT_PRIORITY
+    for max_minutes, priority in PRIORITY_BY_INTERVAL:
+        if minutes <= max_minutes:
+            return priority
+    return DEFAULT_PRIORITY
+
+
+def interval_seconds(fa):
+    return fa.interval.interval_minutes * 60 if fa.interval and fa.interval.interval_minutes else 300
+
+
+def import_inflight_key(file_id):
+    return f"fa_import_inflight_{file_id}"
+
+
+def enqueue_import(fa):
+    """
+    Queue an import unless one for this file is already queued or running.
+    The in-flight marker is cleared by import_file_association; the timeout
+    only matters if a worker dies mid-import.
+    """
+    if not cache.add(import_inflight_key(fa.id), True, timeout=max(interval_seconds(fa), 600)):
+        incr_metric("imports_collapsed_queued")
+        return False
+    try:
+        import_file_association.apply_async((fa.id,), priority=interval_priority(fa))
+    except Exception:
+        # Not queued: drop the marker so the caller's retry isn't collapsed.
+        cache.delete(import_inflight_key(fa.id))
+        raise
+    return True
+
+
+def scheduled_files():
+    """Every file with what the scheduler needs, in one query."""
+    return FileAssociation.objects.select_related("interval", "group", "algo").only(
+        "id", "file_name", "last_fetched_at", "unchanged_streak",
+        "interval__interval_minutes", "group__trading_session", "algo__trading_session"
+    )
+
+
+def next_due_at(fa, now, fetched_at=None):
+    """
+    When the file is next due, as a timestamp; files never fetched are due now.
+    `fetched_at` overrides last_fetched_at (the scheduler passes the time it
+    queued the import).
+    """
+    if fetched_at is None:
+        if not fa.last_fetched_at:
+            return now
+        fetched_at = fa.last_fetched_at.timestamp()
+    return next_poll_at(fa, interval_seconds(fa), fetched_at)
+
+
 @shared_task
 def import_file_association(file_id):
-    """Fetch CSV, store if changed, then update cache for SSE."""
+    """
+    Fetch CSV, store if changed, then update cache for SSE.
+    Runs under the per-file import lease: if another import of the same file
+    is running this one is skipped, and a run whose lease expired can't
+    overwrite a newer run's data (fencing token).
+    """
     try:
-        fa = FileAssociation.objects.get(id=file_id)
+        fa = FileAssociation.objects.select_related("interval").get(id=file_id)
     except ObjectDoesNotExist:
-        print(f"[IMPORT] FileAssociation id={file_id} not found. Skipping.")
+        logger.warning("[IMPORT] FileAssociation id=%s not found. Skipping.", file_id)
+        cache.delete(import_inflight_key(file_id))
+        return
+
+    token = acquire_import_lease(fa)
+    if token is None:
+        incr_metric("imports_collapsed_running")
+        logger.info("[IMPORT] %s is already being imported. Skipping.", fa.file_name)
+        cache.delete(import_inflight_key(file_id))
         return
 
+    incr_metric("imports_started")
+    timings = {}
     try:
-        print(f"[IMPORT] Fetching CSV from: {fa.file_path}")
-        csv_bytes = fetch_ftp_bytes(fa.file_path)
-        print(f"[IMPORT] Fetched {len(csv_bytes)} bytes for {fa.file_name}")
+        # Another import may have committed since fa was loaded.
+        fa.refresh_from_db()
+        logger.debug("[IMPORT] Fetching CSV from: %s", fa.file_path)
+        with timed("import_stage_ms", "fetch", timings):
+            csv_bytes = fetch_ftp_bytes(fa.file_path)
+        logger.info("[IMPORT] Fetched %s bytes for %s", len(csv_bytes), fa.file_name)
 
-        changed, new_hash = is_file_changed(fa, csv_bytes)
+        with timed("import_stage_ms", "hash", timings):
+            changed, new_hash = is_file_changed(fa, csv_bytes)
 
         if changed:
-            store_csv_data(fa, csv_bytes, new_hash)
-            fa.data_version += 1
-            print(f"[IMPORT] Data Version Incremented → {fa.data_version}")
+            incr_metric("imports_changed")
+            store_csv_data(fa, csv_bytes, new_hash, fence_token=token, timings=timings)
+            # A change snaps polling back to the base interval.
+            FileAssociation.objects.filter(id=fa.id).update(
+                data_version=F("data_version") + 1, unchanged_streak=0
+            )
+            fa.refresh_from_db(fields=["data_version"])
+            logger.info("[IMPORT] %s data version incremented → %s", fa.file_name, fa.data_version)
         else:
-            print(f"[IMPORT] No changes detected for {fa.file_name}")
+            incr_metric("imports_unchanged")
+            FileAssociation.objects.filter(id=fa.id).update(unchanged_streak=F("unchanged_streak") + 1)
+            logger.info("[IMPORT] No changes detected for %s", fa.file_name)
 
         # Update timestamps
         fa.last_fetched_at = timezone.now()
-        update_fields = ['last_fetched_at']
+        fa.save(update_fields=['last_fetched_at'])
 
         if changed:
-            update_fields.append('data_version')
             main_data = MainData.objects.filter(
                 file_association=fa.id
             ).first()
 
             if main_data:
-                payload = {
-                    "file_association_id": fa.id,
-                    "data_version": fa.data_version,
-                    "headers": main_data.data_json.get("headers", []),
-                    "rows": main_data.data_json.get("rows", []),
-                }
-                cache.set(f"fa_version_{fa.id}", fa.data_version, timeout=None)
-                cache.set(f"fa_data_{fa.id}", payload, timeout=None)
-
-        fa.save(update_fields=update_fields)
-        check_triggered_alerts.delay(fa.id)
-
+                with timed("import_stage_ms", "snapshot", timings):
+                    headers = main_data.data_json.get("headers", [])
+                    rows = main_data.data_json.get("rows", [])
+                    payload = {
+                        "file_association_id": fa.id,
+                        "data_version": fa.data_version,
+                        "headers": headers,
+                        "rows": rows,
+                    }
+                    # Render the public JSON once per version; lookup and SSE serve these bytes.
+                    publish_file_snapshot(fa, headers, rows)
+                    bulk_cache.set(f"fa_data_{fa.id}", payload, timeout=None)
+                    cache.set(f"fa_version_{fa.id}", fa.data_version, timeout=None)
+
+        check_triggered_alerts.apply_async((fa.id,), priority=interval_priority(fa))
+
+    except StaleLeaseError as e:
+        incr_metric("imports_fenced")
+        logger.warning("[IMPORT] Discarded stale import of %s: %s", fa.file_name, e)
     except Exception as e:
-        print(f"[IMPORT] Error fetching/storing CSV for {fa.file_name}: {e}")
+        incr_metric("imports_failed")
+        logger.exception("[IMPORT] Error fetching/storing CSV for %s: %s", fa.file_name, e)
+    finally:
+        logger.info(
+            "[IMPORT] %s stage timings (ms): %s", fa.file_name, timings,
+            extra={"file_id": fa.id, "stage_timings_ms": timings}
+        )
+        release_import_lease(fa.id, token)
+        cache.delete(import_inflight_key(file_id))
 
 
 @shared_task
 def check_and_import_files():
-    """Periodic task to fetch and evaluate files based on interval."""
-    now = timezone.now()
-    files = FileAssociation.objects.all()
-
-    for fa in files:
-        interval_seconds = fa.interval.interval_minutes * 60 if fa.interval else 300
-        should_import = False
-        reason = ""
-        if not fa.last_fetched_at:
-            reason = "never imported before"
-            should_import = True
-        elif (now - fa.last_fetched_at).total_seconds() >= interval_seconds:
-            reason = f"interval passed ({fa.interval.interval_minutes} min)"
-            should_import = True
-        else:
-            reason = f"interval not passed yet ({fa.interval.interval_minutes} min)"
+    """
+    One-off scan that queues every file that is due. The import scheduler
+    (manage.py run_import_scheduler) does this continuously; this task is
+    kept for manual or fallback runs.
+    """
+    now = timezone.now().timestamp()
+    queued = 0
 
-        if should_import:
-            print(f"[IMPORT] Triggering import for {fa.file_name} → {reason}")
-            import_file_association.delay(fa.id)
+    for fa in scheduled_files():
+        if next_due_at(fa, now) > now:
+            continue
+        if enqueue_import(fa):
+            queued += 1
+            logger.debug("[IMPORT] Triggering import for %s", fa.file_name)
         else:
-            print(f"[SKIP] {fa.file_name} → {reason}")
+            logger.debug("[SKIP] %s → import already in flight", fa.file_name)
 
-    print("[CHECK] check_and_import_files finished.")
+    logger.info("[CHECK] check_and_import_files finished. %s import(s) queued.", queued)
 
 
 def send_alert_emails(triggered_alerts):
@@ -126,14 +241,14 @@ def send_alert_emails(triggered_alerts):
         else:
             subject = f"Alert Triggered: System Alert"
         message = ta.message
-        print(f"[EMAIL] Preparing email for {fa.file_name}: {subject}")
+        logger.debug("[EMAIL] Preparing email for %s: %s", fa.file_name, subject)
 
         if ta.custom_alert and ta.custom_alert.user and ta.custom_alert.user.email:
             try:
                 send_alert_email(ta.custom_alert.user.email, subject, message)
-                print(f"[EMAIL] Sent to {ta.custom_alert.user.email}")
+                logger.debug("[EMAIL] Sent to %s", ta.custom_alert.user.email)
             except Exception as e:
-                print(f"[EMAIL] Failed to send to {ta.custom_alert.user.email}: {e}")
+                logger.warning("[EMAIL] Failed to send to %s: %s", ta.custom_alert.user.email, e)
 
         for user in MENTUser.objects.all():
             try:
@@ -143,9 +258,9 @@ def send_alert_emails(triggered_alerts):
             if user.email and ('email' in methods or 'all' in methods):
                 try:
                     send_alert_email(user.email, subject, message)
-                    print(f"[EMAIL] Sent to {user.email}")
+                    logger.debug("[EMAIL] Sent to %s", user.email)
                 except Exception as e:
-                    print(f"[EMAIL] Failed to send to {user.email}: {e}")
+                    logger.warning("[EMAIL] Failed to send to %s: %s", user.email, e)
 
 
 def send_sms_notifications(triggered_alerts):
@@ -175,8 +290,17 @@ def send_sms_notifications(triggered_alerts):
 
 
 
-def should_trigger(alert, raw_value):
-    """Check if a global/custom alert should trigger based on its condition."""
+def should_trigger(alert, raw_value, numeric_column=False):
+    """
+    Check if a global/custom alert should trigger based on its condition.
+    Numeric conditions on a numeric column compare the stored floats
+    (engine/conditions.py); "change" and text columns compare strings.
+    """
+    if is_numeric_alert(alert, numeric_column):
+        return numeric_trigger(
+            alert.condition_type.lower(), safe_float(raw_value), alert.last_number, alert.compare_number
+        )
+
     def safe_str(val):
         return str(val).strip().upper() if val is not None else None
 
@@ -208,124 +332,327 @@ def should_trigger(alert, raw_value):
     return v_str != prev_str
 
 
-def evaluate_global_custom_alerts(fa, rows):
-    triggered = []
+def alert_column(field_name, columns, columns_by_lower):
+    """The file column an alert reads. Stored field names are lower-cased; headers keep the CSV casing."""
+    if field_name in columns:
+        return field_name
+    return columns_by_lower.get((field_name or "").lower())
+
+
+def set_last_value(alert, value):
+    alert.last_value = value
+    alert.last_number = safe_float(value)
+
+
+def active_gc_alerts(fa):
+    """The file's active global and custom alerts (triggering deactivates an alert)."""
+    return (
+        list(fa.global_alerts.filter(is_active=True))
+        + list(fa.custom_alerts.filter(is_active=True).select_related("user"))
+    )
 
+
+def evaluate_global_custom_alerts(fa, rows, alerts=None, schema=None):
+    """
+    Active global and custom alerts over `rows`. Numeric alerts that see a
+    single row (the usual symbol-bound alert) are decided together in one
+    numpy pass; text alerts, "change" alerts and alerts that see several rows
+    run in row order and stop at their first trigger, which deactivates them.
+    Alerts trigger in row order, then alert order, whichever path decided them.
+    """
     if getattr(fa, "data_version", 0) == 0:
-        print(f"[GC ALERTS] Skipping alerts for {fa.file_name} → data_version = 0")
+        logger.info("[GC ALERTS] Skipping alerts for %s → data_version = 0", fa.file_name)
         return []
 
-    try:
-        all_alerts = list(fa.global_alerts.all()) + list(fa.custom_alerts.all())
-    except AttributeError:
-        all_alerts = []
+    if alerts is not None:
+        all_alerts = [alert for alert in alerts if alert.is_active]
+    else:
+        try:
+            all_alerts = active_gc_alerts(fa)
+        except AttributeError:
+            all_alerts = []
 
     if not rows or not all_alerts:
-        print(f"[GC ALERTS] No rows or alerts to evaluate for {fa.file_name}")
+        logger.info("[GC ALERTS] No rows or alerts to evaluate for %s", fa.file_name)
         return []
 
-    possible_symbol_keys = ["Symbol/Interval", "Symbol", "sym/int", "sym", "Ticker", "symbol"]
-    
-    for row in rows:
-        normalized_keys = {re.sub(r"[\/_\-\s]", "", k.lower()): k for k in row.keys() if k}
-        symbol_key = next(
-            (v for k, v in normalized_keys.items() if k in [re.sub(r"[\/_\-\s]", "", s.lower()) for s in possible_symbol_keys]),
-            None
-        )
-        if not symbol_key:
-            continue
+    schema = schema or rows_schema(fa, rows)
+    symbol_key = schema["symbol_key"]
+    if not symbol_key:
+        log_sampled(logger, logging.WARNING, f"gc_no_symbol_column:{fa.id}",
+                    "[GC ALERTS] No symbol column in %s", fa.file_name)
+        return []
 
+    columns = schema["columns"]
+    columns_by_lower = {}
+    for column in columns:
+        columns_by_lower.setdefault(column.lower(), column)
+    numeric_columns = {h for h, p in get_column_profiles(fa).items() if p["type"] == "numeric"}
+
+    rows_by_symbol = defaultdict(list)
+    for position, row in enumerate(rows):
         row_sym = str(row.get(symbol_key, "")).strip().upper()
-        if not row_sym:
+        if row_sym:
+            rows_by_symbol[row_sym].append(position)
+    all_positions = sorted(p for positions in rows_by_symbol.values() for p in positions)
+
+    # Single-row numeric alerts, with their inputs to numeric_triggers
+    # gathered in the same pass.
+    vectorized, sequential = [], []
+    conditions, cells, previous, thresholds = [], [], [], []
+    for alert_position, alert in enumerate(all_alerts):
+        column = alert_column(alert.field_name, columns, columns_by_lower)
+        if not column:
+            continue
+        expected_symbol = getattr(alert, "symbol_interval", None)
+        positions = rows_by_symbol.get(expected_symbol.strip().upper(), []) if expected_symbol else all_positions
+        if not positions:
             continue
+        numeric = column in numeric_columns
+        check = (alert_position, alert, column, positions, numeric)
+        if len(positions) == 1 and is_numeric_alert(alert, numeric):
+            vectorized.append(check)
+            conditions.append(alert.condition_type.lower())
+            cells.append((positions[0], column))
+            previous.append(alert.last_number)
+            thresholds.append(alert.compare_number)
+        else:
+            sequential.append(check)
+
+    hits = []  # (row position, alert position, alert, value)
+    if vectorized:
+        fired = numeric_triggers(conditions, gather_numbers(rows, cells), previous, thresholds)
+        for (alert_position, alert, column, positions, _), fire in zip(vectorized, fired):
+            value = rows[positions[0]].get(column)
+            if fire and value is not None:
+                hits.append((positions[0], alert_position, alert, value))
+
+    for alert_position, alert, column, positions, numeric in sequential:
+        for position in positions:
+            value = rows[position].get(column)
+            if value is not None and should_trigger(alert, value, numeric):
+                hits.append((position, alert_position, alert, value))
+                break
+
+    triggered = []
+    updated = {}
+    hits.sort(key=lambda hit: hit[:2])
+    for position, _, alert, value in hits:
+        is_global = isinstance(alert, GlobalAlertRule)
+        row_sym = str(rows[position].get(symbol_key, "")).strip().upper()
+        msg = f"{'GLOBAL' if is_global else 'CUSTOM'} alert for {row_sym} → {alert.field_name}: {value}"
+        triggered.append(
+            TriggeredAlert(
+                file_association=fa,
+                alert_source="global" if is_global else "custom",
+                global_alert=alert if is_global else None,
+                custom_alert=None if is_global else alert,
+                message=msg
+            )
+        )
+        set_last_value(alert, value)
+        alert.is_active = False
+        updated[(type(alert), alert.pk)] = alert
 
-        alerts_to_update = []
+    if updated:
+        by_model = defaultdict(list)
+        for (model, _), alert in updated.items():
+            by_model[model].append(alert)
+        for model, model_alerts in by_model.items():
+            model.objects.bulk_update(model_alerts, ["last_value", "last_number", "is_active"])
 
-        for alert in all_alerts:
-            row_value = row.get(alert.field_name)
-            if row_value is None:
-                continue
+    if triggered:
+        if connection.features.can_return_rows_from_bulk_insert:
+            TriggeredAlert.objects.bulk_create(triggered)
+        else:
+            # Delivery looks alerts up by id, and MySQL doesn't return ids from bulk inserts.
+            for ta in triggered:
+                ta.save()
+        logger.info("[GC ALERTS] %s alerts triggered for %s", len(triggered), fa.file_name)
+
+        user_ids = {
+            ta.custom_alert.user.external_user_id
+            for ta in triggered if ta.custom_alert and ta.custom_alert.user
+        }
+        for user_id in user_ids:
+            update_user_alert_cache(user_id)
+    else:
+        logger.info("[GC ALERTS] No alerts triggered for %s", fa.file_name)
 
-            expected_symbol = getattr(alert, "symbol_interval", None)
-            if expected_symbol and row_sym != expected_symbol.strip().upper():
-                continue
+    return triggered
 
-            if should_trigger(alert, row_value):
-                msg = f"{'GLOBAL' if getattr(alert, 'is_global', False) else 'CUSTOM'} alert for {row_sym} → {alert.field_name}: {row_value}"
-                triggered.append(
-                    TriggeredAlert(
-                        file_association=fa,
-                        alert_source="global" if getattr(alert, "is_global", False) else "custom",
-                        global_alert=alert if getattr(alert, "is_global", False) else None,
-                        custom_alert=alert if getattr(alert, "is_custom", False) else None,
-                        message=msg
-                    )
-                )
 
-                alert.last_value = row_value
-                alert.is_active = False
-                alerts_to_update.append(alert)
 
-        if alerts_to_update:
-            type(alerts_to_update[0]).objects.bulk_update(alerts_to_update, ["last_value", "is_active"])
+def symbol_shard(symbol, shards):
+    """Stable shard for a symbol (crc32, not hash(), so every worker agrees)."""
+    return zlib.crc32(symbol.strip().upper().encode("utf-8")) % shards
 
-            for alert in alerts_to_update:
-                if hasattr(alert, 'user') and alert.user:
-                    update_user_alert_cache(alert.user.external_user_id)
 
-    if triggered:
-        TriggeredAlert.objects.bulk_create(triggered)
-        print(f"[GC ALERTS] {len(triggered)} alerts triggered for {fa.file_name}")
+def load_file_rows(fa):
+    """The file's current rows as FileRows, bound to its schema, for evaluation."""
+    payload = bulk_cache.get(f"fa_data_{fa.id}")
+    if not (payload and payload.get("data_version") == fa.data_version):
+        main_data = fa.maindata.first()
+        payload = main_data.data_json if main_data else {}
 
-        for ta in triggered:
-            user_id = ta.custom_alert.user.external_user_id if ta.custom_alert and ta.custom_alert.user else None
-            if user_id:
-                update_user_alert_cache(user_id)
-    else:
-        print(f"[GC ALERTS] No alerts triggered for {fa.file_name}")
+    rows = payload.get("rows", [])
+    return FileRows(rows, rows_schema(fa, rows))
 
-    return triggered
 
+def evaluate_alert_shard_rows(fa, rows, shard, shards, timings=None):
+    """
+    Evaluate system, global and custom alerts for the rows whose symbol falls in
+    `shard`. A symbol always lands in the same shard, so its SymbolState and
+    symbol-bound alerts are only ever written by one task. Alerts without a
+    symbol_interval apply to every row and are evaluated by shard 0.
+    Returns the saved TriggeredAlerts.
+    """
+    schema = rows.schema if isinstance(rows, FileRows) else rows_schema(fa, rows)
+    fields = schema["fields"]
+    shard_rows = [
+        row for row in rows
+        if (symbol := extract_symbol_from_row(row, fields)) and symbol_shard(symbol, shards) == shard
+    ]
+    triggered_list = []
+    stats = Counter(rows=len(shard_rows))
+
+    if getattr(fa, "algo", None):
+        with timed("alert_stage_ms", "system", timings):
+            for row in shard_rows:
+                system_alerts = process_row_for_alerts(fa, fa.algo, row, stats, fields)
+                for alert in system_alerts:
+                    alert.save()
+                    triggered_list.append(alert)
+                    logger.debug("[SYSTEM ALERT] %s", alert.message)
+
+    with timed("alert_stage_ms", "global_custom", timings):
+        all_alerts = active_gc_alerts(fa)
+        bound_alerts = [
+            a for a in all_alerts
+            if a.symbol_interval and symbol_shard(a.symbol_interval, shards) == shard
+        ]
+        unbound_alerts = [a for a in all_alerts if not a.symbol_interval] if shard == 0 else []
+
+        gc_alerts = []
+        if shard_rows and bound_alerts:
+            gc_alerts += evaluate_global_custom_alerts(fa, shard_rows, bound_alerts, schema)
+        if rows and unbound_alerts:
+            gc_alerts += evaluate_global_custom_alerts(fa, rows, unbound_alerts, schema)
+
+    triggered_list.extend(gc_alerts)
+    for ta in gc_alerts:
+        logger.debug("[GC ALERT] %s", ta.message)
+
+    if gc_alerts:
+        stats["gc_triggered"] += len(gc_alerts)
+    log_run_summary(
+        logger, "[ALERT]", f"{fa.file_name} shard {shard}/{shards}", stats,
+        file_id=fa.id, shard=shard
+    )
+
+    if triggered_list:
+        incr_metric("alerts_triggered", len(triggered_list))
+    return triggered_list
+
+
+def deliver_alerts(fa, triggered_list):
+    if triggered_list:
+        logger.info("[ALERT] Total %s alerts triggered for %s", len(triggered_list), fa.file_name)
+        with timed("alert_stage_ms", "delivery"):
+            send_alert_emails(triggered_list)
+            send_sms_notifications(triggered_list)
+        logger.info("[ALERT] Notifications sent for %s", fa.file_name)
+    else:
+        logger.info("[ALERT] No alerts triggered for %s", fa.file_name)
 
 
 @shared_task
 def check_triggered_alerts(file_id):
-    """Evaluate system, global, and custom alerts and send notifications."""
+    """
+    Evaluate system, global, and custom alerts and send notifications.
+    Large files are split into symbol shards that run as a chord, with
+    delivery in the chord callback; small files are evaluated inline and
+    hand their alerts to the same delivery task.
+    """
     try:
-        fa = FileAssociation.objects.get(id=file_id)
+        fa = FileAssociation.objects.select_related("algo", "interval").get(id=file_id)
     except FileAssociation.DoesNotExist:
-        print(f"[ALERT] FileAssociation id={file_id} not found.")
+        logger.warning("[ALERT] FileAssociation id=%s not found.", file_id)
         return
 
-    print(f"[ALERT] Evaluating alerts for {fa.file_name}")
+    logger.info("[ALERT] Evaluating alerts for %s", fa.file_name)
 
-    triggered_list = []
-    rows = []
+    timings = {}
+    with timed("alert_stage_ms", "load", timings):
+        rows = load_file_rows(fa)
+    if not rows:
+        logger.info("[ALERT] No rows to evaluate for %s", fa.file_name)
+        return
 
-    if getattr(fa, "algo", None):
-        main_data = fa.maindata.first()
-        rows = main_data.data_json.get("rows", []) if main_data else []
-        if rows:
-            for row in rows:
-                system_alerts = process_row_for_alerts(fa, fa.algo, row)
-                for alert in system_alerts:
-                    alert.save()
-                    triggered_list.append(alert)
-                    print(f"[SYSTEM ALERT] {alert.message}")
+    shards = min(
+        settings.ALERT_EVAL_SHARDS,
+        max(1, len(rows) // settings.ALERT_EVAL_MIN_ROWS_PER_SHARD)
+    )
+    priority = interval_priority(fa)
+    if shards <= 1:
+        triggered = evaluate_alert_shard_rows(fa, rows, 0, 1, timings)
+        logger.info(
+            "[ALERT] %s stage timings (ms): %s", fa.file_name, timings,
+            extra={"file_id": fa.id, "stage_timings_ms": timings}
+        )
+        if triggered:
+            # Delivery (email/SMS) runs on the notifications queue so it never holds up evaluation.
+            deliver_triggered_alerts.apply_async(([[ta.id for ta in triggered]], fa.id), priority=priority)
+        else:
+            logger.info("[ALERT] No alerts triggered for %s", fa.file_name)
+        return
 
-    if rows:
-        gc_alerts = evaluate_global_custom_alerts(fa, rows)
-        triggered_list.extend(gc_alerts)
-        for ta in gc_alerts:
-            print(f"[GC ALERT] {ta.message}")
+    logger.info("[ALERT] Splitting %s rows of %s into %s shards", len(rows), fa.file_name, shards)
+    chord(
+        evaluate_alert_shard.s(fa.id, fa.data_version, shard, shards).set(priority=priority)
+        for shard in range(shards)
+    )(deliver_triggered_alerts.s(fa.id).set(priority=priority))
 
-    if triggered_list:
-        print(f"[ALERT] Total {len(triggered_list)} alerts triggered for {fa.file_name}")
-        send_alert_emails(triggered_list)
-        send_sms_notifications(triggered_list)
-        print(f"[ALERT] Notifications sent for {fa.file_name}")
-    else:
-        print(f"[ALERT] No alerts triggered for {fa.file_name}")
+
+@shared_task
+def evaluate_alert_shard(file_id, data_version, shard, shards):
+    """Evaluate one symbol shard of a file; returns the TriggeredAlert ids for delivery."""
+    try:
+        fa = FileAssociation.objects.select_related("algo").get(id=file_id)
+    except FileAssociation.DoesNotExist:
+        return []
+
+    if fa.data_version != data_version:
+        # A newer import already queued its own evaluation of the fresh rows.
+        logger.info("[ALERT] Shard %s/%s of %s skipped → version %s is stale", shard, shards, fa.file_name, data_version)
+        return []
+
+    timings = {}
+    with timed("alert_stage_ms", "load", timings):
+        rows = load_file_rows(fa)
+    triggered = evaluate_alert_shard_rows(fa, rows, shard, shards, timings)
+    logger.info(
+        "[ALERT] %s shard %s/%s stage timings (ms): %s", fa.file_name, shard, shards, timings,
+        extra={"file_id": fa.id, "shard": shard, "stage_timings_ms": timings}
+    )
+    return [ta.id for ta in triggered]
+
+
+@shared_task
+def deliver_triggered_alerts(shard_results, file_id):
+    """Chord callback: gather every shard's alerts and send notifications once."""
+    alert_ids = [alert_id for ids in shard_results for alert_id in ids]
+    try:
+        fa = FileAssociation.objects.get(id=file_id)
+    except FileAssociation.DoesNotExist:
+        return
+
+    triggered_list = list(
+        TriggeredAlert.objects.filter(id__in=alert_ids).select_related(
+            "file_association", "global_alert", "custom_alert__user"
+        ).order_by("id")
+    )
+    deliver_alerts(fa, triggered_list)
 
 
 
@@ -334,7 +661,7 @@ def send_announcement_sms_task(message):
     """Send announcement SMS to all users with phones."""
 
     if getattr(settings, "ENVIRONMENT", "development") != "production":
-        print(f"[DEV MODE] SMS not sent. Message preview:\n{message}")
+        logger.info("[DEV MODE] SMS not sent. Message preview:\n%s", message)
         return {"sent": 0, "failed": 0, "total": 0}
     
     users = MENTUser.objects.exclude(phone__isnull=True).exclude(phone__exact="")
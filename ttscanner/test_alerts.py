@@ -0,0 +1,290 @@
+"""
+Alert rules: duplicate detection, the numeric threshold rule
+(engine/conditions.py) and global/custom evaluation.
+
+Run with:  python manage.py test ttscanner.test_alerts
+"""
+import itertools, math
+from django.db import IntegrityError, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .engine.conditions import NUMERIC_CONDITIONS, is_numeric_alert, numeric_trigger, numeric_triggers
+from .models import (
+    Algo, FileAssociation, MENTUser, CustomAlert, GlobalAlertRule, TriggeredAlert, parse_alert_number,
+    legacy_duplicate_key
+)
+from .serializers import is_numeric
+from .tasks import evaluate_alert_shard_rows, evaluate_global_custom_alerts, load_file_rows, should_trigger
+from .utils.csv_utils import store_csv_data, compute_hash_bytes
+
+LOCAL_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "alerts-default"},
+    "bulk": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "alerts-bulk"},
+}
+
+CSV = (
+    "Sym/Int,Direction,Entry Price,Last,Profit %\n"
+    "AAA 5,LONG,100,105,1.5\n"
+    "BBB 5,SHORT,50,9.5,-0.9\n"
+    "CCC 5,LONG,20,10,\n"
+).encode("utf-8")
+
+
+def make_alert(condition, compare_value, last_value=None, field_name="Last"):
+    alert = GlobalAlertRule(symbol_interval="AAA 5", field_name=field_name, condition_type=condition,
+                            compare_value=compare_value, last_value=last_value)
+    alert.normalize_keys()
+    return alert
+
+
+class NumericTriggerTests(SimpleTestCase):
+    """Thresholds on numeric columns compare as floats, not strings."""
+
+    def triggers(self, condition, compare_value, last_value, value, numeric_column=True):
+        return should_trigger(make_alert(condition, compare_value, last_value), value, numeric_column)
+
+    def test_compares_numbers_not_strings(self):
+        # As strings "9.5" > "10", so none of these used to trigger.
+        self.assertTrue(self.triggers("increase", "10", "9.5", "10.5"))
+        self.assertTrue(self.triggers("threshold_cross", "10", "9.5", "11"))
+        self.assertTrue(self.triggers("decrease", "10", "10.5", "9.5"))
+        self.assertFalse(self.triggers("increase", "9.5", "10", "100"))
+        self.assertTrue(self.triggers("increase", "1,000", "999", "1,000.5"))
+
+    def test_negative_thresholds(self):
+        self.assertTrue(self.triggers("threshold_cross", "-1", "-1.07", "-0.9"))
+        self.assertFalse(self.triggers("threshold_cross", "-1", "-0.9", "-0.5"))
+        self.assertTrue(self.triggers("decrease", "-1", "-0.9", "-1.2"))
+        self.assertFalse(self.triggers("decrease", "-1", "-1.2", "-1.5"))
+
+    def test_missing_values(self):
+        for condition in NUMERIC_CONDITIONS:
+            self.assertFalse(numeric_trigger(condition, None, 1.0, 2.0), condition)
+            self.assertFalse(numeric_trigger(condition, math.nan, 1.0, 2.0), condition)
+            self.assertFalse(numeric_trigger(condition, 2.0, 1.0, None), condition)
+        # Without a previous value the first number triggers.
+        self.assertTrue(numeric_trigger("increase", 1.0, None, 2.0))
+        self.assertTrue(numeric_trigger("decrease", 3.0, math.nan, 2.0))
+        self.assertFalse(self.triggers("increase", "10", "9", ""))
+        self.assertFalse(self.triggers("increase", "10", "9", "n/a"))
+
+    def test_equals(self):
+        self.assertTrue(numeric_trigger("equals", 10.0, 9.0, 10.0))
+        self.assertTrue(numeric_trigger("equals", 10.0, None, 10.0))
+        self.assertFalse(numeric_trigger("equals", 10.0, 10.0, 10.0))
+        self.assertFalse(numeric_trigger("equals", 10.01, 9.0, 10.0))
+        self.assertTrue(self.triggers("equals", "10", "9", "10.00"))
+
+    def test_vectorized_matches_scalar(self):
+        values = [None, math.nan, -10.0, -1.0, 0.0, 9.5, 10.0, 10.5]
+        cases = list(itertools.product(NUMERIC_CONDITIONS, values, values, values))
+        conditions, current, previous, threshold = zip(*cases)
+        vectorized = numeric_triggers(conditions, current, previous, threshold).tolist()
+        self.assertEqual(vectorized, [numeric_trigger(*case) for case in cases])
+
+    def test_text_columns_use_the_string_rule(self):
+        alert = make_alert("equals", "LONG", "SHORT", field_name="Direction")
+        self.assertFalse(is_numeric_alert(alert, False))
+        self.assertTrue(should_trigger(alert, "LONG", numeric_column=False))
+        # A numeric threshold on a text column keeps the old string comparison.
+        self.assertFalse(self.triggers("increase", "10", "9.5", "10.5", numeric_column=False))
+        # "change" always compares strings.
+        self.assertFalse(is_numeric_alert(make_alert("change", None, "1"), True))
+        self.assertTrue(should_trigger(make_alert("change", None, "1"), "1.0", numeric_column=True))
+
+    def test_non_finite_values_are_not_numbers(self):
+        for value in ("nan", "NaN", "inf", "-inf", "Infinity"):
+            self.assertIsNone(parse_alert_number(value), value)
+            self.assertFalse(is_numeric(value), value)
+        self.assertEqual(parse_alert_number("1,234.5"), 1234.5)
+        self.assertTrue(is_numeric("-0.5"))
+        self.assertFalse(is_numeric_alert(make_alert("increase", "nan"), True))
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class AlertTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        algo, _ = Algo.objects.get_or_create(algo_name="TTScanner")
+        cls.fa = FileAssociation.objects.create(algo=algo, file_path="alerts.csv")
+        store_csv_data(cls.fa, CSV, compute_hash_bytes(CSV))
+        cls.fa.data_version = 1
+        cls.fa.save(update_fields=["data_version"])
+        cls.users = [
+            MENTUser.objects.create(
+                external_user_id=2000 + i, username=f"alerts{i}", role="regular",
+                email=f"alerts{i}@example.com", phone=f"+1555100{i:04d}"
+            )
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+
+
+class CustomAlertUniquenessTests(AlertTestCase):
+    """A custom alert is unique per user, file, symbol and column; other users may repeat it."""
+
+    alert = {"symbol_interval": "AAA 5", "field_name": "Last", "condition_type": "increase", "compare_value": "110"}
+
+    def create(self, user):
+        return self.client.post(reverse("ca-create", args=[user.external_user_id]),
+                                {"file_association": self.fa.id, **self.alert}, format="json")
+
+    def test_users_can_create_the_same_alert(self):
+        self.assertEqual(self.create(self.users[0]).status_code, 201)
+        self.assertEqual(self.create(self.users[1]).status_code, 201)
+        self.assertEqual(self.create(self.users[0]).status_code, 400)
+        self.assertEqual(CustomAlert.objects.filter(file_association=self.fa).count(), 2)
+
+    def test_bulk_create_checks_only_the_users_alerts(self):
+        self.assertEqual(self.create(self.users[0]).status_code, 201)
+        url = reverse("ca-bulk", args=[self.users[1].external_user_id])
+        response = self.client.post(url, {"file_association": self.fa.id, "alerts": [self.alert, self.alert]},
+                                    format="json")
+        self.assertEqual([r["status"] for r in response.data["results"]], ["created", "error"])
+
+    def test_update_checks_only_the_users_alerts(self):
+        self.create(self.users[0])
+        self.client.post(reverse("ca-create", args=[self.users[1].external_user_id]),
+                         {"file_association": self.fa.id, **self.alert, "field_name": "Entry Price"}, format="json")
+        other = CustomAlert.objects.get(user=self.users[1])
+        response = self.client.patch(reverse("ca-update", args=[other.id]), {"field_name": "Last"}, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_database_rejects_same_user_duplicate(self):
+        values = dict(file_association=self.fa, user=self.users[0], symbol_interval="AAA 5",
+                      field_name="Last", condition_type="change")
+        CustomAlert.objects.create(**values)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CustomAlert.objects.create(**{**values, "symbol_interval": " aaa 5 "})
+
+
+class LegacyDuplicateKeyTests(AlertTestCase):
+    """Duplicates kept by migration 0058 under a #<id> key stay editable."""
+
+    def legacy_pair(self, model, **owner):
+        values = dict(file_association=self.fa, symbol_interval="AAA 5", condition_type="increase",
+                      compare_value="110", **owner)
+        original = model.objects.create(field_name="last", **values)
+        duplicate = model.objects.create(field_name="profit %", **values)
+        model.objects.filter(id=duplicate.id).update(
+            field_name="last", field_name_key=legacy_duplicate_key("last", duplicate.id)
+        )
+        duplicate.refresh_from_db()
+        return original, duplicate
+
+    def test_save_keeps_the_suffix(self):
+        _, duplicate = self.legacy_pair(GlobalAlertRule)
+        duplicate.compare_value = "120"
+        duplicate.save()
+        duplicate.refresh_from_db()
+        self.assertEqual(duplicate.field_name_key, f"last#{duplicate.id}")
+        self.assertEqual(duplicate.compare_number, 120.0)
+
+    def test_api_updates_keep_the_suffix(self):
+        _, global_duplicate = self.legacy_pair(GlobalAlertRule)
+        response = self.client.patch(reverse("ga-update", args=[global_duplicate.id]), {
+            "file_association": self.fa.id, "symbol_interval": "AAA 5", "field_name": "Last",
+            "condition_type": "increase", "compare_value": "120"
+        }, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+
+        _, custom_duplicate = self.legacy_pair(CustomAlert, user=self.users[0])
+        response = self.client.patch(reverse("ca-update", args=[custom_duplicate.id]),
+                                     {"compare_value": "120"}, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        custom_duplicate.refresh_from_db()
+        self.assertEqual(custom_duplicate.field_name_key, f"last#{custom_duplicate.id}")
+
+    def test_moving_a_duplicate_drops_the_suffix(self):
+        _, duplicate = self.legacy_pair(GlobalAlertRule)
+        duplicate.field_name = "Entry Price"
+        duplicate.save()
+        self.assertEqual(duplicate.field_name_key, "entry price")
+
+    def test_suffix_fits_the_column(self):
+        key = legacy_duplicate_key("x" * 255, 12345)
+        self.assertEqual(len(key), 255)
+        self.assertTrue(key.endswith("#12345"))
+
+
+class ActiveAlertTests(AlertTestCase):
+    """Only active alerts are evaluated, and a trigger deactivates the alert."""
+
+    def global_alert(self, **values):
+        return GlobalAlertRule.objects.create(**{
+            "file_association": self.fa, "symbol_interval": "AAA 5", "field_name": "Last",
+            "condition_type": "increase", "compare_value": "100", **values
+        })
+
+    def evaluate(self):
+        return evaluate_global_custom_alerts(self.fa, load_file_rows(self.fa))
+
+    def test_inactive_alerts_do_not_trigger(self):
+        self.global_alert(is_active=False)
+        CustomAlert.objects.create(
+            user=self.users[0], file_association=self.fa, symbol_interval="AAA 5", field_name="Last",
+            condition_type="increase", compare_value="100", is_active=False
+        )
+        self.assertEqual(self.evaluate(), [])
+        self.assertEqual(evaluate_alert_shard_rows(self.fa, load_file_rows(self.fa), 0, 1), [])
+        self.assertFalse(TriggeredAlert.objects.exists())
+
+    def test_triggered_alert_is_deactivated(self):
+        alert = self.global_alert()
+        triggered = self.evaluate()
+        self.assertEqual([t.global_alert_id for t in triggered], [alert.id])
+        self.assertEqual(triggered[0].alert_source, "global")
+
+        alert.refresh_from_db()
+        self.assertFalse(alert.is_active)
+        self.assertEqual(alert.last_value, "105")
+        self.assertEqual(alert.last_number, 105.0)
+        self.assertEqual(self.evaluate(), [])
+
+    def test_alert_on_every_row_triggers_once(self):
+        alert = CustomAlert.objects.create(
+            user=self.users[0], file_association=self.fa, field_name="Entry Price",
+            condition_type="decrease", compare_value="60"
+        )
+        triggered = self.evaluate()
+        self.assertEqual([t.custom_alert_id for t in triggered], [alert.id])
+        self.assertIn("AAA 5", triggered[0].message)
+
+
+class GlobalCustomEvaluationTests(AlertTestCase):
+    """evaluate_global_custom_alerts end to end on a stored file."""
+
+    def evaluate(self):
+        return evaluate_global_custom_alerts(self.fa, load_file_rows(self.fa))
+
+    def test_numeric_threshold_on_stored_rows(self):
+        # BBB's Last is 9.5: crossed below 10 from 10.5, which the string rule missed.
+        alert = GlobalAlertRule.objects.create(
+            file_association=self.fa, symbol_interval="bbb 5", field_name="LAST",
+            condition_type="decrease", compare_value="10", last_value="10.5"
+        )
+        triggered = self.evaluate()
+        self.assertEqual([t.global_alert_id for t in triggered], [alert.id])
+        self.assertEqual(triggered[0].message, "GLOBAL alert for BBB 5 → last: 9.5")
+
+    def test_alerts_trigger_in_row_order_across_both_paths(self):
+        numeric = GlobalAlertRule.objects.create(
+            file_association=self.fa, symbol_interval="BBB 5", field_name="Last",
+            condition_type="increase", compare_value="9"
+        )
+        text = CustomAlert.objects.create(
+            user=self.users[0], file_association=self.fa, symbol_interval="AAA 5", field_name="direction",
+            condition_type="equals", compare_value="LONG"
+        )
+        triggered = self.evaluate()
+        self.assertEqual(
+            [(t.alert_source, t.global_alert_id or t.custom_alert_id) for t in triggered],
+            [("custom", text.id), ("global", numeric.id)]
+        )
+        text.refresh_from_db()
+        self.assertEqual(text.last_value, "LONG")
+        self.assertIsNone(text.last_number)
@@ -0,0 +1,117 @@
+"""
+Read-replica routing, with a second SQLite database standing in for the replica.
+
+Rows written straight to one database and not the other show where a request
+read from: replica views must see the replica's rows, writes must land on the
+primary, and a client that just wrote must read from the primary.
+
+Run with:  python manage.py test ttscanner.test_db_routing
+"""
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .db_router import current_read_alias, use_replica
+from .models import Algo, Group, FileAssociation, Interval, MENTUser, TriggeredAlert
+
+REPLICA = "test_replica"
+
+LOCAL_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "routing-default"},
+    "bulk": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "routing-bulk"},
+}
+
+# Registered before the test databases are created, so the runner builds and
+# migrates a separate database for it.
+if REPLICA not in connections.settings:
+    connections.settings[REPLICA] = connections.configure_settings({
+        "default": connections.settings["default"],
+        REPLICA: {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"},
+    })[REPLICA]
+
+
+@override_settings(CACHES=LOCAL_CACHES, REPLICA_DATABASE=REPLICA, REPLICA_STICKY_SECONDS=30)
+class ReplicaRoutingTests(TestCase):
+    databases = {"default", REPLICA}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.algo, _ = Algo.objects.get_or_create(algo_name="TTScanner")
+        cls.user = MENTUser.objects.create(external_user_id=4242, username="routing", role="regular")
+        cls.fa = FileAssociation.objects.create(
+            algo=cls.algo, interval=Interval.objects.get_or_create(interval_name="5min")[0], file_path="routing.csv"
+        )
+        # Only on the replica, as if it were behind or ahead of the primary.
+        Algo.objects.using(REPLICA).create(algo_name="ReplicaOnly")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def algo_names(self, response):
+        return {item["algo_name"] for item in response.data}
+
+    def test_replica_views_read_from_replica(self):
+        response = self.client.get(reverse("algo-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ReplicaOnly", self.algo_names(response))
+        self.assertNotIn("TTScanner", self.algo_names(response))
+
+    def test_unmarked_views_read_from_primary(self):
+        # Favorites rebuild the row cache, so they stay on the primary, which has the user.
+        response = self.client.get(reverse("fav-row-all", args=[self.user.external_user_id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_writes_go_to_primary(self):
+        response = self.client.post(reverse("group-create"), {"group_name": "Written"}, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertTrue(Group.objects.using("default").filter(group_name="Written").exists())
+        self.assertFalse(Group.objects.using(REPLICA).filter(group_name="Written").exists())
+
+    def test_client_reads_its_own_writes(self):
+        self.client.post(reverse("group-create"), {"group_name": "Pinned"}, format="json")
+
+        response = self.client.get(reverse("algo-list"))
+        self.assertIn("TTScanner", self.algo_names(response))
+        self.assertNotIn("ReplicaOnly", self.algo_names(response))
+
+        other = APIClient(REMOTE_ADDR="10.0.0.2")
+        self.assertIn("ReplicaOnly", self.algo_names(other.get(reverse("algo-list"))))
+
+    def test_failed_writes_do_not_pin(self):
+        response = self.client.post(reverse("ca-create", args=[self.user.external_user_id]), {}, format="json")
+        self.assertGreaterEqual(response.status_code, 400)
+        self.assertIn("ReplicaOnly", self.algo_names(self.client.get(reverse("algo-list"))))
+
+    def test_user_pin_follows_external_user_id(self):
+        url = reverse("ca-all", args=[self.user.external_user_id])
+        self.assertEqual(self.client.get(url).status_code, 404)  # the user isn't on the replica
+
+        response = self.client.post(reverse("ca-create", args=[self.user.external_user_id]), {
+            "file_association": self.fa.id, "symbol_interval": "AAPL 5", "field_name": "Last",
+            "condition_type": "increase", "compare_value": "100"
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+
+        # Same user from another address: pinned by external_user_id.
+        other = APIClient(REMOTE_ADDR="10.0.0.3")
+        response = other.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+    def test_routing_does_not_leak_past_the_request(self):
+        self.client.get(reverse("algo-list"))
+        self.assertIsNone(current_read_alias.get())
+        self.assertTrue(Algo.objects.filter(algo_name="TTScanner").exists())
+
+    def test_sse_poll_reads_replica_and_claims_on_primary(self):
+        alert = TriggeredAlert.objects.create(file_association=self.fa, alert_source="system", symbol="A", message="m")
+        with use_replica(REPLICA):
+            self.assertFalse(TriggeredAlert.objects.exists())
+
+        # The replica hasn't replicated the alert yet, so nothing is sent or claimed.
+        response = self.client.get(reverse("sse_user_alerts", args=[self.user.external_user_id]))
+        self.assertEqual(next(response.streaming_content), b": heartbeat\n\n")
+        alert.refresh_from_db()
+        self.assertFalse(alert.sent_to_ui)
@@ -0,0 +1,124 @@
+"""
+Per-file import lease and fencing token (utils/lock_utils.py).
+
+Only one import of a file holds the lease at a time; a run whose lease
+expired and was re-taken can't write over the newer run; and an upload that
+finds the file unchanged doesn't write back fields a concurrent import set.
+
+Run with:  python manage.py test ttscanner.test_import_lease
+"""
+from unittest import mock
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .models import Algo, FileAssociation, MainData
+from .utils.csv_utils import store_csv_data, compute_hash_bytes
+from .utils.lock_utils import (
+    acquire_import_lease, release_import_lease, StaleLeaseError, lease_key, fence_key
+)
+
+LOCAL_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "lease-default"},
+    "bulk": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "lease-bulk"},
+}
+
+
+def csv_bytes(last):
+    return f"Sym/Int,Direction,Entry Price,Last\nAAA 5,LONG,100,{last}\n".encode("utf-8")
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ImportLeaseTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        algo, _ = Algo.objects.get_or_create(algo_name="TTScanner")
+        cls.fa = FileAssociation.objects.create(algo=algo, file_path="lease.csv")
+
+    def setUp(self):
+        cache.clear()
+
+    def stored_last(self):
+        return MainData.objects.get(file_association=self.fa).data_json["rows"][0]["Last"]
+
+    def test_one_lease_per_file(self):
+        token = acquire_import_lease(self.fa)
+        self.assertIsNotNone(token)
+        self.assertIsNone(acquire_import_lease(self.fa))
+
+        release_import_lease(self.fa.id, token)
+        next_token = acquire_import_lease(self.fa)
+        self.assertGreater(next_token, token)
+
+    def test_release_keeps_a_lease_taken_over_by_another_run(self):
+        token = acquire_import_lease(self.fa)
+        cache.delete(lease_key(self.fa.id))  # lease expired
+        newer = acquire_import_lease(self.fa)
+
+        release_import_lease(self.fa.id, token)
+        self.assertEqual(cache.get(lease_key(self.fa.id)), newer)
+
+    def test_stale_token_is_rejected(self):
+        stale = acquire_import_lease(self.fa)
+        cache.delete(lease_key(self.fa.id))  # lease expired mid-import
+        newer = acquire_import_lease(self.fa)
+
+        content = csv_bytes(105)
+        store_csv_data(self.fa, content, compute_hash_bytes(content), fence_token=newer)
+
+        late = csv_bytes(99)
+        with self.assertRaises(StaleLeaseError):
+            store_csv_data(self.fa, late, compute_hash_bytes(late), fence_token=stale)
+
+        self.fa.refresh_from_db()
+        self.assertEqual(self.fa.import_fence, newer)
+        self.assertEqual(self.fa.last_hash, compute_hash_bytes(content))
+        self.assertEqual(self.stored_last(), "105")
+
+    def test_tokens_stay_ahead_of_the_stored_fence_after_eviction(self):
+        token = acquire_import_lease(self.fa)
+        content = csv_bytes(105)
+        store_csv_data(self.fa, content, compute_hash_bytes(content), fence_token=token)
+        release_import_lease(self.fa.id, token)
+        cache.delete(fence_key(self.fa.id))
+
+        self.fa.refresh_from_db()
+        self.assertGreater(acquire_import_lease(self.fa), token)
+
+    def test_fence_evicted_between_seed_and_increment(self):
+        self.fa.import_fence = 7
+        real_incr = cache.incr
+
+        def evict_then_incr(key, *args, **kwargs):
+            if evict_then_incr.first:
+                evict_then_incr.first = False
+                cache.delete(key)
+            return real_incr(key, *args, **kwargs)
+
+        evict_then_incr.first = True
+        with mock.patch.object(cache, "incr", side_effect=evict_then_incr):
+            self.assertEqual(acquire_import_lease(self.fa), 8)
+
+    def test_unchanged_upload_keeps_a_concurrent_imports_writes(self):
+        content = csv_bytes(105)
+        token = acquire_import_lease(self.fa)
+        store_csv_data(self.fa, content, compute_hash_bytes(content), fence_token=token)
+        release_import_lease(self.fa.id, token)
+
+        def fetch_while_another_import_commits(path):
+            FileAssociation.objects.filter(id=self.fa.id).update(data_version=F("data_version") + 1)
+            return content
+
+        with mock.patch("ttscanner.views.fetch_ftp_bytes", side_effect=fetch_while_another_import_commits):
+            response = APIClient().post(reverse("fa-upload", args=[self.fa.id]), {"ftp_path": "lease.csv"},
+                                        format="json")
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertFalse(response.data["changed"])
+        fa = FileAssociation.objects.get(id=self.fa.id)
+        self.assertEqual(fa.data_version, self.fa.data_version + 1)
+        self.assertEqual(fa.import_fence, token)
+        self.assertEqual(fa.last_hash, compute_hash_bytes(content))
+        self.assertIsNotNone(fa.schema)
@@ -0,0 +1,55 @@
+"""
+Buffered metric counters (utils/metrics_utils.py).
+
+Run with:  python manage.py test ttscanner.test_metrics
+"""
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from .utils import metrics_utils
+from .utils.metrics_utils import flush_metrics, get_metrics, incr_metric
+
+LOCAL_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "metrics-default"},
+}
+
+
+@override_settings(CACHES=LOCAL_CACHES, METRICS_FLUSH_SECONDS=3600)
+class FlushMetricsTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        metrics_utils._pending.clear()
+
+    def test_failed_flush_keeps_the_counts(self):
+        incr_metric("imports_started", 2)
+        with mock.patch.object(cache, "add", side_effect=ConnectionError("redis down")):
+            flush_metrics()
+        self.assertEqual(metrics_utils._pending["imports_started"], 2)
+
+        incr_metric("imports_started")
+        self.assertEqual(get_metrics(["imports_started"]), {"imports_started": 3})
+        self.assertFalse(metrics_utils._pending)
+
+    def test_counts_written_before_a_failure_are_not_kept(self):
+        incr_metric("imports_started")
+        incr_metric("imports_failed")
+        real_add = cache.add
+
+        def fail_second(key, *args, **kwargs):
+            if key == "metrics_imports_failed":
+                raise ConnectionError("redis down")
+            return real_add(key, *args, **kwargs)
+
+        with mock.patch.object(cache, "add", side_effect=fail_second):
+            flush_metrics()
+        self.assertEqual(dict(metrics_utils._pending), {"imports_failed": 1})
+        self.assertEqual(get_metrics(["imports_started", "imports_failed"]),
+                         {"imports_started": 1, "imports_failed": 1})
+
+    def test_timing_a_block_survives_a_cache_outage(self):
+        with override_settings(METRICS_FLUSH_SECONDS=0), \
+                mock.patch.object(cache, "add", side_effect=ConnectionError("redis down")):
+            with metrics_utils.timed("import_stage_ms", "fetch"):
+                pass
+        self.assertEqual(metrics_utils._pending["import_stage_ms_fetch_count"], 1)
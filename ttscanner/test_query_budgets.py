@@ -0,0 +1,233 @@
+"""
+Query-count budgets per API endpoint.
+
+Each endpoint runs against a seeded dataset with dozens of alerts, files and
+favorites, and must stay within a fixed number of queries. The budgets don't
+grow with the data, so an N+1 (a serializer field walking a relation that the
+view didn't select_related/prefetch) fails here instead of in production.
+
+Run with:  python manage.py test ttscanner.test_query_budgets
+"""
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .models import (
+    Algo, Group, Interval, FileAssociation, MENTUser, UserSettings,
+    GlobalAlertRule, CustomAlert, TriggeredAlert, FavoriteRow, Announcement
+)
+from .utils.csv_utils import store_csv_data, compute_hash_bytes
+
+LOCAL_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "budget-default"},
+    "bulk": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "budget-bulk"},
+}
+
+ROWS_PER_FILE = 25
+ALERTS_PER_FILE = 10
+USERS = 3
+
+
+def csv_bytes(symbol_count, price_offset=0):
+    lines = ["Sym/Int,Direction,Bars Since Entry,Entry Price,Stop Price,Last,Profit,Profit %,Target #1"]
+    for i in range(symbol_count):
+        price = 100 + i + price_offset
+        lines.append(f"SYM{i:03d} 5,LONG,{i + 1},{price},{price - 3},{price + 1},1.5,0.8,{price + 2}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class QueryBudgetTestCase(TestCase):
+    """Seeded data plus assertMaxQueries; subclass per area of the API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Migrations seed some of these, so reuse whatever is already there.
+        cls.algos = [Algo.objects.get_or_create(algo_name=name)[0] for name in ("TTScanner", "FSOptions")]
+        cls.groups = [Group.objects.get_or_create(group_name=name)[0] for name in ("SPDR", "Sectors")]
+        cls.intervals = [Interval.objects.get_or_create(interval_name=name)[0] for name in ("5min", "1h")]
+
+        cls.files = []
+        for algo in cls.algos:
+            for group, interval in zip(cls.groups, cls.intervals):
+                fa = FileAssociation.objects.create(algo=algo, group=group, interval=interval, file_path="budget.csv")
+                content = csv_bytes(ROWS_PER_FILE)
+                store_csv_data(fa, content, compute_hash_bytes(content))
+                fa.data_version = 1
+                fa.save(update_fields=["data_version"])
+                cls.files.append(fa)
+        cls.fa = cls.files[0]
+
+        cls.users = []
+        for i in range(USERS):
+            user = MENTUser.objects.create(
+                external_user_id=1000 + i, username=f"budget{i}", role="regular",
+                email=f"budget{i}@example.com", phone=f"+1555000{i:04d}"
+            )
+            UserSettings.objects.create(user=user, delivery_methods=["email"])
+            cls.users.append(user)
+        cls.user = cls.users[0]
+
+        global_alerts, custom_alerts = [], []
+        for fa in cls.files:
+            for i in range(ALERTS_PER_FILE):
+                global_alerts.append(GlobalAlertRule(
+                    file_association=fa, symbol_interval=f"SYM{i:03d} 5", field_name="Last",
+                    condition_type="increase", compare_value=str(100 + i)
+                ))
+                custom_alerts.append(CustomAlert(
+                    user=cls.users[i % USERS], file_association=fa, symbol_interval=f"SYM{i:03d} 5",
+                    field_name="Profit %", condition_type="change"
+                ))
+        for alert in global_alerts + custom_alerts:
+            alert.normalize_keys()
+        GlobalAlertRule.objects.bulk_create(global_alerts)
+        CustomAlert.objects.bulk_create(custom_alerts)
+        cls.global_alert = GlobalAlertRule.objects.filter(file_association=cls.fa).first()
+        cls.custom_alert = CustomAlert.objects.filter(user=cls.user).first()
+
+        triggered = []
+        for alert in GlobalAlertRule.objects.all():
+            triggered.append(TriggeredAlert(
+                file_association_id=alert.file_association_id, alert_source="global",
+                global_alert=alert, symbol=alert.symbol_interval, message="global"
+            ))
+        for alert in CustomAlert.objects.all():
+            triggered.append(TriggeredAlert(
+                file_association_id=alert.file_association_id, alert_source="custom",
+                custom_alert=alert, symbol=alert.symbol_interval, message="custom"
+            ))
+        TriggeredAlert.objects.bulk_create(triggered)
+
+        main_rows = cls.fa.maindata.first().data_json["rows"]
+        FavoriteRow.objects.bulk_create([
+            FavoriteRow(user=user, file_association=cls.fa, row_id=row["_row_id"], row_hash=row["_row_hash"])
+            for user in cls.users for row in main_rows[:10]
+        ])
+        Announcement.objects.bulk_create([Announcement(message=f"note {i}", type="SMS") for i in range(10)])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def assertMaxQueries(self, budget, method, url, data=None, expected_status=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data, format="json")
+        if expected_status is not None:
+            self.assertEqual(response.status_code, expected_status, getattr(response, "data", response))
+        self.assertLessEqual(
+            len(ctx.captured_queries), budget,
+            f"{method.upper()} {url} ran {len(ctx.captured_queries)} queries (budget {budget}):\n"
+            + "\n".join(q["sql"] for q in ctx.captured_queries)
+        )
+        return response
+
+
+class AdminEndpointBudgetTests(QueryBudgetTestCase):
+
+    def test_reference_lists(self):
+        self.assertMaxQueries(1, "get", reverse("algo-list"), expected_status=200)
+        self.assertMaxQueries(1, "get", reverse("group-list"), expected_status=200)
+        self.assertMaxQueries(1, "get", reverse("interval-list"), expected_status=200)
+
+    def test_file_association_list(self):
+        self.assertMaxQueries(1, "get", reverse("fa-list"), expected_status=200)
+
+    def test_global_alert_list(self):
+        response = self.assertMaxQueries(1, "get", reverse("ga-all"), expected_status=200)
+        self.assertEqual(len(response.data), len(self.files) * ALERTS_PER_FILE)
+        self.assertTrue(all(item["algo_name"] and item["interval_name"] for item in response.data))
+
+    def test_triggered_alerts_admin(self):
+        self.assertMaxQueries(2, "get", reverse("alert-logs-admin"), expected_status=200)
+
+    def test_counts_and_announcements(self):
+        self.assertMaxQueries(1, "get", reverse("alert-count-admin"), expected_status=200)
+        self.assertMaxQueries(1, "get", reverse("file-count-admin"), expected_status=200)
+        self.assertMaxQueries(1, "get", reverse("global-alert-count-admin"), expected_status=200)
+        self.assertMaxQueries(1, "get", reverse("announcement_log"), expected_status=200)
+
+    def test_global_alert_create_update_delete(self):
+        self.assertMaxQueries(6, "post", reverse("ga-create", args=[self.fa.id]), {
+            "symbol_interval": "SYM020 5", "field_name": "Last",
+            "condition_type": "increase", "compare_value": "120"
+        }, expected_status=201)
+        self.assertMaxQueries(6, "patch", reverse("ga-update", args=[self.global_alert.id]), {
+            "file_association": self.fa.id, "symbol_interval": self.global_alert.symbol_interval,
+            "field_name": "Last", "condition_type": "increase", "compare_value": "150"
+        }, expected_status=200)
+        self.assertMaxQueries(6, "delete", reverse("ga-delete", args=[self.global_alert.id]))
+
+    def test_global_alert_bulk(self):
+        items = [
+            {"symbol_interval": f"SYM{i:03d} 5", "field_name": "Stop Price", "condition_type": "decrease",
+             "compare_value": "90"}
+            for i in range(ROWS_PER_FILE)
+        ]
+        url = reverse("ga-bulk", args=[self.fa.id])
+        response = self.assertMaxQueries(6, "post", url, {"alerts": items}, expected_status=201)
+        ids = [r["id"] for r in response.data["results"]]
+        self.assertMaxQueries(6, "patch", url, {"alerts": [{"id": i, "compare_value": "80"} for i in ids]},
+                              expected_status=200)
+        self.assertMaxQueries(8, "delete", url, {"ids": ids}, expected_status=200)
+
+
+class UserEndpointBudgetTests(QueryBudgetTestCase):
+
+    def test_file_browsing(self):
+        self.assertMaxQueries(1, "get", reverse("csv-headers", args=[self.fa.id]), expected_status=200)
+        self.assertMaxQueries(1, "get", reverse("sym-int", args=[self.fa.id]), expected_status=200)
+        self.assertMaxQueries(2, "get", reverse("algo-groups", args=[self.algos[0].id]), expected_status=200)
+        self.assertMaxQueries(
+            4, "get", reverse("algo-group-intervals", args=[self.algos[0].id, self.groups[0].id]),
+            expected_status=200
+        )
+        self.assertMaxQueries(2, "get", reverse("file-association-lookup"), {
+            "algo": self.algos[0].id, "group": self.groups[0].id, "interval": self.intervals[0].id
+        }, expected_status=200)
+
+    def test_favorites(self):
+        self.assertMaxQueries(3, "get", reverse("fav-row-all", args=[self.user.external_user_id]),
+                              expected_status=200)
+        self.assertMaxQueries(6, "post", reverse("fav-row", args=[self.fa.id]), {
+            "external_user_id": self.user.external_user_id, "sym_int": "SYM020 5"
+        })
+
+    def test_custom_alerts(self):
+        external_user_id = self.user.external_user_id
+        self.assertMaxQueries(2, "get", reverse("ca-all", args=[external_user_id]), expected_status=200)
+        self.assertMaxQueries(8, "post", reverse("ca-create", args=[external_user_id]), {
+            "file_association": self.fa.id, "symbol_interval": "SYM021 5", "field_name": "Last",
+            "condition_type": "increase", "compare_value": "121"
+        }, expected_status=201)
+        self.assertMaxQueries(8, "patch", reverse("ca-update", args=[self.custom_alert.id]), {
+            "compare_value": "5"
+        }, expected_status=200)
+
+    def test_custom_alert_bulk(self):
+        url = reverse("ca-bulk", args=[self.user.external_user_id])
+        items = [
+            {"symbol_interval": f"SYM{i:03d} 5", "field_name": "Stop Price", "condition_type": "decrease",
+             "compare_value": "90"}
+            for i in range(ROWS_PER_FILE)
+        ]
+        response = self.assertMaxQueries(7, "post", url, {"file_association": self.fa.id, "alerts": items},
+                                         expected_status=201)
+        ids = [r["id"] for r in response.data["results"]]
+        self.assertMaxQueries(7, "patch", url, {"alerts": [{"id": i, "compare_value": "80"} for i in ids]},
+                              expected_status=200)
+
+    def test_triggered_alerts_and_settings(self):
+        external_user_id = self.user.external_user_id
+        self.assertMaxQueries(3, "get", reverse("alert-logs", args=[external_user_id]), expected_status=200)
+        self.assertMaxQueries(2, "get", reverse("settings", args=[external_user_id]), expected_status=200)
+
+
+class IngestBudgetTests(QueryBudgetTestCase):
+    """The import path behind the upload endpoint and the scheduled fetch."""
+
+    def test_store_csv_data_is_independent_of_row_count(self):
+        content = csv_bytes(ROWS_PER_FILE, price_offset=1)
+        with CaptureQueriesContext(connection) as ctx:
+            store_csv_data(self.fa, content, compute_hash_bytes(content))
+        self.assertLessEqual(len(ctx.captured_queries), 12, "\n".join(q["sql"] for q in ctx.captured_queries))
@@ -0,0 +1,84 @@
+"""
+run_import_scheduler keeps running and keeps every file through database
+and broker failures.
+
+Run with:  python manage.py test ttscanner.test_scheduler
+"""
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from .models import Algo, FileAssociation
+from .tasks import enqueue_import, import_inflight_key
+
+LOCAL_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "scheduler-default"},
+    "bulk": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "scheduler-bulk"},
+}
+
+
+class StopScheduler(Exception):
+    pass
+
+
+class FakeClock:
+    """Stands in for the command's `time` module: sleep() advances time() instead of blocking."""
+
+    def __init__(self, max_sleeps):
+        self.now = 1_000_000.0
+        self.sleeps = []
+        self.max_sleeps = max_sleeps
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        if len(self.sleeps) > self.max_sleeps:
+            raise StopScheduler
+        self.now += seconds
+
+
+@override_settings(CACHES=LOCAL_CACHES, SCHEDULER_RETRY_SECONDS=5, SCHEDULER_MAX_RETRY_SECONDS=120)
+class SchedulerFailureTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        algo, _ = Algo.objects.get_or_create(algo_name="TTScanner")
+        cls.fa = FileAssociation.objects.create(algo=algo, file_path="scheduler.csv")
+
+    def setUp(self):
+        cache.clear()
+
+    def run_scheduler(self, clock):
+        # close_old_connections() would close the test case's connection mid-transaction.
+        with mock.patch("ttscanner.management.commands.run_import_scheduler.time", clock), \
+                mock.patch("ttscanner.management.commands.run_import_scheduler.close_old_connections"), \
+                self.assertRaises(StopScheduler):
+            call_command("run_import_scheduler", "--refresh", "3600", stdout=mock.Mock())
+
+    def test_failed_enqueue_keeps_no_in_flight_marker(self):
+        with mock.patch("ttscanner.tasks.import_file_association.apply_async", side_effect=ConnectionError):
+            with self.assertRaises(ConnectionError):
+                enqueue_import(self.fa)
+        self.assertIsNone(cache.get(import_inflight_key(self.fa.id)))
+
+    def test_failed_enqueue_is_retried(self):
+        clock = FakeClock(max_sleeps=2)
+        with mock.patch("ttscanner.tasks.import_file_association.apply_async",
+                        side_effect=[ConnectionError("broker down"), ConnectionError("broker down"), None]) as queue, \
+                self.assertLogs("ttscanner.management.commands.run_import_scheduler", "ERROR") as logs:
+            self.run_scheduler(clock)
+        self.assertEqual(queue.call_count, 3)
+        self.assertEqual(clock.sleeps[:2], [5, 10])
+        self.assertEqual(len(logs.records), 2)
+
+    def test_failed_refresh_is_retried(self):
+        clock = FakeClock(max_sleeps=1)
+        with mock.patch("ttscanner.management.commands.run_import_scheduler.scheduled_files",
+                        side_effect=[Exception("database down"), FileAssociation.objects.all()]), \
+                mock.patch("ttscanner.tasks.import_file_association.apply_async") as queue, \
+                self.assertLogs("ttscanner.management.commands.run_import_scheduler", "ERROR"):
+            self.run_scheduler(clock)
+        self.assertEqual(clock.sleeps[0], 5)
+        self.assertEqual(queue.call_count, 1)
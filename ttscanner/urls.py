@@ -4,7 +4,7 @@ from .views import (
     FileAssociationUpdateView, FileAssociationDeleteView,
     FileAssociationListView, GlobalAlertCreateView, 
     GlobalAlertUpdateView, GlobalAlertDeleteView, 
-    GlobalAlertListView, AlgoListView,
+    GlobalAlertListView, GlobalAlertBulkView, AlgoListView,
     GroupListView, GroupCreateView,
     GroupUpdateView, GroupDeleteView,
     IntervalListView, IntervalCreateView,
@@ -21,7 +21,7 @@ from .regular_user_views import(
     AlgoGroupsView, AlgoGroupIntervalsView, 
     FileAssociationLookupView, FavoriteRowListView, 
     DeleteFavoriteView, CustomAlertView, 
-    UserTriggeredAlertsView
+    CustomAlertBulkView, UserTriggeredAlertsView
 )
 from .fbv_views import (
     announcement_log, send_announcement, login, 
@@ -57,6 +57,7 @@ urlpatterns = [
     path('global-alert/update/<int:pk>/', GlobalAlertUpdateView.as_view(), name='ga-update'),
     path('global-alert/delete/<int:pk>/', GlobalAlertDeleteView.as_view(), name='ga-delete'),
     path('global-alert/all/', GlobalAlertListView.as_view(), name='ga-all'),
+    path('global-alert/bulk/<int:pk>/', GlobalAlertBulkView.as_view(), name='ga-bulk'),
 
     path('alert-logs/admin/', TriggeredAlertsAdminView.as_view(), name='alert-logs-admin'),
 
@@ -83,7 +84,8 @@ urlpatterns = [
     path('custom-alert/all/<int:external_user_id>/', CustomAlertView.as_view(), name='ca-all'),
     path('custom-alert/create/<int:external_user_id>/', CustomAlertCreateView.as_view(), name='ca-create'),
     path('custom-alert/update/<int:pk>/', CustomAlertUpdateView.as_view(), name='ca-update'),
-    path('custom-alert/delete/<int:pk>/', CustomAlertDeleteView.as_view(), name='ca-update'),
+    path('custom-alert/delete/<int:pk>/', CustomAlertDeleteView.as_view(), name='ca-delete'),
+    path('custom-alert/bulk/<int:external_user_id>/', CustomAlertBulkView.as_view(), name='ca-bulk'),
     path('alert-logs/<int:external_user_id>/', UserTriggeredAlertsView.as_view(), name='alert-logs'),
 
     path('settings/<int:external_user_id>/', UserSettingsView.as_view(), name='settings'),
@@ -0,0 +1,233 @@
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from ..models import normalize_alert_key, alert_key_changed
+from ..serializers import AlertBatchItemSerializer, is_numeric, column_is_numeric
+
+MAX_BATCH_SIZE = 500
+
+ALERT_FIELDS = ["symbol_interval", "field_name", "condition_type", "compare_value", "last_value", "is_active"]
+UPDATE_FIELDS = ALERT_FIELDS + ["symbol_interval_key", "field_name_key", "compare_number", "last_number"]
+REQUIRED_ON_CREATE = ["symbol_interval", "field_name", "condition_type"]
+
+
+def batch_items(data, key):
+    """Return the list under `key`, or an error message when it is missing, empty or too large."""
+    items = data.get(key)
+    if not isinstance(items, list) or not items:
+        return None, f"'{key}' must be a non-empty list."
+    if len(items) > MAX_BATCH_SIZE:
+        return None, f"At most {MAX_BATCH_SIZE} items per request."
+    return items, None
+
+
+def batch_status(results, success, success_status=status.HTTP_200_OK):
+    succeeded = sum(1 for r in results if r["status"] == success)
+    if succeeded == len(results):
+        return success_status
+    if succeeded:
+        return status.HTTP_207_MULTI_STATUS
+    return status.HTTP_400_BAD_REQUEST
+
+
+def item_error(index, errors):
+    return {"index": index, "status": "error", "errors": errors}
+
+
+def check_alert_values(fa, values, check_headers, strict_types):
+    """
+    The same column/type rules as the single-alert serializers, run against
+    the file's stored headers and column profile instead of a per-item query.
+    `check_headers`/`strict_types` are on for global alerts only.
+    """
+    field_name = values["field_name"]
+    if check_headers:
+        headers = fa.headers or []
+        if field_name.lower() not in (h.lower() for h in headers):
+            return {"field_name": f"'{field_name}' is not a valid column. Available: {headers}"}
+
+    if values["condition_type"] == "change":
+        values["compare_value"] = None
+
+    compare_value = values.get("compare_value")
+    if compare_value in (None, ""):
+        return None
+
+    is_numeric_field = column_is_numeric(fa, field_name)
+    if is_numeric_field and not is_numeric(compare_value):
+        return {"compare_value": f"'{field_name}' is numeric — compare value must be a number."}
+    if strict_types and not is_numeric_field and is_numeric(compare_value):
+        return {"compare_value": f"'{field_name}' is text — compare value cannot be numeric."}
+    return None
+
+
+def duplicate_error(values):
+    return {"non_field_errors": [
+        f"Alert for '{values.get('symbol_interval')}' → '{values.get('field_name')}' already exists."
+    ]}
+
+
+def bulk_create_alerts(model, fa, items, required=REQUIRED_ON_CREATE, check_headers=False, strict_types=False, **extra):
+    """
+    Validate every item against one set of existing keys and the file's column
+    profile, then insert the valid ones with a single bulk_create. `extra`
+    (user=... for custom alerts) is set on each alert and scopes the keys.
+    Returns per-item results in request order.
+    """
+    existing = set(
+        model.objects.filter(file_association=fa, **extra).values_list("symbol_interval_key", "field_name_key")
+    )
+    results, pending = [], []
+
+    for index, item in enumerate(items):
+        serializer = AlertBatchItemSerializer(data=item)
+        if not serializer.is_valid():
+            results.append(item_error(index, serializer.errors))
+            continue
+
+        values = {k: v for k, v in serializer.validated_data.items() if k != "id"}
+        missing = [f for f in required if values.get(f) in (None, "")]
+        if missing:
+            results.append(item_error(index, {f: "This field is required." for f in missing}))
+            continue
+
+        errors = check_alert_values(fa, values, check_headers, strict_types)
+        if errors:
+            results.append(item_error(index, errors))
+            continue
+
+        alert = model(file_association=fa, **extra, **values)
+        alert.normalize_keys()
+        key = (alert.symbol_interval_key, alert.field_name_key)
+        if key in existing:
+            results.append(item_error(index, duplicate_error(values)))
+            continue
+
+        existing.add(key)
+        result = {"index": index, "status": "created", "id": None}
+        results.append(result)
+        pending.append((result, alert))
+
+    if pending:
+        alerts = [alert for _, alert in pending]
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(alerts)
+        except IntegrityError:
+            # Lost a race with another writer on the unique key: nothing was inserted.
+            for result, alert in pending:
+                result.update(status="error", errors=duplicate_error({
+                    "symbol_interval": alert.symbol_interval, "field_name": alert.field_name
+                }))
+            return results
+
+        if any(alert.pk is None for alert in alerts):
+            # MySQL doesn't return ids from bulk inserts; look them up by key.
+            ids = dict(
+                ((si, fn), pk) for pk, si, fn in model.objects.filter(
+                    file_association=fa, **extra,
+                    field_name_key__in={a.field_name_key for a in alerts}
+                ).values_list("id", "symbol_interval_key", "field_name_key")
+            )
+            for alert in alerts:
+                alert.pk = ids.get((alert.symbol_interval_key, alert.field_name_key))
+
+        for result, alert in pending:
+            result["id"] = alert.pk
+
+    return results
+
+
+def bulk_update_alerts(queryset, items, check_headers=False, strict_types=False):
+    """
+    Apply partial updates (each item carries its `id`) to alerts in `queryset`.
+    Alerts, their files and the existing keys are loaded once for the batch;
+    valid changes are written with a single bulk_update. Keys are checked
+    within `queryset`, so a user's custom alerts only clash with their own.
+    """
+    model = queryset.model
+    cleaned = []
+    results = []
+    for index, item in enumerate(items):
+        serializer = AlertBatchItemSerializer(data=item)
+        if not serializer.is_valid():
+            results.append(item_error(index, serializer.errors))
+            continue
+        if "id" not in serializer.validated_data:
+            results.append(item_error(index, {"id": "This field is required."}))
+            continue
+        results.append(None)
+        cleaned.append((index, dict(serializer.validated_data)))
+
+    alerts = {
+        a.id: a for a in queryset.filter(id__in=[v["id"] for _, v in cleaned]).select_related("file_association")
+    }
+    files = {}
+    for alert in alerts.values():
+        # Share one FileAssociation instance per file so its column profile is loaded once.
+        alert.file_association = files.setdefault(alert.file_association_id, alert.file_association)
+
+    existing = {
+        (fa_id, si, fn): pk for pk, fa_id, si, fn in queryset.filter(
+            file_association_id__in=list(files)
+        ).values_list("id", "file_association_id", "symbol_interval_key", "field_name_key")
+    }
+
+    changed = {}
+    for index, values in cleaned:
+        alert_id = values.pop("id")
+        alert = alerts.get(alert_id)
+        if alert is None:
+            results[index] = item_error(index, {"id": f"Alert #{alert_id} not found."})
+            continue
+
+        merged = {f: values.get(f, getattr(alert, f)) for f in ALERT_FIELDS}
+        errors = check_alert_values(alert.file_association, merged, check_headers, strict_types)
+        if errors:
+            results[index] = item_error(index, errors)
+            continue
+
+        key_changed = alert_key_changed(alert, merged["symbol_interval"], merged["field_name"])
+        old_key = (alert.file_association_id, alert.symbol_interval_key, alert.field_name_key)
+        new_key = (
+            alert.file_association_id,
+            normalize_alert_key(merged["symbol_interval"]),
+            normalize_alert_key(merged["field_name"])
+        )
+        if key_changed and existing.get(new_key, alert.id) != alert.id:
+            results[index] = item_error(index, duplicate_error(merged))
+            continue
+
+        for field, value in merged.items():
+            setattr(alert, field, value)
+        alert.normalize_keys()
+        if key_changed:
+            if existing.get(old_key) == alert.id:
+                del existing[old_key]
+            existing[new_key] = alert.id
+
+        changed[alert.id] = alert
+        results[index] = {"index": index, "status": "updated", "id": alert.id}
+
+    if changed:
+        try:
+            with transaction.atomic():
+                model.objects.bulk_update(list(changed.values()), UPDATE_FIELDS)
+        except IntegrityError:
+            for result in results:
+                if result["status"] == "updated":
+                    result.update(status="error", errors={"non_field_errors": [
+                        "Another alert with the same symbol and column was saved concurrently."
+                    ]})
+
+    return results
+
+
+def bulk_delete_alerts(queryset, ids):
+    found = set(queryset.filter(id__in=ids).values_list("id", flat=True))
+    if found:
+        with transaction.atomic():
+            queryset.filter(id__in=found).delete()
+    return [
+        {"id": alert_id, "status": "deleted" if alert_id in found else "not_found"}
+        for alert_id in ids
+    ]
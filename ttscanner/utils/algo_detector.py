@@ -1,54 +1,101 @@
 from ttscanner.models import Algo
-import csv, io, json
-from django.conf import settings
-
-with open(settings.BASE_DIR / "ttscanner" / "alert_rules.json", encoding="utf-8") as f:
-    SYSTEM_ALERT_RULES = json.load(f)
+from ttscanner.utils.rules_utils import get_alert_rules
+import csv, io, hashlib, time
 
 class UnknownAlgoError(Exception):
     pass
 
-ALGO_PRICE_FIELD_MAP = {
-    "FSOptions": "entry price",     
-    "TTScanner": "entry price",     
-    "MENTFib": "last price"             
-}
+# Only this much of a file is decoded to find its header row.
+HEADER_SNIFF_BYTES = 64 * 1024
+
+# How long a process trusts its copy of the Algo signatures. Saving or deleting
+# an Algo clears the copy in that process; other processes pick it up within this.
+SIGNATURE_CACHE_SECONDS = 60
+
+# Detection results per (signature set, header fingerprint). Files keep their
+# header row across uploads, so this stays small.
+MAX_DETECTION_CACHE = 1024
+
+MATCH_THRESHOLD = 0.4
+
+_SIGNATURES = None          # (loaded_at, digest, [(algo_id, algo_name, price_field_key, frozenset)])
+_DETECTIONS = {}            # (digest, fingerprint) -> (algo_name, algo_id, price_field_key)
 
-ALGO_SIGNATURE_MAP = {
-    "FSOptions": {"call level", "put level", "call strike", "put strike", "trend dir"},
-    "TTScanner": {"direction", "entry price", "stop price", "profit", "target #1"},
-    "MENTFib": {"bull zone 1", "bull zone 2", "bear zone 1", "bear zone 2", "fib pivot trend"}
-}
 
 def extract_csv_headers(csv_bytes: bytes):
+    """Header row of a CSV, decoding only the first line rather than the whole file."""
+    head = csv_bytes[:HEADER_SNIFF_BYTES]
+    newline = head.find(b"\n")
+    if newline != -1:
+        head = head[:newline]
     try:
-        decoded = csv_bytes.decode("utf-8")
+        decoded = head.decode("utf-8-sig")
     except UnicodeDecodeError:
-        decoded = csv_bytes.decode("latin-1")
-    reader = csv.reader(io.StringIO(decoded))
-    headers = next(reader, None)
+        decoded = head.decode("latin-1")
+    headers = next(csv.reader(io.StringIO(decoded)), None)
     return [h.strip() for h in headers] if headers else []
 
-def detect_algo(headers: list[str]) -> str:
-    headers_lower = set([h.lower().strip() for h in headers])
-    best_match = None
-    best_score = 0
 
-    for algo, signature in ALGO_SIGNATURE_MAP.items():
-        matched = len(headers_lower.intersection(signature))
-        score = matched / len(signature)
+def header_fingerprint(headers) -> str:
+    """Stable fingerprint of a header row: same columns in the same order, same fingerprint."""
+    return hashlib.sha1("\x1f".join(h.strip() for h in headers).encode("utf-8")).hexdigest()
+
+
+def clear_signature_cache():
+    global _SIGNATURES
+    _SIGNATURES = None
+    _DETECTIONS.clear()
+
+
+def get_signatures():
+    """Header signatures of every Algo that has one, cached per process."""
+    global _SIGNATURES
+    if _SIGNATURES is None or time.monotonic() - _SIGNATURES[0] > SIGNATURE_CACHE_SECONDS:
+        signatures = [
+            (algo_id, algo_name, price_field_key, frozenset(c.lower().strip() for c in signature))
+            for algo_id, algo_name, price_field_key, signature in
+            Algo.objects.order_by("id").values_list("id", "algo_name", "price_field_key", "header_signature")
+            if signature
+        ]
+        digest = hashlib.sha1(repr([(s[0], s[1], s[2], sorted(s[3])) for s in signatures]).encode()).hexdigest()
+        _SIGNATURES = (time.monotonic(), digest, signatures)
+    return _SIGNATURES[1], _SIGNATURES[2]
+
+
+def match_algo(headers):
+    """
+    (algo_name, algo_id, price_field_key) of the Algo whose signature best
+    matches the headers, or ("Unknown", None, None) below MATCH_THRESHOLD.
+    """
+    digest, signatures = get_signatures()
+    key = (digest, header_fingerprint(headers))
+    if key in _DETECTIONS:
+        return _DETECTIONS[key]
+
+    headers_lower = {h.lower().strip() for h in headers}
+    best, best_score = ("Unknown", None, None), 0
+    for algo_id, algo_name, price_field_key, signature in signatures:
+        score = len(headers_lower & signature) / len(signature)
         if score > best_score:
-            best_score = score
-            best_match = algo
+            best, best_score = (algo_name, algo_id, price_field_key), score
+    result = best if best_score >= MATCH_THRESHOLD else ("Unknown", None, None)
+
+    if len(_DETECTIONS) >= MAX_DETECTION_CACHE:
+        _DETECTIONS.clear()
+    _DETECTIONS[key] = result
+    return result
+
+
+def detect_algo(headers: list[str]) -> str:
+    return match_algo(headers)[0]
 
-    return best_match if best_score >= 0.4 else "Unknown"
 
 def assign_detected_algo(fa, csv_bytes):
     headers = extract_csv_headers(csv_bytes)
     fa.headers = headers
 
-    algo_name = detect_algo(headers)
-    if algo_name == "Unknown":
+    algo_name, algo_id, price_field = match_algo(headers)
+    if algo_id is None:
         fa.algo = None
         fa.status = "unknown"
         fa._price_field = None
@@ -56,18 +103,9 @@ def assign_detected_algo(fa, csv_bytes):
         fa.save(update_fields=["algo", "status", "headers"])
         return "Unknown"
 
-    try:
-        algo_obj = Algo.objects.get(algo_name=algo_name)
-        fa.algo = algo_obj
-        fa.status = "active"
-        fa._price_field = ALGO_PRICE_FIELD_MAP.get(algo_name)
-        fa.system_alert_rules = SYSTEM_ALERT_RULES.get(algo_name, {})
-        fa.save(update_fields=["algo", "status", "headers"])
-        return algo_name
-    except Algo.DoesNotExist:
-        fa.algo = None
-        fa.status = "unknown"
-        fa._price_field = None
-        fa.system_alert_rules = {}
-        fa.save(update_fields=["algo", "status", "headers"])
-        return "Unknown"
+    fa.algo_id = algo_id
+    fa.status = "active"
+    fa._price_field = price_field
+    fa.system_alert_rules = get_alert_rules().get(algo_name, {})
+    fa.save(update_fields=["algo", "status", "headers"])
+    return algo_name
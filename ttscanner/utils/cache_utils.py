@@ -0,0 +1,8 @@
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+# Large payloads (full file snapshots, parsed CSVs) go through the "bulk"
+# cache alias so they can use a compact serializer/compressor without
+# touching the small keys on the default cache.
+bulk_cache = ConnectionProxy(caches, "bulk")
+
@@ -1,12 +1,22 @@
 from ftplib import FTP
-import hashlib, csv, json, uuid
+import hashlib, csv, json, logging, uuid, math
 from django.db import transaction
+from django.conf import settings
 from io import StringIO, BytesIO, TextIOWrapper
-from ..models import FileAssociation, MainData, Algo, FavoriteRow
+from ..models import FileAssociation, MainData, FavoriteRow
 from django.utils import timezone
+from django.core.cache import cache
+from .cache_utils import bulk_cache
+from .lock_utils import claim_fence
+from .metrics_utils import timed
+from .algo_detector import header_fingerprint
+from ..engine.evaluator import resolve_fields
 import re
 from typing import List, Dict
 
+logger = logging.getLogger(__name__)
+
+
 def compute_hash_bytes(content_bytes: bytes) -> str:
     h = hashlib.sha256()
     h.update(content_bytes)
@@ -27,7 +37,7 @@ def fetch_ftp_bytes(file_path):
         ftp = FTP(FTP_HOST, timeout=30)
         ftp.set_pasv(True) 
         ftp.login(user=FTP_USER, passwd=FTP_PASS)
-        print(f"Connected to FTP Server: {FTP_HOST}")
+        logger.debug("Connected to FTP Server: %s", FTP_HOST)
 
         buffer = BytesIO()
         ftp.retrbinary(f"RETR {file_path}", buffer.write)
@@ -35,7 +45,7 @@ def fetch_ftp_bytes(file_path):
         return buffer.getvalue()
 
     except Exception as e:
-        print(f"{e} Error Occured While Connecting")
+        logger.warning("FTP fetch of %s failed: %s", file_path, e)
         raise
 
 
@@ -51,69 +61,159 @@ def fetch_and_store_file(file_association):
 
     if changed:
         rows_count = store_csv_data(file_association, content_bytes, new_hash)
-        print(f"File updated. {rows_count} rows stored.")
+        logger.info("%s updated. %s rows stored.", file_association.file_name, rows_count)
     else:
-        print("No changes detected.")
+        logger.info("No changes detected for %s", file_association.file_name)
 
 
-def get_stable_key(row: dict) -> tuple:
+def stable_key(row: dict, row_key) -> tuple:
+    """
+    Stable key for a row across uploads: its values in the Sym and Int
+    columns found by find_row_key_columns (schema["row_key"]).
+    """
+    sym_column, int_column = row_key
+    sym_value = row.get(sym_column) if sym_column else None
+    int_value = row.get(int_column) if int_column else None
+    return (
+        str(sym_value).strip().lower() if sym_value is not None else None,
+        str(int_value).strip().lower() if int_value is not None else None,
+    )
+
+
+def find_row_key_columns(headers):
+    """The last header containing 'sym' and the last containing 'int' (may be the same column)."""
+    sym_column = int_column = None
+    for h in headers:
+        if "sym" in h.lower():
+            sym_column = h
+        if "int" in h.lower():
+            int_column = h
+    return [sym_column, int_column]
+
+
+def find_symbol_column(headers):
+    """The column global/custom alerts read the row's symbol from."""
+    candidates = {re.sub(r"[\/_\-\s]", "", s.lower()) for s in ["Symbol/Interval", "Symbol", "sym/int", "sym", "Ticker", "symbol"]}
+    normalized = {re.sub(r"[\/_\-\s]", "", h.lower()): h for h in headers if h}
+    return next((h for n, h in normalized.items() if n in candidates), None)
+
+
+def compile_schema(file_association: FileAssociation, headers) -> dict:
+    """
+    Everything that depends only on the header row, worked out once when the
+    headers change instead of on every request and every row:
+      columns:         header -> position
+      display_headers: the columns CSVHeaderView offers for alerts
+      sym_int_key:     the Sym/Int column (Sym/Int index, favorites)
+      row_key:         the Sym and Int columns that keep _row_id stable across uploads
+      symbol_key:      the column global/custom alerts match symbol_interval against
+      fields:          the columns behind each system-alert detector field
+    """
+    display_headers = headers[1:]
+    if 'ttscanner' in file_association.file_name.lower():
+        display_headers = [h for h in display_headers if 'datetime' not in h.lower() and 'color' not in h.lower()]
+
+    return {
+        "fingerprint": header_fingerprint(headers),
+        "columns": {h: i for i, h in enumerate(headers)},
+        "display_headers": display_headers,
+        "sym_int_key": find_sym_int_column(headers),
+        "row_key": find_row_key_columns(headers),
+        "symbol_key": find_symbol_column(headers),
+        "fields": resolve_fields(headers),
+    }
+
+
+def get_file_schema(file_association: FileAssociation, headers=None) -> dict:
     """
-    Generate a stable key for a row by dynamically finding fields
-    containing 'sym' and 'int' in their names.
+    The file's compiled schema, checked against `headers` (by default the
+    file's own). Files ingested before schemas existed, or rows from an older
+    upload, get a schema compiled on the spot.
     """
-    sym_value = None
-    int_value = None
-    for key, value in row.items():
-        if value is None:
-            continue
-        key_lower = key.lower()
-        if "sym" in key_lower:
-            sym_value = str(value).strip().lower()
-        if "int" in key_lower:
-            int_value = str(value).strip().lower()
-    return (sym_value, int_value)
+    headers = (file_association.headers or []) if headers is None else headers
+    schema = file_association.schema
+    if schema and schema["fingerprint"] == header_fingerprint(headers):
+        return schema
+    return compile_schema(file_association, headers)
+
+
+def rows_schema(file_association: FileAssociation, rows) -> dict:
+    """get_file_schema for stored rows (headers plus _-prefixed metadata)."""
+    headers = [h for h in rows[0] if not h.startswith("_")] if rows else []
+    return get_file_schema(file_association, headers)
+
+
+def store_csv_data(file_association: FileAssociation, content_bytes: bytes, new_hash: str, url: str = None, fence_token: int = None, timings: dict = None) -> int:
+    with timed("import_stage_ms", "parse", timings):
+        headers, rows = parse_csv_bytes_to_dicts(content_bytes, file_association)
+    with timed("import_stage_ms", "store", timings):
+        valid_row_ids, existing_row_hashes = _store_rows(file_association, headers, rows, new_hash, url, fence_token)
+
+    with timed("import_stage_ms", "index", timings):
+        publish_sym_int_index(file_association, headers, rows, file_association.schema["sym_int_key"])
+        # Row hashes cover every field and column name, so unchanged rows keep their cached copy.
+        publish_row_cache(file_association, headers, [
+            row for row in rows if existing_row_hashes.get(row["_row_id"]) != row["_row_hash"]
+        ])
+        delete_row_cache(file_association.id, set(existing_row_hashes) - valid_row_ids)
+
+    return len(rows)
 
 
-def store_csv_data(file_association: FileAssociation, content_bytes: bytes, new_hash: str, url: str = None) -> int:
-    headers, rows = parse_csv_bytes_to_dicts(content_bytes, file_association)
+def _store_rows(file_association, headers, rows, new_hash, url, fence_token):
+    """
+    Assign row ids/metadata and write MainData + FileAssociation in one
+    transaction. The header row's fingerprint decides whether the file's
+    schema and column types carry over or are rebuilt.
+    """
+    fingerprint = header_fingerprint(headers)
+    schema_changed = not file_association.schema or file_association.header_fingerprint != fingerprint
+    schema = compile_schema(file_association, headers) if schema_changed else file_association.schema
 
     existing_rows_by_key = {}
+    existing_row_hashes = {}
     if existing_main_data := MainData.objects.filter(file_association=file_association).first():
+        existing_headers = existing_main_data.data_json.get("headers", [])
+        existing_row_key = (
+            schema["row_key"] if header_fingerprint(existing_headers) == fingerprint
+            else find_row_key_columns(existing_headers)
+        )
         for r in existing_main_data.data_json.get("rows", []):
-            key = get_stable_key(r)
+            key = stable_key(r, existing_row_key)
             existing_rows_by_key[key] = r.get("_row_id")
-
-    file_algo_name = file_association.algo.algo_name if file_association.algo else "Auto-Detect"
-    algo_config = Algo.objects.filter(algo_name=file_algo_name).first()
-
-    supports_targets = algo_config.supports_targets if algo_config else True
-    supports_direction = algo_config.supports_direction if algo_config else True
-    supports_volume = algo_config.supports_volume_alerts if algo_config else False
-    price_field = algo_config.price_field_key if algo_config else "Last"
+            existing_row_hashes[r.get("_row_id")] = r.get("_row_hash")
 
     # Process rows and assign _row_id
     for row in rows:
-        key = get_stable_key(row)
+        key = stable_key(row, schema["row_key"])
         row["_row_id"] = existing_rows_by_key.get(key, str(uuid.uuid4()))
-        row["_supports_targets"] = supports_targets
-        row["_supports_direction"] = supports_direction
-        row["_supports_volume"] = supports_volume
-        row["_price_field"] = price_field
         row["_row_hash"] = MainData.compute_row_hash(row)
 
     # Save MainData and FileAssociation metadata, and clean up favorites
     with transaction.atomic():
+        if fence_token is not None:
+            claim_fence(file_association.id, fence_token)
+
         MainData.objects.update_or_create(
             file_association=file_association,
             defaults={"data_json": {"headers": headers, "rows": rows}}
         )
 
         file_association.headers = headers
+        if schema_changed or file_association.column_profiles is None:
+            file_association.column_profiles = build_column_profiles(headers, rows)
+        else:
+            file_association.column_profiles = refresh_empty_profiles(file_association.column_profiles, headers, rows)
+        file_association.header_fingerprint = fingerprint
+        file_association.schema = schema
         file_association.last_hash = new_hash
         file_association.last_fetched_at = timezone.now()
         if url:
             file_association.file_path = url
-        file_association.save(update_fields=['headers', 'last_hash', 'last_fetched_at', 'file_path'])
+        file_association.save(update_fields=[
+            'headers', 'column_profiles', 'header_fingerprint', 'schema',
+            'last_hash', 'last_fetched_at', 'file_path'
+        ])
 
         # Delete favorites pointing to removed rows
         valid_row_ids = {row["_row_id"] for row in rows}
@@ -122,7 +222,170 @@ def store_csv_data(file_association: FileAssociation, content_bytes: bytes, new_
             print(f"Deleting {stale_favorites.count()} stale favorite(s) for {file_association.file_path}")
             stale_favorites.delete()
 
-    return len(rows)
+    if schema_changed:
+        logger.info("[SCHEMA] Header row of %s changed; schema rebuilt", file_association.file_name)
+        cache.delete(f"csv_headers_{file_association.id}")
+
+    return valid_row_ids, existing_row_hashes
+
+
+def row_cache_key(file_id, row_id):
+    return f"fa_row_{file_id}_{row_id}"
+
+
+def publish_row_cache(file_association: FileAssociation, headers, rows) -> dict:
+    """
+    Cache each row's public fields under its own key so readers that only
+    need a few rows (favorites) can fetch them with one get_many. Readers
+    republish a file's rows when they find them missing, so the keys expire.
+    """
+    headers_to_include = [h for h in headers if not h.startswith("_")]
+    cached_rows = {
+        row_cache_key(file_association.id, row["_row_id"]): {
+            **{h: row.get(h) for h in headers_to_include},
+            "_row_hash": row.get("_row_hash")
+        }
+        for row in rows
+        if row.get("_row_id")
+    }
+    if cached_rows:
+        bulk_cache.set_many(cached_rows, timeout=settings.ROW_CACHE_SECONDS)
+    return cached_rows
+
+
+def delete_row_cache(file_id, row_ids):
+    if row_ids:
+        bulk_cache.delete_many([row_cache_key(file_id, row_id) for row_id in row_ids])
+
+
+def build_column_profiles(headers, rows) -> dict:
+    """
+    Per-column type profile computed once per upload, so alert validation
+    never has to scan the rows. A column is numeric when any non-empty value
+    parses as a float (same rule the alert serializers always used).
+    """
+    profiles = {}
+    total = len(rows)
+    for h in headers:
+        non_empty = [row.get(h) for row in rows if row.get(h) not in (None, "")]
+        numeric_count = 0
+        finite = []
+        for v in non_empty:
+            try:
+                number = float(v)
+            except (TypeError, ValueError):
+                continue
+            numeric_count += 1
+            if math.isfinite(number):
+                finite.append(number)
+
+        profiles[h] = {
+            "type": "numeric" if numeric_count else "text",
+            "null_ratio": round(1 - len(non_empty) / total, 4) if total else 1.0,
+            "min": min(finite) if finite else None,
+            "max": max(finite) if finite else None,
+            "distinct": len(set(non_empty)),
+        }
+    return profiles
+
+
+def refresh_empty_profiles(profiles, headers, rows) -> dict:
+    """
+    Column types carry over while the header row is unchanged. Columns that
+    were empty when profiled say nothing about their type yet, so only those
+    are profiled again.
+    """
+    empty = [h for h in headers if h in profiles and profiles[h]["null_ratio"] == 1.0]
+    if not empty:
+        return profiles
+    return {**profiles, **build_column_profiles(empty, rows)}
+
+
+def get_column_profiles(file_association: FileAssociation) -> dict:
+    """
+    Return the stored column profiles, computing and saving them once from
+    MainData for files ingested before profiles existed.
+    """
+    if file_association.column_profiles is not None:
+        return file_association.column_profiles
+
+    main_data = MainData.objects.filter(file_association_id=file_association.id).only('data_json').first()
+    if not main_data:
+        return {}
+
+    file_association.column_profiles = build_column_profiles(
+        main_data.data_json.get("headers", []),
+        main_data.data_json.get("rows", [])
+    )
+    file_association.save(update_fields=['column_profiles'])
+    return file_association.column_profiles
+
+
+def find_sym_int_column(headers):
+    """Return the Symbol/Interval header (e.g. 'Sym/Int', 'Symbol Interval'), if any."""
+    for h in headers or []:
+        normalized = re.sub(r"[ _\-/]", "", str(h).lower())
+        if "sym" in normalized and "int" in normalized:
+            return h
+    return None
+
+
+def sym_int_index_key(file_id):
+    return f"sym_int_index_{file_id}"
+
+
+def publish_sym_int_index(file_association: FileAssociation, headers, rows, sym_int_key=None) -> dict:
+    """
+    Build the per-file Sym/Int index at ingest so favoriting and the Sym/Int
+    dropdown never scan the rows:
+      rows:   normalized sym/int value -> [_row_id, _row_hash] (first match wins)
+      values: distinct raw sym/int values, in file order
+    `sym_int_key` comes from the file's schema; without it the column is looked up.
+    """
+    sym_int_key = sym_int_key or get_file_schema(file_association, headers)["sym_int_key"]
+    index_rows = {}
+    values = {}
+
+    if sym_int_key:
+        for row in rows:
+            value = row.get(sym_int_key)
+            if not value:
+                continue
+            values.setdefault(str(value), None)
+            index_rows.setdefault(
+                str(value).lower().strip(),
+                [row.get("_row_id"), row.get("_row_hash")]
+            )
+
+    index = {
+        "last_hash": file_association.last_hash,
+        "sym_int_key": sym_int_key,
+        "rows": index_rows,
+        "values": list(values),
+    }
+    cache.set(sym_int_index_key(file_association.id), index, timeout=None)
+    return index
+
+
+def get_sym_int_index(file_association: FileAssociation):
+    """
+    Return the Sym/Int index for the file's current data, rebuilding it from
+    MainData if the cached copy is missing or from an older upload.
+    Returns None when the file has no MainData yet.
+    """
+    index = cache.get(sym_int_index_key(file_association.id))
+    if index and index["last_hash"] == file_association.last_hash:
+        return index
+
+    main_data = MainData.objects.filter(file_association_id=file_association.id).only('data_json').first()
+    if not main_data:
+        return None
+
+    return publish_sym_int_index(
+        file_association,
+        main_data.data_json.get("headers", []),
+        main_data.data_json.get("rows", [])
+    )
 
 
 def parse_csv_bytes_to_dicts(csv_bytes: bytes, fa: FileAssociation, encoding='utf-8'):
@@ -0,0 +1,28 @@
+import hashlib
+from django.db.models import Q, Count, Max
+from django.utils.cache import get_conditional_response
+
+
+def build_etag(*parts):
+    """Weak ETag from cheap version markers (ids, data_version, last_hash, ...)."""
+    digest = hashlib.sha1(":".join(str(p) for p in parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def not_modified(request, etag):
+    """Return a 304 response when the client's If-None-Match matches `etag`, else None."""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response["ETag"] = etag
+    return response
+
+
+def alert_log_signature(queryset):
+    """Cheap aggregate over an alert-log queryset that changes whenever its rows do."""
+    stats = queryset.order_by().aggregate(
+        last_id=Max("id"),
+        total=Count("id"),
+        sent=Count("id", filter=Q(sent_to_ui=True)),
+        acknowledged=Count("id", filter=Q(acknowledged=True)),
+    )
+    return stats["last_id"], stats["total"], stats["sent"], stats["acknowledged"]
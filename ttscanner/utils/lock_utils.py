@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.cache import cache
+from ..models import FileAssociation
+
+
+class StaleLeaseError(Exception):
+    """A newer import of the same file already wrote with a higher fencing token."""
+
+
+def lease_key(file_id):
+    return f"fa_import_lease_{file_id}"
+
+
+def fence_key(file_id):
+    return f"fa_import_fence_{file_id}"
+
+
+def acquire_import_lease(fa, ttl=None):
+    """
+    Take the per-file import lease. Returns a fencing token (strictly increasing
+    per file) when the lease was taken, or None when another import holds it.
+    The counter is seeded from FileAssociation.import_fence so tokens keep
+    growing even if the cache key was evicted.
+    """
+    cache.add(fence_key(fa.id), fa.import_fence, timeout=None)
+    try:
+        token = cache.incr(fence_key(fa.id))
+    except ValueError:
+        # The key was evicted between add and incr: re-seed and retry once.
+        cache.add(fence_key(fa.id), fa.import_fence, timeout=None)
+        token = cache.incr(fence_key(fa.id))
+    if cache.add(lease_key(fa.id), token, timeout=ttl or settings.IMPORT_LEASE_SECONDS):
+        return token
+    return None
+
+
+def release_import_lease(file_id, token):
+    # Only drop the lease if it is still ours; an expired lease may have been re-taken.
+    if cache.get(lease_key(file_id)) == token:
+        cache.delete(lease_key(file_id))
+
+
+def claim_fence(file_id, token):
+    """
+    Record `token` as the newest writer for the file. Must run inside the
+    transaction that writes the import: the UPDATE holds the row lock until
+    commit, and a writer holding an older token is rejected.
+    """
+    if not FileAssociation.objects.filter(id=file_id, import_fence__lte=token).update(import_fence=token):
+        current = FileAssociation.objects.filter(id=file_id).values_list("import_fence", flat=True).first() or 0
+        if (cache.get(fence_key(file_id)) or 0) < current:
+            cache.set(fence_key(file_id), current, timeout=None)
+        raise StaleLeaseError(f"Fencing token {token} is older than {current} for file {file_id}.")
@@ -0,0 +1,54 @@
+import logging
+import time
+from django.conf import settings
+
+# Per-process state for log_sampled: when each key last logged and how many
+# repeats were dropped since.
+_last_logged = {}
+_suppressed = {}
+_MAX_KEYS = 10000
+
+
+def tally(stats, outcome, amount=1):
+    """Count an outcome into a per-run stats dict (a Counter), if the caller passed one."""
+    if stats is not None:
+        stats[outcome] += amount
+
+
+def log_sampled(logger, level, key, msg, *args, interval=None, **kwargs):
+    """
+    Log at most once per `interval` seconds (LOG_SAMPLE_SECONDS) for `key`.
+    Repeats in between are only counted, and the count is reported on the
+    next line that gets through. Formatting stays lazy (%-style args).
+    """
+    if not logger.isEnabledFor(level):
+        return False
+
+    interval = settings.LOG_SAMPLE_SECONDS if interval is None else interval
+    now = time.monotonic()
+    last = _last_logged.get(key)
+    if last is not None and now - last < interval:
+        _suppressed[key] = _suppressed.get(key, 0) + 1
+        return False
+
+    if len(_last_logged) >= _MAX_KEYS:
+        _last_logged.clear()
+        _suppressed.clear()
+    _last_logged[key] = now
+
+    suppressed = _suppressed.pop(key, 0)
+    if suppressed:
+        msg += " (%d similar suppressed)"
+        args += (suppressed,)
+    logger.log(level, msg, *args, **kwargs)
+    return True
+
+
+def log_run_summary(logger, prefix, name, stats, **extra):
+    """One INFO line per run with the outcome counts, instead of one line per row."""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "%s %s: %s", prefix, name,
+            ", ".join(f"{k}={v}" for k, v in sorted(stats.items())) or "nothing to do",
+            extra={**extra, "stats": dict(stats)}
+        )
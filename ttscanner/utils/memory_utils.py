@@ -0,0 +1,41 @@
+import os
+from billiard.compat import mem_rss
+from .metrics_utils import incr_metric, task_memory_key
+
+# Memory profile per task type. Workers are recycled on memory
+# (worker_max_memory_per_child) rather than after a fixed number of tasks, so
+# these counters show which task types grow a worker towards that limit.
+
+_PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024 if hasattr(os, "sysconf") else 4
+
+# (rss_kb, peak_kb) at the start of each task running in this process.
+_started = {}
+
+
+def peak_rss_kb():
+    """Peak RSS of this process in KiB, the same figure billiard compares to the memory limit."""
+    return int(mem_rss())
+
+
+def rss_kb():
+    """Current RSS in KiB; the peak where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_KB
+    except OSError:
+        return peak_rss_kb()
+
+
+def task_started(task_id):
+    _started[task_id] = (rss_kb(), peak_rss_kb())
+
+
+def task_finished(task_id, task_name):
+    start = _started.pop(task_id, None)
+    if start is None:
+        return
+    rss_before, peak_before = start
+    task = task_name.rsplit(".", 1)[-1]
+    incr_metric(task_memory_key(task, "runs"))
+    incr_metric(task_memory_key(task, "rss_growth_kb"), max(rss_kb() - rss_before, 0))
+    incr_metric(task_memory_key(task, "peak_raise_kb"), max(peak_rss_kb() - peak_before, 0))
@@ -0,0 +1,216 @@
+import logging, threading, time
+from collections import Counter
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from .log_utils import log_sampled
+
+logger = logging.getLogger(__name__)
+
+# Counters and histograms live in the shared cache so web and worker
+# processes all add to the same totals; /metrics renders them in the
+# Prometheus text format. Increments are buffered per process and written
+# together (one Redis pipeline) at most every METRICS_FLUSH_SECONDS, at the
+# end of each Celery task, and when a worker process shuts down. A failed
+# flush keeps the counts for the next one: metrics never fail the caller.
+
+COUNTERS = {
+    "imports_started": "Imports that acquired the file lease.",
+    "imports_changed": "Imports that stored a new version of the file.",
+    "imports_unchanged": "Imports whose file hash had not changed.",
+    "imports_failed": "Imports that raised while fetching or storing.",
+    "imports_collapsed_queued": "Imports not queued because one was already in flight.",
+    "imports_collapsed_running": "Imports skipped because another held the file lease.",
+    "imports_fenced": "Imports discarded because a newer import had already written.",
+    "alerts_triggered": "Triggered alerts saved (system, global and custom).",
+    "worker_processes_started": "Celery worker child processes started (one per recycle).",
+}
+
+# Stage timings, in milliseconds.
+HISTOGRAMS = {
+    "import_stage_ms": {
+        "help": "Duration of each file import stage in milliseconds.",
+        "stages": ("fetch", "hash", "parse", "store", "index", "snapshot"),
+    },
+    "alert_stage_ms": {
+        "help": "Duration of each alert evaluation stage in milliseconds.",
+        "stages": ("load", "system", "global_custom", "delivery"),
+    },
+}
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+# Worker memory per Celery task type, recorded by memory_utils around every task.
+TASK_TYPES = (
+    "check_and_import_files", "import_file_association", "check_triggered_alerts",
+    "evaluate_alert_shard", "deliver_triggered_alerts", "send_announcement_sms_task",
+)
+TASK_MEMORY = {
+    "runs": "Task runs measured.",
+    "rss_growth_kb": "Resident memory (KiB) tasks left allocated when they finished.",
+    "peak_raise_kb": "KiB by which tasks raised their worker's peak RSS, the figure "
+                     "worker_max_memory_per_child recycles on.",
+}
+
+
+def metric_key(name):
+    return f"metrics_{name}"
+
+
+_pending = Counter()
+_pending_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def incr_metric(name, amount=1):
+    """Add to a shared counter. Buffered in this process until the next flush_metrics()."""
+    with _pending_lock:
+        _pending[name] += amount
+        due = time.monotonic() - _flushed_at >= settings.METRICS_FLUSH_SECONDS
+    if due:
+        flush_metrics()
+
+
+def flush_metrics():
+    """Write this process's buffered increments to the shared cache in one round-trip."""
+    global _flushed_at
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _flushed_at = time.monotonic()
+    if not pending:
+        return
+
+    try:
+        _write_metrics(pending)
+    except Exception as e:
+        with _pending_lock:
+            _pending.update(pending)
+        log_sampled(logger, logging.WARNING, "metrics_flush_failed",
+                    "[METRICS] Flush failed, keeping %s counters for the next one: %s", len(pending), e)
+
+
+def _write_metrics(pending):
+    """Add `pending` to the shared counters. Names are removed from it as they are written."""
+    client = getattr(cache, "client", None)
+    if hasattr(client, "get_client"):
+        # django-redis stores integers unencoded, so INCRBY works on the same
+        # keys cache.get_many() reads; a missing key starts from zero.
+        pipe = client.get_client(write=True).pipeline(transaction=False)
+        for name, amount in pending.items():
+            pipe.incrby(client.make_key(metric_key(name)), amount)
+        pipe.execute()
+        pending.clear()
+        return
+
+    for name, amount in list(pending.items()):
+        key = metric_key(name)
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            # Evicted between add() and incr(); start over from this increment.
+            cache.set(key, amount, timeout=None)
+        del pending[name]
+
+
+def task_memory_key(task, field):
+    return f"task_memory_{task}_{field}"
+
+
+def get_metrics(names):
+    flush_metrics()
+    values = cache.get_many([metric_key(name) for name in names])
+    return {name: values.get(metric_key(name), 0) for name in names}
+
+
+def _bucket_label(ms):
+    return next((str(b) for b in BUCKETS_MS if ms <= b), "+Inf")
+
+
+def observe_ms(histogram, stage, ms):
+    """Record one observation: its bucket, the running sum and the count."""
+    incr_metric(f"{histogram}_{stage}_bucket_{_bucket_label(ms)}")
+    # Counters are integers; keep the sum in microseconds so short stages still add up.
+    incr_metric(f"{histogram}_{stage}_sum_us", int(round(ms * 1000)))
+    incr_metric(f"{histogram}_{stage}_count")
+
+
+@contextmanager
+def timed(histogram, stage, timings=None):
+    """
+    Time the block into `histogram`/`stage`; when `timings` is given the
+    duration is also stored there (ms) for the per-run log line.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        observe_ms(histogram, stage, ms)
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0) + ms, 1)
+
+
+def render_prometheus(freshness_rows):
+    """
+    Prometheus text exposition of every counter and histogram, the per-task
+    memory counters, plus one freshness gauge per file from `freshness_rows` (id, file_name, last_fetched_at).
+    """
+    lines = []
+
+    counter_values = get_metrics(COUNTERS)
+    for name, help_text in COUNTERS.items():
+        lines += [
+            f"# HELP ttscanner_{name}_total {help_text}",
+            f"# TYPE ttscanner_{name}_total counter",
+            f"ttscanner_{name}_total {counter_values[name]}",
+        ]
+
+    for histogram, spec in HISTOGRAMS.items():
+        names = []
+        for stage in spec["stages"]:
+            names += [f"{histogram}_{stage}_bucket_{b}" for b in BUCKETS_MS]
+            names += [f"{histogram}_{stage}_bucket_+Inf", f"{histogram}_{stage}_sum_us", f"{histogram}_{stage}_count"]
+        values = get_metrics(names)
+
+        lines += [f"# HELP ttscanner_{histogram} {spec['help']}", f"# TYPE ttscanner_{histogram} histogram"]
+        for stage in spec["stages"]:
+            cumulative = 0
+            for b in BUCKETS_MS:
+                cumulative += values[f"{histogram}_{stage}_bucket_{b}"]
+                lines.append(f'ttscanner_{histogram}_bucket{{stage="{stage}",le="{b}"}} {cumulative}')
+            cumulative += values[f"{histogram}_{stage}_bucket_+Inf"]
+            lines += [
+                f'ttscanner_{histogram}_bucket{{stage="{stage}",le="+Inf"}} {cumulative}',
+                f'ttscanner_{histogram}_sum{{stage="{stage}"}} {values[f"{histogram}_{stage}_sum_us"] / 1000:.3f}',
+                f'ttscanner_{histogram}_count{{stage="{stage}"}} {values[f"{histogram}_{stage}_count"]}',
+            ]
+
+    names = [task_memory_key(task, field) for task in TASK_TYPES for field in TASK_MEMORY]
+    values = get_metrics(names)
+    for field, help_text in TASK_MEMORY.items():
+        lines += [
+            f"# HELP ttscanner_task_{field}_total {help_text}",
+            f"# TYPE ttscanner_task_{field}_total counter",
+        ]
+        lines += [
+            f'ttscanner_task_{field}_total{{task="{task}"}} {values[task_memory_key(task, field)]}'
+            for task in TASK_TYPES
+        ]
+
+    now = timezone.now()
+    lines += [
+        "# HELP ttscanner_file_freshness_seconds Seconds since the file was last fetched.",
+        "# TYPE ttscanner_file_freshness_seconds gauge",
+    ]
+    for file_id, file_name, last_fetched_at in freshness_rows:
+        if last_fetched_at is None:
+            continue
+        name = (file_name or "").replace("\\", "\\\\").replace('"', '\\"')
+        lines.append(
+            f'ttscanner_file_freshness_seconds{{file_id="{file_id}",file="{name}"}} '
+            f'{(now - last_fetched_at).total_seconds():.1f}'
+        )
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,17 @@
+import json
+from django.conf import settings
+
+_SYSTEM_ALERT_RULES = None
+
+
+def get_alert_rules():
+    """
+    alert_rules.json, read on first use and then kept for the life of the
+    process. Shared by the evaluator and the algo detector, so importing
+    either doesn't touch the file.
+    """
+    global _SYSTEM_ALERT_RULES
+    if _SYSTEM_ALERT_RULES is None:
+        with open(settings.BASE_DIR / "ttscanner" / "alert_rules.json", encoding="utf-8") as f:
+            _SYSTEM_ALERT_RULES = json.load(f)
+    return _SYSTEM_ALERT_RULES
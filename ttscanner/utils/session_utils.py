@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.conf import settings
+
+# A trading session, as stored on Group.trading_session / Algo.trading_session
+# (the group wins) or settings.DEFAULT_TRADING_SESSION:
+#   {"timezone": "America/New_York", "days": [0, 1, 2, 3, 4],
+#    "open": "09:30", "close": "16:00", "holidays": ["2026-12-25"],
+#    "off_hours_interval_minutes": 60}
+# days are weekdays (Monday=0) on which the session opens; close < open means
+# the session runs overnight; "24:00" closes at midnight.
+# off_hours_interval_minutes=None stops polling entirely until the next open.
+
+
+def parse_minutes(value):
+    hours, minutes = value.split(":")
+    total = int(hours) * 60 + int(minutes)
+    if not 0 <= total <= 24 * 60:
+        raise ValueError(f"'{value}' is not a time of day.")
+    return total
+
+
+def validate_session(session):
+    """Raise ValueError describing the first problem with a session dict."""
+    if not isinstance(session, dict):
+        raise ValueError("Trading session must be an object.")
+    try:
+        ZoneInfo(session.get("timezone", "UTC"))
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone '{session.get('timezone')}'.")
+    days = session.get("days", [])
+    if not isinstance(days, list) or not all(isinstance(d, int) and 0 <= d <= 6 for d in days):
+        raise ValueError("'days' must be a list of weekday numbers (Monday=0).")
+    for field in ("open", "close"):
+        try:
+            parse_minutes(session.get(field, ""))
+        except (AttributeError, ValueError):
+            raise ValueError(f"'{field}' must be a time like '09:30'.")
+    off_hours = session.get("off_hours_interval_minutes")
+    if off_hours is not None and (not isinstance(off_hours, int) or off_hours <= 0):
+        raise ValueError("'off_hours_interval_minutes' must be a positive number of minutes or null.")
+    return session
+
+
+def session_for(fa):
+    group = fa.group if fa.group_id else None
+    algo = fa.algo if fa.algo_id else None
+    return (
+        (group and group.trading_session)
+        or (algo and algo.trading_session)
+        or settings.DEFAULT_TRADING_SESSION
+    )
+
+
+def _session_day_open(session, day):
+    return day.weekday() in session.get("days", []) and day.isoformat() not in session.get("holidays", [])
+
+
+def in_session(session, ts):
+    local = datetime.fromtimestamp(ts, ZoneInfo(session.get("timezone", "UTC")))
+    minute = local.hour * 60 + local.minute
+    open_at, close_at = parse_minutes(session["open"]), parse_minutes(session["close"])
+    today, yesterday = local.date(), local.date() - timedelta(days=1)
+
+    if open_at <= close_at:
+        return _session_day_open(session, today) and open_at <= minute < close_at
+    # Overnight: opened today after open_at, or opened yesterday and not yet closed.
+    return (
+        (_session_day_open(session, today) and minute >= open_at)
+        or (_session_day_open(session, yesterday) and minute < close_at)
+    )
+
+
+def next_session_open(session, ts):
+    """Timestamp of the first session open after `ts`, or None if none in the next two weeks."""
+    tz = ZoneInfo(session.get("timezone", "UTC"))
+    open_at = parse_minutes(session["open"])
+    start = datetime.fromtimestamp(ts, tz).date()
+    for offset in range(15):
+        day = start + timedelta(days=offset)
+        if not _session_day_open(session, day):
+            continue
+        opens = datetime(day.year, day.month, day.day, tzinfo=tz) + timedelta(minutes=open_at)
+        if opens.timestamp() > ts:
+            return opens.timestamp()
+    return None
+
+
+def backoff_seconds(base_seconds, unchanged_streak):
+    """
+    Base interval until POLL_BACKOFF_AFTER unchanged fetches in a row, then
+    doubling per further unchanged fetch up to POLL_BACKOFF_MAX_FACTOR x base.
+    A change resets the streak, so the next poll is back at the base interval.
+    """
+    steps = unchanged_streak - settings.POLL_BACKOFF_AFTER + 1
+    if steps <= 0:
+        return base_seconds
+    return base_seconds * min(2 ** steps, settings.POLL_BACKOFF_MAX_FACTOR)
+
+
+def next_poll_at(fa, base_seconds, fetched_at):
+    """
+    When to fetch a file next, given when it was last fetched: adaptive
+    backoff during the session, the off-hours rate outside it, and never
+    later than the next session open.
+    """
+    session = session_for(fa)
+    due = fetched_at + backoff_seconds(base_seconds, fa.unchanged_streak)
+    if in_session(session, due):
+        return due
+
+    next_open = next_session_open(session, due)
+    off_hours = session.get("off_hours_interval_minutes")
+    if off_hours:
+        due = max(due, fetched_at + off_hours * 60)
+        return min(due, next_open) if next_open else due
+    return next_open or due
@@ -1,5 +1,4 @@
 import logging
-from twilio.rest import Client
 from django.conf import settings
 from ttscanner.utils.text_utils import html_to_plain_text
 
@@ -25,6 +24,9 @@ def send_alert_sms(to, message, force_send=False):
         return len(phones), 0
 
     try:
+        # Imported here: twilio.rest costs ~50ms to import and most processes never send an SMS.
+        from twilio.rest import Client
+
         account_sid = settings.TWILIO_ACCOUNT_SID
         auth_token = getattr(settings, "TWILIO_AUTH_TOKEN", None)
         api_key_secret = getattr(settings, "TWILIO_API_KEY_SECRET", None)
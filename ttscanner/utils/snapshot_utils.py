@@ -0,0 +1,101 @@
+import gzip, json
+from django.conf import settings
+from django.http import HttpResponse
+from ..models import MainData
+from .cache_utils import bulk_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def snapshot_key(file_id):
+    return f"fa_snapshot_{file_id}"
+
+
+def render_file_snapshot(fa, headers, rows):
+    """
+    Render the public JSON for one file version: headers plus rows with the
+    private `_` fields stripped (except `_row_hash`), pre-encoded as bytes
+    together with compressed variants.
+    """
+    headers_to_include = [h for h in headers if not h.startswith("_")]
+    cleaned_rows = [
+        {
+            **{h: row.get(h) for h in headers_to_include},
+            "_row_hash": row.get("_row_hash")
+        }
+        for row in rows
+    ]
+    body = json.dumps(
+        {
+            "file_association_id": fa.id,
+            "data_version": fa.data_version,
+            "headers": headers,
+            "rows": cleaned_rows
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+    return {
+        "data_version": fa.data_version,
+        "last_hash": fa.last_hash,
+        "body": body,
+        "gzip": gzip.compress(body, compresslevel=6),
+        "br": brotli.compress(body, quality=5) if brotli else None,
+    }
+
+
+def publish_file_snapshot(fa, headers, rows):
+    snapshot = render_file_snapshot(fa, headers, rows)
+    bulk_cache.set(snapshot_key(fa.id), snapshot, timeout=settings.SNAPSHOT_CACHE_SECONDS)
+    return snapshot
+
+
+def get_file_snapshot(fa):
+    """
+    Return the cached snapshot for the file's current version, rebuilding it
+    from MainData when it is missing or was rendered for another version.
+    """
+    snapshot = bulk_cache.get(snapshot_key(fa.id))
+    if snapshot and snapshot["data_version"] == fa.data_version and snapshot["last_hash"] == fa.last_hash:
+        return snapshot
+
+    main_data = MainData.objects.filter(file_association_id=fa.id).only('data_json').first()
+    if not main_data:
+        return None
+
+    return publish_file_snapshot(
+        fa,
+        main_data.data_json.get("headers", []),
+        main_data.data_json.get("rows", [])
+    )
+
+
+def accepted_encodings(request):
+    encodings = set()
+    for part in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if name:
+            encodings.add(name.lower())
+    return encodings
+
+
+def snapshot_response(request, snapshot, status=200):
+    accepted = accepted_encodings(request)
+    response = None
+    for encoding in ("br", "gzip"):
+        if snapshot.get(encoding) and encoding in accepted:
+            response = HttpResponse(snapshot[encoding], content_type="application/json", status=status)
+            response["Content-Encoding"] = encoding
+            break
+
+    if response is None:
+        response = HttpResponse(snapshot["body"], content_type="application/json", status=status)
+
+    response["Vary"] = "Accept-Encoding"
+    return response
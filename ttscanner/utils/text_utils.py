@@ -1,10 +1,12 @@
-from bs4 import BeautifulSoup
-
 def html_to_plain_text(html: str) -> str:
     """Convert HTML to clean plain text, preserving links and lists."""
     if not html:
         return ""
 
+    # Imported on first use so loading the module (every web and worker
+    # process does, via tasks) doesn't pay for bs4.
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html, "html.parser")
 
     # Replace links with: text (url)
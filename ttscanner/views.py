@@ -4,9 +4,10 @@ from django.shortcuts import get_object_or_404
 from rest_framework import status
 from django.utils import timezone
 from rest_framework import generics
+from rest_framework.views import APIView
 from .models import (
     FileAssociation, GlobalAlertRule, Algo, 
-    Group, Interval, TriggeredAlert
+    Group, Interval, TriggeredAlert, MainData
 )
 from ttscanner.utils.algo_detector import assign_detected_algo, UnknownAlgoError
 from .serializers import (
@@ -14,7 +15,7 @@ from .serializers import (
     FileAssociationCreateSerializer, FileAssociationUpdateSerializer,
     FileAssociationUpdateSerializer, GlobalAlertCreateSerializer,
     FileAssociationListSerializer, AlgoSerializer,
-    GroupSerializer, IntervalSerializer,
+    GroupAdminSerializer, IntervalSerializer,
     GlobalAlertListSerializer, GlobalAlertUpdateSerializer,
     TriggeredAlertSerializer
 )
@@ -23,15 +24,23 @@ from rest_framework.permissions import IsAuthenticated
 from .utils.csv_utils import (
     read_uploaded_file_bytes,
     is_file_changed, store_csv_data,
-    fetch_ftp_bytes
+    fetch_ftp_bytes, delete_row_cache
+)
+from .utils.http_utils import build_etag, not_modified, alert_log_signature
+from .db_router import reads_from_replica
+from .utils.lock_utils import acquire_import_lease, release_import_lease, StaleLeaseError
+from .utils.alert_batch import (
+    batch_items, batch_status,
+    bulk_create_alerts, bulk_update_alerts, bulk_delete_alerts
 )
 
 #ALGO VIEWS
+@reads_from_replica
 class AlgoListView(ListAPIView):
     serializer_class = AlgoSerializer
     
     def get_queryset(self):
-        return Algo.objects.only('id', 'algo_name', 'supports_targets', 'supports_direction')
+        return Algo.objects.only('id', 'algo_name', 'supports_targets', 'supports_direction', 'trading_session', 'header_signature')
     
 
 class AlgoCreateView(generics.CreateAPIView):
@@ -74,14 +83,15 @@ class AlgoDeleteView(generics.DestroyAPIView):
 
 
 #GROUP VIEWS
+@reads_from_replica
 class GroupListView(ListAPIView):
-    serializer_class = GroupSerializer
+    serializer_class = GroupAdminSerializer
     def get_queryset(self):
-        return Group.objects.only('id', 'group_name')
+        return Group.objects.only('id', 'group_name', 'trading_session')
 
 class GroupCreateView(generics.CreateAPIView):
     queryset = Group.objects.all()
-    serializer_class = GroupSerializer
+    serializer_class = GroupAdminSerializer
   #  permission_classes = [IsAuthenticated, IsTTAdmin]
 
     def create(self, request, *args, **kwargs):
@@ -93,7 +103,7 @@ class GroupCreateView(generics.CreateAPIView):
 
 class GroupUpdateView(generics.UpdateAPIView):
     queryset = Group.objects.all()
-    serializer_class = GroupSerializer
+    serializer_class = GroupAdminSerializer
   #  permission_classes = [IsAuthenticated, IsTTAdmin]
     lookup_field = "pk"
 
@@ -107,7 +117,7 @@ class GroupUpdateView(generics.UpdateAPIView):
 
 class GroupDeleteView(generics.DestroyAPIView):
     queryset = Group.objects.all()
-    serializer_class = GroupSerializer
+    serializer_class = GroupAdminSerializer
   #  permission_classes = [IsAuthenticated, IsTTAdmin]
     lookup_field = "pk"
 
@@ -120,6 +130,7 @@ class GroupDeleteView(generics.DestroyAPIView):
 
 
 #INTERVAL VIEWS
+@reads_from_replica
 class IntervalListView(ListAPIView):
     serializer_class = IntervalSerializer
     def get_queryset(self):
@@ -236,13 +247,17 @@ class FileAssociationDeleteView(generics.DestroyAPIView):
             return Response({"detail": "File Association not found."}, status=404)
 
         instance_id = instance.id
+        main_data = MainData.objects.filter(file_association_id=instance_id).only('data_json').first()
+        row_ids = [r.get("_row_id") for r in main_data.data_json.get("rows", [])] if main_data else []
         instance.delete()
+        delete_row_cache(instance_id, row_ids)
         return Response(
             {"detail": f"File Association {instance_id} deleted successfully."},
             status=status.HTTP_204_NO_CONTENT
         )
 
 
+@reads_from_replica
 class FileAssociationListView(ListAPIView):
     serializer_class = FileAssociationListSerializer
 
@@ -291,22 +306,34 @@ class CSVUploadView(generics.GenericAPIView):
         except Exception as e:
             return Response({"detail": f"Could not fetch file: {str(e)}"}, status=400)
         
-        changed, new_hash = is_file_changed(fa, content_bytes)
-        if not changed:
-            fa.algo_id = original_algo_id
-            fa.last_fetched_at = timezone.now()
-            fa.save()  
-            return Response({
-                "changed": False, 
-                "detail": "No changes detected.",
-                "algo": fa.algo.algo_name if fa.algo else "Unknown"
-            }, status=200)
+        token = acquire_import_lease(fa)
+        if token is None:
+            return Response({"detail": "An import for this file is already running. Try again shortly."}, status=409)
 
         try:
-            fa.algo_id = original_algo_id
-            rows_count = store_csv_data(fa, content_bytes, new_hash, url=ftp_path)
-        except Exception as e:
-            return Response({"detail": f"CSV parse error: {str(e)}"}, status=400)
+            # An import may have committed during the fetch; compare against
+            # and write on top of its hash, schema, fence and data_version.
+            fa.refresh_from_db()
+            changed, new_hash = is_file_changed(fa, content_bytes)
+            if not changed:
+                fa.algo_id = original_algo_id
+                fa.last_fetched_at = timezone.now()
+                fa.save(update_fields=["algo", "last_fetched_at"])
+                return Response({
+                    "changed": False, 
+                    "detail": "No changes detected.",
+                    "algo": fa.algo.algo_name if fa.algo else "Unknown"
+                }, status=200)
+
+            try:
+                fa.algo_id = original_algo_id
+                rows_count = store_csv_data(fa, content_bytes, new_hash, url=ftp_path, fence_token=token)
+            except StaleLeaseError:
+                return Response({"detail": "A newer import of this file finished first."}, status=409)
+            except Exception as e:
+                return Response({"detail": f"CSV parse error: {str(e)}"}, status=400)
+        finally:
+            release_import_lease(fa.id, token)
 
         return Response({
             "changed": True, 
@@ -358,31 +385,87 @@ class GlobalAlertDeleteView(generics.DestroyAPIView):
         status=status.HTTP_200_OK)
 
 
+class GlobalAlertBulkView(APIView):
+    """
+    Batch create (POST {"alerts": [...]}), update (PATCH {"alerts": [{"id": ..}, ...]})
+    and delete (DELETE {"ids": [...]}) of the global alerts on one file.
+    Every item gets its own result; valid items are saved even if others fail.
+    """
+
+    def post(self, request, pk):
+        fa = get_object_or_404(FileAssociation, pk=pk)
+        items, error = batch_items(request.data, "alerts")
+        if error:
+            return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = bulk_create_alerts(GlobalAlertRule, fa, items, check_headers=True, strict_types=True)
+        return Response({"results": results}, status=batch_status(results, "created", status.HTTP_201_CREATED))
+
+    def patch(self, request, pk):
+        items, error = batch_items(request.data, "alerts")
+        if error:
+            return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = bulk_update_alerts(
+            GlobalAlertRule.objects.filter(file_association_id=pk), items,
+            check_headers=True, strict_types=True
+        )
+        return Response({"results": results}, status=batch_status(results, "updated"))
+
+    def delete(self, request, pk):
+        ids, error = batch_items(request.data, "ids")
+        if error:
+            return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+        if not all(isinstance(i, int) for i in ids):
+            return Response({"detail": "'ids' must be a list of integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = bulk_delete_alerts(GlobalAlertRule.objects.filter(file_association_id=pk), ids)
+        return Response({"results": results}, status=batch_status(results, "deleted"))
+
+
+@reads_from_replica
 class GlobalAlertListView(generics.ListAPIView):
     serializer_class = GlobalAlertListSerializer
     
     def get_queryset(self):
         return GlobalAlertRule.objects.select_related(
-            'file_association'
+            'file_association__algo',
+            'file_association__group',
+            'file_association__interval'
         ).only(
             'id', 'symbol_interval', 'field_name', 'condition_type',
             'compare_value', 'last_value', 'is_active', 'created_at',
-            'file_association_id'
+            'file_association__file_name',
+            'file_association__algo__algo_name',
+            'file_association__group__group_name',
+            'file_association__interval__interval_name'
         )
 
 
 
+@reads_from_replica
 class TriggeredAlertsAdminView(generics.ListAPIView):
     serializer_class = TriggeredAlertSerializer
+
+    def list(self, request, *args, **kwargs):
+        etag = build_etag("alert-logs-admin", *alert_log_signature(
+            TriggeredAlert.objects.filter(alert_source__in=['global', 'system'])
+        ))
+        if response := not_modified(request, etag):
+            return response
+
+        response = super().list(request, *args, **kwargs)
+        response["ETag"] = etag
+        return response
     
     def get_queryset(self):
+        # TriggeredAlertSerializer renders relations as ids, so no joins are
+        # needed, but every serialized field has to be loaded up front.
         return TriggeredAlert.objects.filter(
             alert_source__in=['global', 'system']
-        ).select_related(
-            'global_alert', 'file_association'
         ).only(
             'id', 'alert_source', 'symbol', 'triggered_at',
-            'acknowledged', 'message', 'global_alert_id',
-            'file_association_id'
+            'acknowledged', 'message', 'sent_to_ui', 'global_alert_id',
+            'custom_alert_id', 'file_association_id'
         ).order_by('-triggered_at')
 
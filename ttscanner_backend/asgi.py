@@ -18,6 +18,13 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ttscanner_backend.settings')
+# Under ASGI each request's sync code runs in a thread that exits with the
+# request, so a persistent connection would be orphaned rather than reused.
+# The web process therefore reuses connections through the process-wide pool
+# (django-db-connection-pool, see settings.DB_POOL_SIZE) by default; with
+# DB_POOL_SIZE=0 each request opens and closes its own connection.
+os.environ.setdefault('DB_POOL_SIZE', '8')
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 # This is the standard entry point
 django_asgi_app = get_asgi_application()
@@ -1,6 +1,7 @@
 import os
 import ssl
 from celery import Celery
+from celery.signals import task_prerun, task_postrun, worker_process_init, worker_process_shutdown
 from django.conf import settings
 
 # Set the default Django settings module
@@ -23,33 +24,65 @@ app.conf.update(
     broker_transport_options={
         'visibility_timeout': 3600,
         'sep': ':',
+        'priority_steps': list(range(10)),
+        'queue_order_strategy': 'priority',
     },
+    # Ingest, alert evaluation and notifications each get their own queue so a
+    # large announcement or a slow FTP fetch can't hold up alert evaluation.
+    task_default_queue='default',
+    task_routes={
+        'ttscanner.tasks.check_and_import_files': {'queue': 'ingest'},
+        'ttscanner.tasks.import_file_association': {'queue': 'ingest'},
+        'ttscanner.tasks.check_triggered_alerts': {'queue': 'alerts'},
+        'ttscanner.tasks.evaluate_alert_shard': {'queue': 'alerts'},
+        'ttscanner.tasks.deliver_triggered_alerts': {'queue': 'notifications'},
+        'ttscanner.tasks.send_announcement_sms_task': {'queue': 'notifications'},
+    },
+    task_default_priority=5,
+    worker_prefetch_multiplier=1,
+    # Children are recycled once their peak RSS passes this (KiB), not after a
+    # fixed number of tasks, so a worker keeps its DB connection, loaded rules
+    # and caches warm for as long as its memory stays in bounds.
+    worker_max_memory_per_child=int(os.getenv("WORKER_MAX_MEMORY_KB", 300_000)),
 )
 
 app.autodiscover_tasks()
 
-app.conf.beat_schedule = {
-    'check-and-import-files-every-60-seconds': {
-        'task': 'ttscanner.tasks.check_and_import_files',
-        'schedule': 60.0,
-    },
-}
-
-@app.on_after_finalize.connect
-def setup_periodic_tasks(sender, **kwargs):
-    try:
-        from ttscanner.models import FileAssociation
-        from ttscanner.tasks import import_file_association
-        from celery.schedules import timedelta
-
-        files = FileAssociation.objects.all()
-        for file in files:
-            if file.interval and file.interval.interval_minutes:
-                interval_seconds = file.interval.interval_minutes * 60
-                sender.add_periodic_task(
-                    timedelta(seconds=interval_seconds),
-                    import_file_association.s(file.id),
-                    name=f"import_{file.file_name}_{file.id}" 
-                )
-    except Exception as e:
-        print(f"Error setting up periodic tasks: {e}")
\ No newline at end of file
+# Database connections: Celery's Django fixup calls close_if_unusable_or_obsolete()
+# around every task, so with CONN_MAX_AGE / CONN_HEALTH_CHECKS in settings a
+# worker reuses one connection across tasks and replaces it once it is too old
+# or fails its health check. Nothing to configure here.
+
+# File imports are scheduled by `manage.py run_import_scheduler` (see Procfile),
+# which wakes exactly when the next file is due instead of scanning every minute.
+
+
+# Memory profile per task type (ttscanner.utils.memory_utils); see
+# `manage.py task_memory_report` and /metrics. Imported lazily because this
+# module loads before Django is set up.
+@task_prerun.connect
+def record_task_memory_start(task_id=None, **kwargs):
+    from ttscanner.utils.memory_utils import task_started
+    task_started(task_id)
+
+
+@task_postrun.connect
+def record_task_memory(task_id=None, task=None, **kwargs):
+    from ttscanner.utils.memory_utils import task_finished
+    from ttscanner.utils.metrics_utils import flush_metrics
+    task_finished(task_id, task.name)
+    # One write per task for everything it counted and timed.
+    flush_metrics()
+
+
+@worker_process_init.connect
+def count_worker_process(**kwargs):
+    from ttscanner.utils.metrics_utils import incr_metric
+    incr_metric("worker_processes_started")
+
+
+@worker_process_shutdown.connect
+def flush_worker_metrics(**kwargs):
+    # Counts made since the last task (e.g. by a recycled child) would otherwise be lost.
+    from ttscanner.utils.metrics_utils import flush_metrics
+    flush_metrics()
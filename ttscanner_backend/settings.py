@@ -4,8 +4,10 @@ Generated by 'django-admin startproject' using Django 5.2.8.
 """
 
 from pathlib import Path
+import importlib.util
 import os
 import ssl
+import warnings
 import pymysql
 from dotenv import load_dotenv, dotenv_values
 
@@ -61,6 +63,8 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware', 
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'ttscanner.middleware.CompressionMiddleware',
+    'ttscanner.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -89,6 +93,18 @@ TEMPLATES = [
 WSGI_APPLICATION = 'ttscanner_backend.wsgi.application'
 
 # Database (MySQL)
+# Connections are kept per thread for DB_CONN_MAX_AGE seconds instead of being
+# opened for every request, and CONN_HEALTH_CHECKS pings a reused connection
+# once per request so one MySQL has dropped is replaced rather than failing the
+# request. MySQL's wait_timeout must outlive CONN_MAX_AGE, otherwise the server
+# closes connections Django still considers open.
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 300))
+DB_WAIT_TIMEOUT = max(int(os.environ.get('DB_WAIT_TIMEOUT', 600)), DB_CONN_MAX_AGE + 60)
+# Process-wide pool (django-db-connection-pool). The ASGI web process can't
+# keep per-thread connections, so asgi.py turns this on there by default;
+# Celery workers and management commands keep their per-thread connections.
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))
+
 DATABASES = {
     "default": {
         'ENGINE': 'django.db.backends.mysql',
@@ -100,14 +116,46 @@ DATABASES = {
         'OPTIONS': {
             'charset': 'utf8mb4',
             'connect_timeout': 10,
-            'read_timeout': 30,      
-            'write_timeout': 30,     
-            # Reduce wait_timeout so MySQL kills idle connections faster
-            'init_command': "SET SESSION wait_timeout=60", 
+            'read_timeout': 30,
+            'write_timeout': 30,
+            'init_command': f"SET SESSION wait_timeout={DB_WAIT_TIMEOUT}",
         },
-        'CONN_MAX_AGE': 0,
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
+
+if DB_POOL_SIZE:
+    if importlib.util.find_spec('dj_db_conn_pool'):
+        DATABASES['default'].update({
+            'ENGINE': 'dj_db_conn_pool.backends.mysql',
+            'POOL_OPTIONS': {
+                'POOL_SIZE': DB_POOL_SIZE,
+                'MAX_OVERFLOW': DB_POOL_SIZE,
+                'RECYCLE': DB_WAIT_TIMEOUT - 60,
+                'PRE_PING': True,
+            },
+            # close() hands the connection back to the pool at the end of each request.
+            'CONN_MAX_AGE': 0,
+        })
+    else:
+        warnings.warn("DB_POOL_SIZE is set but django-db-connection-pool is not installed; pooling is off.")
+
+# Read replica for dashboard reads (see ttscanner/db_router.py): list, lookup,
+# count and SSE views read from it, writes and everything else use the primary.
+# A client that writes is kept on the primary for REPLICA_STICKY_SECONDS so it
+# reads its own changes back despite replication lag.
+if os.environ.get('MYSQL_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['MYSQL_REPLICA_HOST'],
+        'PORT': os.environ.get('MYSQL_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['ttscanner.db_router.ReplicaRouter']
+REPLICA_DATABASE = 'replica'
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -167,6 +215,40 @@ CACHES = {
     }
 }
 
+# Bulk cache for the large payloads (fa_data_*, csv_data_*, fa_snapshot_*).
+# Serializer/compressor are opt-in via env; the key prefix carries the codec
+# so switching codecs never reads values written in the old format. Snapshots
+# hold bytes, which the json serializer can't carry; use pickle or msgpack.
+BULK_CACHE_SERIALIZERS = {
+    "pickle": "django_redis.serializers.pickle.PickleSerializer",
+    "json": "django_redis.serializers.json.JSONSerializer",
+    "msgpack": "django_redis.serializers.msgpack.MSGPackSerializer",
+}
+BULK_CACHE_COMPRESSORS = {
+    "none": "django_redis.compressors.identity.IdentityCompressor",
+    "zlib": "django_redis.compressors.zlib.ZlibCompressor",
+    "lz4": "django_redis.compressors.lz4.Lz4Compressor",
+    "zstd": "django_redis.compressors.zstd.ZStdCompressor",
+}
+BULK_CACHE_SERIALIZER = os.getenv("BULK_CACHE_SERIALIZER", "pickle")
+BULK_CACHE_COMPRESSOR = os.getenv("BULK_CACHE_COMPRESSOR", "none")
+
+# Pre-rendered file snapshots are rebuilt from MainData on a miss, so they
+# only need to outlive the gap between imports of an active file.
+SNAPSHOT_CACHE_SECONDS = int(os.getenv("SNAPSHOT_CACHE_SECONDS", 6 * 60 * 60))
+# Per-row copies (fa_row_*) for favorites; a reader that misses republishes the file's rows.
+ROW_CACHE_SECONDS = int(os.getenv("ROW_CACHE_SECONDS", 24 * 60 * 60))
+
+CACHES["bulk"] = {
+    **CACHES["default"],
+    "KEY_PREFIX": f"bulk:{BULK_CACHE_SERIALIZER}:{BULK_CACHE_COMPRESSOR}",
+    "OPTIONS": {
+        **CACHES["default"]["OPTIONS"],
+        "SERIALIZER": BULK_CACHE_SERIALIZERS[BULK_CACHE_SERIALIZER],
+        "COMPRESSOR": BULK_CACHE_COMPRESSORS[BULK_CACHE_COMPRESSOR],
+    },
+}
+
 
 # Celery
 CELERY_BROKER_URL = REDIS_URL
@@ -180,6 +262,58 @@ CELERY_REDIS_BACKEND_USE_SSL = {
     "ssl_cert_reqs": ssl.CERT_NONE
 }
 
+# Alert evaluation is split into at most this many symbol shards per file,
+# each covering at least ALERT_EVAL_MIN_ROWS_PER_SHARD rows.
+ALERT_EVAL_SHARDS = int(os.getenv("ALERT_EVAL_SHARDS", 4))
+ALERT_EVAL_MIN_ROWS_PER_SHARD = int(os.getenv("ALERT_EVAL_MIN_ROWS_PER_SHARD", 100))
+
+# Per-file import lease; must outlive the slowest fetch + store.
+IMPORT_LEASE_SECONDS = int(os.getenv("IMPORT_LEASE_SECONDS", 300))
+# run_import_scheduler retries a failed refresh or enqueue after this many
+# seconds, doubling on consecutive failures up to SCHEDULER_MAX_RETRY_SECONDS.
+SCHEDULER_RETRY_SECONDS = int(os.getenv("SCHEDULER_RETRY_SECONDS", 5))
+SCHEDULER_MAX_RETRY_SECONDS = int(os.getenv("SCHEDULER_MAX_RETRY_SECONDS", 120))
+
+# Adaptive polling. Files are polled at their interval during the trading
+# session (Group.trading_session, else Algo.trading_session, else this
+# default), backing off after POLL_BACKOFF_AFTER unchanged fetches in a row
+# up to POLL_BACKOFF_MAX_FACTOR x interval. See ttscanner/utils/session_utils.py.
+DEFAULT_TRADING_SESSION = {
+    "timezone": "America/New_York",
+    "days": [0, 1, 2, 3, 4],
+    "open": "04:00",   # pre-market through after-hours
+    "close": "20:00",
+    "holidays": [],
+    "off_hours_interval_minutes": 60,
+}
+POLL_BACKOFF_AFTER = int(os.getenv("POLL_BACKOFF_AFTER", 3))
+POLL_BACKOFF_MAX_FACTOR = int(os.getenv("POLL_BACKOFF_MAX_FACTOR", 8))
+
+# Bearer token required by /metrics. Without one the endpoint is open in
+# development and disabled (403) in production.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+# Processes buffer metric increments and write them at most this often
+# (and after every Celery task).
+METRICS_FLUSH_SECONDS = int(os.getenv("METRICS_FLUSH_SECONDS", 10))
+
+# App logging. Hot paths log per-run summaries at INFO and per-row detail at
+# DEBUG; log_sampled() lets a repeated warning through once per LOG_SAMPLE_SECONDS.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_SECONDS = int(os.getenv("LOG_SAMPLE_SECONDS", 300))
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "plain": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "plain"},
+    },
+    "loggers": {
+        "ttscanner": {"handlers": ["console"], "level": LOG_LEVEL, "propagate": False},
+    },
+}
+
 # Add these two lines to help with Upstash connectivity
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
 CELERY_EVENT_SERIALIZER = 'json'
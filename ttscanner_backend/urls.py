@@ -17,6 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
+from ttscanner.fbv_views import metrics
 import time
 
 def health_check(request):
@@ -31,4 +32,5 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('ttscanner/', include('ttscanner.urls')),
     path('health/', health_check, name='health'),
+    path('metrics', metrics, name='metrics'),
 ]